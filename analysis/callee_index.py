@@ -0,0 +1,64 @@
+from code2flow.code2flow import utils as code2flow_utils
+from analysis.context_packer import collect_callees, pack_callee_context
+
+"""
+An index of the cross-file callees of every file, built once per call graph.
+It replaces the BFS that used to run for every prompt: building the context of a file
+becomes a dictionary lookup and a join of memoized callee sources.
+"""
+
+
+class CalleeIndex():
+    """
+    Maps each file to its ranked, deduplicated transitive cross-file callees (see `collect_callees`).
+    Files are indexed on first use, or all at once with `build`.
+
+    Args:
+        graph (dict): The call graph (see `code2flow.utils.get_call_graph`).
+        bfs_explore (dict): The BFS exploration of the call graph.
+        max_depth (int): The maximum BFS depth from the functions of a file.
+    """
+
+    def __init__(self, graph, bfs_explore, max_depth=5):
+        self.graph = graph
+        self.bfs_explore = bfs_explore
+        self.max_depth = max_depth
+        self.file_to_functions = code2flow_utils.get_file_to_functions(graph)
+        self.__callees = {}
+        self.__memo = {}
+
+    def build(self):
+        """
+        Indexes every file of the call graph.
+        """
+        for file_path in self.file_to_functions:
+            if file_path != 'EXTERNAL':
+                self.get_callees(file_path)
+        return self
+
+    def get_callees(self, file_path) -> list:
+        """
+        Returns the ranked (callee, distance, frequency) tuples of the file.
+        """
+        if file_path not in self.__callees:
+            calls = self.file_to_functions.get(file_path, [])
+            self.__callees[file_path] = collect_callees(calls, self.graph, self.bfs_explore, self.max_depth)
+        return self.__callees[file_path]
+
+    def get_context(self, file_path, budget=None) -> str:
+        """
+        Returns the callee context of the file, packed into the token budget.
+        """
+        return pack_callee_context(self.get_callees(file_path), self.graph, budget, self.__memo)
+
+    def invalidate(self, file_paths=None):
+        """
+        Drops the indexed files (all of them if `file_paths` is None), e.g. after the graph has changed.
+        """
+        if file_paths is None:
+            self.__callees.clear()
+            self.__memo.clear()
+            self.file_to_functions = code2flow_utils.get_file_to_functions(self.graph)
+            return
+        for file_path in file_paths:
+            self.__callees.pop(file_path, None)
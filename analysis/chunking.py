@@ -0,0 +1,79 @@
+import os
+import ast
+from llm_utils.tokens import count_tokens
+
+"""
+Splits a large source file along its top-level class and function boundaries, so that its
+documentation is generated chunk by chunk (in parallel) instead of in a single prompt.
+"""
+
+# Files with more tokens than this are documented in chunks
+DEFAULT_CHUNK_THRESHOLD_TOKENS = 12000
+# The token budget of a chunk (a single class or function larger than this is a chunk of its own)
+DEFAULT_CHUNK_TOKENS = 6000
+
+
+def get_chunk_threshold() -> int:
+    """
+    Returns the size above which a file is chunked, read from the CHUNK_THRESHOLD_TOKENS environment variable.
+    """
+    return int(os.getenv('CHUNK_THRESHOLD_TOKENS') or DEFAULT_CHUNK_THRESHOLD_TOKENS)
+
+
+def get_chunk_tokens() -> int:
+    """
+    Returns the token budget of a chunk, read from the CHUNK_TOKENS environment variable.
+    """
+    return int(os.getenv('CHUNK_TOKENS') or DEFAULT_CHUNK_TOKENS)
+
+
+def get_chunks(content, threshold=None, max_tokens=None) -> list:
+    """
+    Returns the content as a single chunk if it is within the threshold, otherwise its chunks
+    (see `split_into_chunks`).
+    """
+    threshold = threshold or get_chunk_threshold()
+    if count_tokens(content) <= threshold:
+        return [content]
+    return split_into_chunks(content, max_tokens or get_chunk_tokens())
+
+
+def split_into_chunks(content, max_tokens) -> list:
+    """
+    Returns the content split into chunks of consecutive top-level statements of at most `max_tokens`
+    tokens each. Every class or function stays whole, with its decorators and the comments above it.
+    The module header (docstring, imports, ... up to the first class or function) is repeated at the
+    top of every chunk if it takes at most a quarter of the budget, otherwise it is a chunk of its own.
+    Returns the content as a single chunk if it cannot be parsed.
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return [content]
+    if not tree.body:
+        return [content]
+    lines = content.splitlines(keepends=True)
+    # The lines above a statement (decorators, comments, blank lines) belong to it
+    starts = [0] + [node.end_lineno for node in tree.body[:-1]]
+    pieces = [(''.join(lines[start:end]), isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)))
+              for node, start, end in zip(tree.body, starts, starts[1:] + [len(lines)])]
+
+    header_size = next((i for i, (_, definition) in enumerate(pieces) if definition), len(pieces))
+    header = ''.join(piece for piece, _ in pieces[:header_size])
+    header_tokens = count_tokens(header)
+    chunks = []
+    if header_tokens > max_tokens // 4:
+        chunks.append(header)
+        header, header_tokens = '', 0
+
+    current, current_tokens = [], 0
+    for piece, _ in pieces[header_size:]:
+        tokens = count_tokens(piece)
+        if current and header_tokens + current_tokens + tokens > max_tokens:
+            chunks.append(header + ''.join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current or not chunks:
+        chunks.append(header + ''.join(current))
+    return chunks
@@ -0,0 +1,285 @@
+import os
+import sys
+from array import array
+from collections import deque
+from collections.abc import Mapping
+from code2flow.code2flow import utils as code2flow_utils
+
+"""
+A compact, array-backed representation of the code2flow call graph.
+Functions get integer ids; names and file names are interned once; callers and callees are
+stored as CSR (compressed sparse row) adjacency arrays; function bodies are kept as byte
+offsets into the source files instead of strings.
+The graph is a read-only snapshot of the repository at the time it was built.
+"""
+
+EXTERNAL = 'EXTERNAL'
+
+
+def _to_csr(adjacency) -> tuple:
+    """
+    Returns the (offsets, targets) arrays of a list of neighbour id lists.
+    The neighbours of node i are targets[offsets[i]:offsets[i + 1]].
+    """
+    offsets = array('l', [0])
+    targets = array('l')
+    for neighbours in adjacency:
+        targets.extend(neighbours)
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+class CompactCallGraph(Mapping):
+    """
+    A read-only call graph with integer node ids and CSR adjacency in both directions.
+    It is also a mapping (function, node) with the same nodes as `code2flow.utils.get_call_graph`,
+    materialized on access, so it can be used wherever the dict graph is expected.
+
+    Args:
+        graph (dict): The call graph (see `code2flow.utils.get_call_graph`).
+        root_folder (str): The repository root the file names are relative to. If given, function
+            bodies found verbatim in their source file are stored as byte offsets.
+    """
+
+    def __init__(self, graph, root_folder=None):
+        self.root_folder = root_folder
+        self.names = [sys.intern(key) for key in graph]
+        self.ids = {key: i for i, key in enumerate(self.names)}
+        self.files = []
+        file_ids = {}
+        self.node_file = array('l')
+        self.display_names = []
+        for key in self.names:
+            node = graph[key]
+            file_name = node['file_name']
+            if file_name not in file_ids:
+                file_ids[file_name] = len(self.files)
+                self.files.append(sys.intern(file_name))
+            self.node_file.append(file_ids[file_name])
+            name = node.get('name', key)
+            self.display_names.append(None if name == key else sys.intern(name))
+        self.file_ids = file_ids
+
+        callees = [[self.ids[callee] for callee in graph[key].get('callees', []) if callee in self.ids]
+                   for key in self.names]
+        callers = [[] for _ in self.names]
+        for caller, targets in enumerate(callees):
+            for callee in targets:
+                callers[callee].append(caller)
+        self.callee_offsets, self.callee_targets = _to_csr(callees)
+        self.caller_offsets, self.caller_targets = _to_csr(callers)
+
+        self.content_start = array('q', [-1] * len(self.names))
+        self.content_end = array('q', [-1] * len(self.names))
+        self.inline_content = {}
+        self.__locate_contents(graph)
+
+    @classmethod
+    def load(cls, output_dir, root_folder=None):
+        """
+        Loads the call graph generated in `output_dir` (see `code2flow.utils.generate_graph`).
+        """
+        return cls(code2flow_utils.get_call_graph(output_dir), root_folder)
+
+    def __locate_contents(self, graph):
+        """
+        Stores the byte range of every function body in its source file.
+        Bodies that cannot be found verbatim (or without a root folder) are kept inline.
+        """
+        by_file = {}
+        for i, key in enumerate(self.names):
+            by_file.setdefault(self.node_file[i], []).append(i)
+        for file_id, nodes in by_file.items():
+            source = self.__read_source(file_id)
+            for i in nodes:
+                content = graph[self.names[i]].get('content', '')
+                if not content:
+                    continue
+                encoded = content.encode('utf-8')
+                start = source.find(encoded) if source else -1
+                if start < 0:
+                    self.inline_content[i] = content
+                    continue
+                self.content_start[i] = start
+                self.content_end[i] = start + len(encoded)
+
+    def __read_source(self, file_id):
+        file_name = self.files[file_id]
+        if self.root_folder is None or EXTERNAL in file_name:
+            return None
+        try:
+            with open(os.path.join(self.root_folder, file_name), 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def __getitem__(self, key) -> 'CompactNode':
+        return CompactNode(self, self.ids[key])
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def file_of(self, key) -> str:
+        return self.files[self.node_file[self.ids[key]]]
+
+    def callee_ids(self, i):
+        return self.callee_targets[self.callee_offsets[i]:self.callee_offsets[i + 1]]
+
+    def caller_ids(self, i):
+        return self.caller_targets[self.caller_offsets[i]:self.caller_offsets[i + 1]]
+
+    def callees(self, key) -> list:
+        return [self.names[j] for j in self.callee_ids(self.ids[key])]
+
+    def callers(self, key) -> list:
+        return [self.names[j] for j in self.caller_ids(self.ids[key])]
+
+    def get_content(self, i) -> str:
+        """
+        Returns the source of function `i`, read from its byte range in the source file.
+        """
+        if i in self.inline_content:
+            return self.inline_content[i]
+        start = self.content_start[i]
+        if start < 0:
+            return ''
+        with open(os.path.join(self.root_folder, self.files[self.node_file[i]]), 'rb') as file:
+            file.seek(start)
+            return file.read(self.content_end[i] - start).decode('utf-8')
+
+    def get_file_to_functions(self) -> dict:
+        """
+        Returns a dict mapping: (file, functions defined in the file).
+        """
+        file_to_functions = {}
+        for i, key in enumerate(self.names):
+            file_to_functions.setdefault(self.files[self.node_file[i]], []).append(key)
+        return file_to_functions
+
+    def bfs(self, sources, max_depth=None, reverse=False):
+        """
+        Yields (function, depth) in BFS order from the `sources` functions, following callees
+        (or callers if `reverse`), up to `max_depth` edges away.
+        """
+        offsets, targets = (self.caller_offsets, self.caller_targets) if reverse \
+            else (self.callee_offsets, self.callee_targets)
+        visited = bytearray(len(self.names))
+        queue = deque()
+        for key in sources:
+            i = self.ids[key]
+            if not visited[i]:
+                visited[i] = 1
+                queue.append((i, 0))
+        while queue:
+            i, depth = queue.popleft()
+            yield self.names[i], depth
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for j in targets[offsets[i]:offsets[i + 1]]:
+                if not visited[j]:
+                    visited[j] = 1
+                    queue.append((j, depth + 1))
+
+    def reachable(self, sources, max_depth=None, reverse=False) -> set:
+        """
+        Returns the functions reachable from `sources` (including them).
+        """
+        if max_depth is not None:
+            return {key for key, _ in self.bfs(sources, max_depth, reverse)}
+        offsets, targets = (self.caller_offsets, self.caller_targets) if reverse \
+            else (self.callee_offsets, self.callee_targets)
+        visited = bytearray(len(self.names))
+        stack = [self.ids[key] for key in sources]
+        reached = []
+        while stack:
+            i = stack.pop()
+            if visited[i]:
+                continue
+            visited[i] = 1
+            reached.append(i)
+            stack.extend(targets[offsets[i]:offsets[i + 1]])
+        return {self.names[i] for i in reached}
+
+    def adjacency(self) -> 'CalleeView':
+        """
+        Returns the direct callees of every function, in place of `code2flow.utils.explore_call_graph`.
+        """
+        return CalleeView(self)
+
+    def get_parent_dependencies(self, matched_functions, file) -> dict:
+        """
+        Returns a dict mapping: (file, functions calling the matched functions of `file`),
+        for the callers defined in other files (see `code2flow.utils.get_parent_dependencies`).
+        """
+        file_id = self.file_ids.get(file)
+        matched = set(matched_functions)
+        parent_dependencies = {}
+        for i, key in enumerate(self.names):
+            if self.node_file[i] != file_id or (key not in matched and self.display_names[i] not in matched):
+                continue
+            for j in self.caller_ids(i):
+                caller_file = self.files[self.node_file[j]]
+                if self.node_file[j] == file_id or EXTERNAL in caller_file:
+                    continue
+                callers = parent_dependencies.setdefault(caller_file, [])
+                if self.names[j] not in callers:
+                    callers.append(self.names[j])
+        return parent_dependencies
+
+
+class CompactNode(Mapping):
+    """
+    A node of a `CompactCallGraph`, with the fields of a code2flow node computed on access.
+    """
+    FIELDS = ('name', 'file_name', 'callers', 'callees', 'content')
+
+    def __init__(self, graph: CompactCallGraph, i):
+        self.graph = graph
+        self.i = i
+
+    def __getitem__(self, field):
+        graph, i = self.graph, self.i
+        if field == 'file_name':
+            return graph.files[graph.node_file[i]]
+        if field == 'name':
+            return graph.display_names[i] or graph.names[i]
+        if field == 'callees':
+            return [graph.names[j] for j in graph.callee_ids(i)]
+        if field == 'callers':
+            return [graph.names[j] for j in graph.caller_ids(i)]
+        if field == 'content':
+            return graph.get_content(i)
+        raise KeyError(field)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+
+class CalleeView(Mapping):
+    """
+    A mapping (function, direct callees) over a `CompactCallGraph` that does not materialize the
+    nested exploration tree. External functions are left out, as in `explore_call_graph`.
+    """
+
+    def __init__(self, graph: CompactCallGraph):
+        self.graph = graph
+
+    def __getitem__(self, key) -> list:
+        if key not in self.graph.ids or EXTERNAL in self.graph.file_of(key):
+            raise KeyError(key)
+        return self.graph.callees(key)
+
+    def __iter__(self):
+        return (key for key in self.graph if EXTERNAL not in self.graph.file_of(key))
+
+    def __len__(self):
+        return sum(1 for _ in self)
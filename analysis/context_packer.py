@@ -0,0 +1,112 @@
+import os
+import ast
+import textwrap
+from collections import deque
+from llm_utils.tokens import count_tokens
+
+"""
+Packs the source of the callee functions of a file into a token budget.
+Callees are ranked by their BFS distance from the file's functions and by how often they are called.
+Callees that do not fit in full are reduced to their signature and docstring.
+"""
+
+DEFAULT_CONTEXT_TOKEN_BUDGET = 4000
+# Once fewer tokens than this are left, no further callee is summarized and packing stops
+MIN_CALLEE_TOKENS = 16
+
+
+def get_context_token_budget() -> int:
+    """
+    Returns the token budget for the callee context, read from the CONTEXT_TOKEN_BUDGET environment variable.
+    """
+    return int(os.getenv('CONTEXT_TOKEN_BUDGET') or DEFAULT_CONTEXT_TOKEN_BUDGET)
+
+
+def collect_callees(calls, graph, bfs_explore, max_depth=5) -> list:
+    """
+    Returns the cross-file callees reachable from `calls`, as (callee, distance, frequency) tuples ranked
+    by the shortest BFS distance first, then by the number of times the callee is called, then by name.
+    """
+    distance = {}
+    frequency = {}
+
+    for call_name in calls:
+        if 'EXTERNAL' in graph[call_name]['file_name']:
+            continue
+        queue = deque([(call_name, 0)])
+        visited = {call_name}
+
+        while queue:
+            current_call, depth = queue.popleft()
+            caller_file = graph[current_call]['file_name']
+
+            for callee in bfs_explore.get(current_call, []):
+                callee_file = graph[callee]['file_name']
+                if 'EXTERNAL' not in callee_file and caller_file != callee_file:
+                    distance[callee] = min(distance.get(callee, depth + 1), depth + 1)
+                    frequency[callee] = frequency.get(callee, 0) + 1
+                if depth < max_depth and callee not in visited:
+                    visited.add(callee)
+                    queue.append((callee, depth + 1))
+
+    ranked = sorted(distance, key=lambda callee: (distance[callee], -frequency[callee], callee))
+    return [(callee, distance[callee], frequency[callee]) for callee in ranked]
+
+
+def summarize_source(content) -> str:
+    """
+    Returns the signature and docstring of a function or class, with its body elided.
+    Falls back to the first line of the source if it cannot be parsed.
+    """
+    try:
+        module = ast.parse(textwrap.dedent(content))
+    except SyntaxError:
+        return content.strip().splitlines()[0] if content.strip() else ''
+    summaries = []
+    for node in module.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        docstring = ast.get_docstring(node, clean=False)
+        node.body = [ast.Expr(ast.Constant(docstring))] if docstring else []
+        node.body.append(ast.Expr(ast.Constant(Ellipsis)))
+        summaries.append(ast.unparse(node))
+    return '\n'.join(summaries) or content.strip().splitlines()[0]
+
+
+def format_callee(name, content) -> str:
+    return f"\nFunction/Class {name}:\n{content}\n"
+
+
+def pack_callee_context(callees, graph, budget=None, memo=None) -> str:
+    """
+    Returns the callee context for a prompt, filled in rank order until the token budget is used up.
+    A callee whose full source does not fit is included with its signature and docstring only, if that fits.
+    `memo` is an optional dict in which the formatted callees and their token counts are kept across calls.
+    """
+    if budget is None:
+        budget = get_context_token_budget()
+    if memo is None:
+        memo = {}
+    parts = []
+    used = 0
+    for callee, _, _ in callees:
+        full, tokens = _format(callee, graph, memo, summary=False)
+        if used + tokens > budget:
+            if budget - used < MIN_CALLEE_TOKENS:
+                break
+            full, tokens = _format(callee, graph, memo, summary=True)
+            if used + tokens > budget:
+                continue
+        parts.append(full)
+        used += tokens
+    return ''.join(parts)
+
+
+def _format(callee, graph, memo, summary):
+    key = (callee, summary)
+    if key not in memo:
+        node = graph[callee]
+        content = summarize_source(node['content']) if summary else node['content']
+        text = format_callee(node['name'], content)
+        memo[key] = (text, count_tokens(text))
+    return memo[key]
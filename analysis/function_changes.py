@@ -0,0 +1,79 @@
+import ast
+from code2flow.code2flow.ast_utils import FunctionChange, FunctionChangeType, _get_similarity
+from analysis.similarity import SimilarityIndex
+
+"""
+Detects the function changes between two versions of a Python file.
+The functions are extracted in memory with the `ast` module, instead of writing each version to
+disk and running code2flow on it; the result is the same (function name, source) mapping.
+"""
+
+# Minimum similarity for a removed and an added function to be reported as a rename
+RENAME_SIMILARITY_THRESHOLD = 0.8
+# Number of added functions shortlisted (by MinHash) for the exact similarity with a removed function
+RENAME_CANDIDATES = 3
+
+
+def get_functions_from_content(content) -> dict:
+    """
+    Returns a dict mapping: (function name, function source) of the functions and methods
+    defined in the content, in source order. Methods are named `Class.method`, as in the call graph.
+    Returns an empty dict if the content cannot be parsed.
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return {}
+    lines = content.splitlines(keepends=True)
+    functions = {}
+
+    def visit(body, prefix):
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                visit(node.body, f'{prefix}{node.name}.')
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                source = ''.join(lines[node.lineno - 1:node.end_lineno])
+                functions[f'{prefix}{node.name}'] = source.strip()
+
+    visit(tree.body, '')
+    return functions
+
+
+def get_function_changes(file_path, old_content, new_content) -> list:
+    """
+    Returns the FunctionChange of every function of the file: EQUAL and UPDATED for the functions in
+    both versions, RENAMED for a removed function similar enough to an added one, REMOVED and ADDED
+    for the others. The file path is only used to report the changes.
+    Rename candidates are shortlisted with a `SimilarityIndex` of the added functions.
+    """
+    old_functions = get_functions_from_content(old_content)
+    new_functions = get_functions_from_content(new_content)
+    added = [name for name in new_functions if name not in old_functions]
+    removed = any(name not in new_functions for name in old_functions)
+    index = SimilarityIndex({name: new_functions[name] for name in added}) if added and removed else None
+
+    changes = []
+    for name, content in old_functions.items():
+        if name in new_functions:
+            if content == new_functions[name]:
+                changes.append(FunctionChange(name, FunctionChangeType.EQUAL, 1.0))
+            else:
+                similarity = _get_similarity(content, new_functions[name])
+                changes.append(FunctionChange(name, FunctionChangeType.UPDATED, similarity))
+            continue
+        best, best_similarity = None, 0
+        shortlist = set(index.candidates(content, RENAME_CANDIDATES)) if index else set()
+        for new_name in added:
+            if new_name not in shortlist:
+                continue
+            similarity = _get_similarity(content, new_functions[new_name])
+            if similarity > best_similarity:
+                best, best_similarity = new_name, similarity
+        if best is not None and best_similarity >= RENAME_SIMILARITY_THRESHOLD:
+            added.remove(best)
+            index.remove(best)
+            changes.append(FunctionChange(name, FunctionChangeType.RENAMED, best_similarity))
+        else:
+            changes.append(FunctionChange(name, FunctionChangeType.REMOVED, 0))
+    changes.extend(FunctionChange(name, FunctionChangeType.ADDED, 0) for name in added)
+    return changes
@@ -0,0 +1,205 @@
+import os
+import re
+import ast
+import shutil
+import tempfile
+from code2flow.code2flow import utils as code2flow_utils
+
+"""
+Incremental update of the code2flow call graph for a set of changed and deleted files.
+code2flow links a call to a function by its name (token) across the whole repository, so the files
+whose nodes and links can change are the changed files and every file calling or defining a name
+that the changed files define or used to define. Only those files are parsed again, together with
+the files defining the names they call (so their calls resolve as in a full run); the rest of the
+graph is kept.
+"""
+
+EXTERNAL = 'EXTERNAL'
+
+
+def get_token(name) -> str:
+    """
+    Returns the name a call is linked by, e.g. 'method' for 'EXTERNAL::Class.method'.
+    """
+    return name.split('::')[-1].split('.')[-1]
+
+
+def get_defined_tokens(source) -> set:
+    """
+    Returns the names of the functions, methods and classes defined in the source.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return set()
+    return {node.name for node in ast.walk(tree)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))}
+
+
+def get_called_tokens(source) -> set:
+    """
+    Returns the names called in the source: `f` for `f()` and `obj.f()`.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return set()
+    tokens = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name):
+                tokens.add(node.func.id)
+            elif isinstance(node.func, ast.Attribute):
+                tokens.add(node.func.attr)
+    return tokens
+
+
+def _read(path) -> str:
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return file.read()
+    except (OSError, UnicodeDecodeError):
+        return ''
+
+
+def _python_files(root_folder, output_folder=None):
+    for dirpath, dirnames, filenames in os.walk(root_folder):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')
+                       and os.path.join(dirpath, d) != output_folder]
+        for filename in filenames:
+            if filename.endswith('.py'):
+                yield os.path.join(dirpath, filename)
+
+
+def _scan(files, pattern) -> set:
+    """
+    Returns the files whose source matches the regex pattern.
+    """
+    regex = re.compile(pattern)
+    return {path for path in files if regex.search(_read(path))}
+
+
+def _tokens_pattern(tokens, template) -> str:
+    names = '|'.join(re.escape(token) for token in sorted(tokens))
+    return template.format(names=names) if names else r'(?!x)x'
+
+
+def build_subset_graph(root_folder, files) -> dict:
+    """
+    Runs code2flow on a copy of the given files (same layout under a temporary root) and returns
+    their call graph, with the file names and function names of the temporary root mapped back.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        source_root = os.path.join(tmp, 'src')
+        for path in files:
+            target = os.path.join(source_root, os.path.relpath(path, root_folder))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(path, target)
+        output_folder = os.path.join(tmp, 'out')
+        code2flow_utils.generate_graph(source_root, output_folder)
+        graph = code2flow_utils.get_call_graph(output_folder)
+
+    return rebase_graph(graph, source_root, root_folder)
+
+
+def rebase_graph(graph, old_root, new_root) -> dict:
+    """
+    Returns the call graph with the paths under `old_root` (file names and function names) moved
+    under `new_root`.
+    """
+    def rebase(name):
+        return name.replace(old_root, new_root)
+
+    rebased = {}
+    for key, node in graph.items():
+        node = dict(node)
+        node['file_name'] = rebase(node['file_name'])
+        node['callers'] = [rebase(caller) for caller in node.get('callers', [])]
+        node['callees'] = [rebase(callee) for callee in node.get('callees', [])]
+        rebased[rebase(key)] = node
+    return rebased
+
+
+def get_affected_files(graph, root_folder, changed_files, deleted_files, output_folder=None) -> tuple:
+    """
+    Returns the (affected, context) files of an update:
+    - affected: the changed files and the files calling or defining a name the changed or deleted
+      files define or used to define; their nodes and edges are recomputed.
+    - context: the other files defining a name called by the affected files; they are parsed with
+      the affected files so that calls resolve as in a full run, but their nodes are kept.
+    """
+    changed_files = set(changed_files)
+    updated = changed_files | set(deleted_files)
+    tokens = {get_token(key) for key, node in graph.items() if node['file_name'] in updated}
+    for path in changed_files:
+        tokens |= get_defined_tokens(_read(path))
+
+    others = [path for path in _python_files(root_folder, output_folder) if path not in updated]
+    affected = changed_files | _scan(others, _tokens_pattern(
+        tokens, r'\b(?:{names})\s*\(|\b(?:def|class)\s+(?:{names})\b'))
+
+    called = set()
+    for path in affected:
+        called |= get_called_tokens(_read(path))
+    context = _scan([path for path in others if path not in affected],
+                    _tokens_pattern(called, r'\b(?:def|class)\s+(?:{names})\b'))
+    return affected, context
+
+
+def update_call_graph(graph, root_folder, changed_files, deleted_files=(), output_folder=None,
+                      build_graph=build_subset_graph, trimmed=True) -> dict:
+    """
+    Returns the call graph of the repository after the changed (added, modified or renamed to) and
+    deleted (or renamed from) files, given its call graph `graph` before them.
+    File paths are absolute, as the file names of the graph.
+    `trimmed` tells whether the graphs are generated with code2flow's trimming, its default (the last
+    step of `engine.map_it`, skipped with `no_trimming`): the functions without any caller or callee
+    are dropped from the graph.
+    """
+    root_folder = os.path.abspath(root_folder)
+    changed_files = {os.path.abspath(path) for path in changed_files if os.path.exists(path)}
+    deleted_files = {os.path.abspath(path) for path in deleted_files}
+    affected, context = get_affected_files(graph, root_folder, changed_files, deleted_files, output_folder)
+    subset = build_graph(root_folder, sorted(affected | context)) if affected else {}
+
+    removed = affected | deleted_files
+    updated = {}
+    for key, node in graph.items():
+        if node['file_name'] not in removed and EXTERNAL not in node['file_name']:
+            updated[key] = dict(node)
+    for key, node in subset.items():
+        if node['file_name'] in affected:
+            updated[key] = dict(node)
+
+    # Nodes of unchanged affected files without edges in the subset may still be called by the
+    # files that were not parsed again
+    kept = set(updated)
+    for key, node in graph.items():
+        if node['file_name'] in affected - changed_files and key not in kept \
+                and any(caller in kept and graph[caller]['file_name'] not in affected
+                        for caller in node.get('callers', []) if caller in graph):
+            updated[key] = dict(node, callees=[])
+
+    # The callees of unchanged files missing from the graph had no edges before (they were trimmed):
+    # they are added from the subset, without callees, as the external functions
+    for node in updated.values():
+        node['callees'] = [callee for callee in node.get('callees', [])
+                           if callee in updated or callee in subset or EXTERNAL in callee]
+    for node in list(updated.values()):
+        for callee in node['callees']:
+            if callee not in updated:
+                callee_node = subset.get(callee) or graph.get(callee)
+                updated[callee] = dict(callee_node, callees=[])
+
+    callers = {key: [] for key in updated}
+    for key, node in updated.items():
+        for callee in node['callees']:
+            if key not in callers[callee]:
+                callers[callee].append(key)
+    for key, node in updated.items():
+        node['callers'] = callers[key]
+
+    # As code2flow, drop the functions that are not connected to anything
+    if trimmed:
+        updated = {key: node for key, node in updated.items() if node['callers'] or node['callees']}
+    return updated
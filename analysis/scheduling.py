@@ -0,0 +1,108 @@
+"""
+Orders files for documentation generation using the file-level call graph.
+A file depends on the files whose functions it calls. Files that call each other form a
+strongly connected component (SCC) and are generated together.
+"""
+
+
+def get_file_dependencies(graph, files=None) -> dict:
+    """
+    Returns a dict mapping: (file, set of files it calls).
+    External functions, calls within the same file and files outside of `files` are ignored.
+    """
+    if files is None:
+        files = {node['file_name'] for node in graph.values() if 'EXTERNAL' not in node['file_name']}
+    files = set(files)
+    dependencies = {file: set() for file in files}
+    for node in graph.values():
+        caller_file = node['file_name']
+        if caller_file not in files:
+            continue
+        for callee in node.get('callees', []):
+            callee_node = graph.get(callee)
+            if callee_node is None:
+                continue
+            callee_file = callee_node['file_name']
+            if callee_file != caller_file and callee_file in files:
+                dependencies[caller_file].add(callee_file)
+    return dependencies
+
+
+def get_strongly_connected_components(dependencies) -> list:
+    """
+    Returns the SCCs of the dependency graph (Tarjan's algorithm, iterative).
+    Components are emitted in reverse topological order: a component comes after every component it depends on.
+    """
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for root in sorted(dependencies):
+        if root in index:
+            continue
+        # Each frame holds the node and an iterator over its dependencies
+        work = [(root, iter(sorted(dependencies[root])))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(sorted(dependencies.get(child, ())))))
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(sorted(component))
+    return components
+
+
+def get_generation_levels(graph, files=None) -> list:
+    """
+    Returns the files grouped in levels, leaves first.
+    Every file only depends on files of earlier levels (or of its own SCC), so the files
+    of one level can be generated in parallel once the previous levels are done.
+    """
+    dependencies = get_file_dependencies(graph, files)
+    components = get_strongly_connected_components(dependencies)
+    component_of = {}
+    for i, component in enumerate(components):
+        for file in component:
+            component_of[file] = i
+
+    # Components come in reverse topological order, so the dependencies of a component already have a level
+    component_level = []
+    for i, component in enumerate(components):
+        level = 0
+        for file in component:
+            for dependency in dependencies[file]:
+                j = component_of[dependency]
+                if j != i:
+                    level = max(level, component_level[j] + 1)
+        component_level.append(level)
+
+    levels = [[] for _ in range(max(component_level, default=-1) + 1)]
+    for component, level in zip(components, component_level):
+        levels[level].extend(component)
+    return [sorted(level) for level in levels]
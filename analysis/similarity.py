@@ -0,0 +1,83 @@
+import re
+import zlib
+import random
+
+"""
+Shortlists similar functions with MinHash signatures of token shingles and locality-sensitive
+hashing (LSH), so that the exact (and expensive) similarity only runs on a few candidate pairs
+instead of every pair of removed and added functions.
+"""
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+# 32 bands of 2 rows: pairs with a Jaccard similarity of 0.3 are candidates with a probability of 95%
+BANDS = 32
+_PRIME = (1 << 61) - 1
+_random = random.Random(0)
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+
+def get_shingles(source, size=SHINGLE_SIZE) -> set:
+    """
+    Returns the hashes of the `size`-token shingles of the source (or of its tokens, if it is shorter).
+    """
+    tokens = _TOKEN.findall(source)
+    if len(tokens) < size:
+        return {zlib.crc32(' '.join(tokens).encode('utf-8'))} if tokens else set()
+    return {zlib.crc32(' '.join(tokens[i:i + size]).encode('utf-8')) for i in range(len(tokens) - size + 1)}
+
+
+def get_signature(shingles) -> tuple:
+    """
+    Returns the MinHash signature of a set of shingle hashes.
+    """
+    if not shingles:
+        return (_PRIME,) * NUM_PERMUTATIONS
+    return tuple(min((a * shingle + b) % _PRIME for shingle in shingles) for a, b in _PERMUTATIONS)
+
+
+def estimate_jaccard(signature, other) -> float:
+    return sum(x == y for x, y in zip(signature, other)) / NUM_PERMUTATIONS
+
+
+class SimilarityIndex():
+    """
+    An LSH index of the MinHash signatures of a set of sources.
+
+    Args:
+        sources (dict): A dict mapping: (name, source).
+    """
+
+    def __init__(self, sources):
+        self.rows = NUM_PERMUTATIONS // BANDS
+        self.signatures = {}
+        self.buckets = {}
+        for name, source in sources.items():
+            self.add(name, source)
+
+    def _bands(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(BANDS)]
+
+    def add(self, name, source):
+        signature = get_signature(get_shingles(source))
+        self.signatures[name] = signature
+        for band in self._bands(signature):
+            self.buckets.setdefault(band, []).append(name)
+
+    def remove(self, name):
+        signature = self.signatures.pop(name)
+        for band in self._bands(signature):
+            self.buckets[band].remove(name)
+
+    def candidates(self, source, limit=3) -> list:
+        """
+        Returns up to `limit` indexed names sharing an LSH bucket with the source,
+        the most similar first (by estimated Jaccard similarity, then by name).
+        """
+        signature = get_signature(get_shingles(source))
+        names = set()
+        for band in self._bands(signature):
+            names.update(self.buckets.get(band, ()))
+        ranked = sorted(names, key=lambda name: (-estimate_jaccard(signature, self.signatures[name]), name))
+        return ranked[:limit]
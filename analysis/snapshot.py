@@ -0,0 +1,74 @@
+import os
+import hashlib
+import threading
+from analysis.compact_graph import CompactCallGraph
+from analysis.callee_index import CalleeIndex
+from analysis.store import load_call_graph
+
+"""
+The code2flow analysis of a repository, shared by every agent and plugin of the process.
+The whole-repo parse runs once per tree: a snapshot is reused for as long as the tree hash of
+the repository (its Python files, their sizes and modification times) is unchanged.
+"""
+
+OUTPUT_FOLDER_NAME = 'docs_output'
+
+
+def get_tree_hash(root_folder) -> str:
+    """
+    Returns a hash of the Python files under `root_folder`: their paths, sizes and modification times.
+    Hidden directories and the docs output folder are ignored.
+    """
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(root_folder):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != OUTPUT_FOLDER_NAME]
+        for filename in filenames:
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            entries.append(f'{os.path.relpath(path, root_folder)}\0{stat.st_size}\0{stat.st_mtime_ns}')
+    entries.sort()
+    return hashlib.sha256('\n'.join(entries).encode('utf-8')).hexdigest()
+
+
+class AnalysisSnapshot():
+    """
+    The call graph of a repository with the structures derived from it.
+
+    Args:
+        root_folder (str): The repository root.
+        output_folder (str): The folder where code2flow writes the call graph.
+        tree_hash (str): The tree hash of the repository when the graph was generated.
+    """
+
+    def __init__(self, root_folder, output_folder, tree_hash):
+        self.root_folder = root_folder
+        self.output_folder = output_folder
+        self.tree_hash = tree_hash
+        graph, self.file_to_functions = load_call_graph(root_folder, output_folder)
+        self.graph = CompactCallGraph(graph, root_folder)
+        self.bfs_explore = self.graph.adjacency()
+        # Precompute the callee context of every file once, instead of a BFS per prompt
+        self.callee_index = CalleeIndex(self.graph, self.bfs_explore).build()
+
+
+__snapshots = {}
+__snapshots_lock = threading.Lock()
+
+
+def get_analysis_snapshot(root_folder, output_folder=None) -> AnalysisSnapshot:
+    """
+    Returns the analysis snapshot shared by the process for the repository.
+    The repository is parsed again only if its tree hash has changed since the last snapshot.
+    """
+    root_folder = os.path.abspath(root_folder)
+    if output_folder is None:
+        output_folder = os.path.join(root_folder, OUTPUT_FOLDER_NAME)
+    tree_hash = get_tree_hash(root_folder)
+    with __snapshots_lock:
+        snapshot = __snapshots.get(root_folder)
+        if snapshot is None or snapshot.tree_hash != tree_hash:
+            snapshot = AnalysisSnapshot(root_folder, output_folder, tree_hash)
+            __snapshots[root_folder] = snapshot
+        return snapshot
@@ -0,0 +1,126 @@
+import os
+import json
+import git
+from code2flow.code2flow import utils as code2flow_utils
+from analysis.incremental_graph import update_call_graph, rebase_graph
+
+"""
+Persists the code2flow analysis of a repository under the docs output folder, keyed by the git
+tree SHA of the checked-out commit, so that a run over an identical tree skips the whole-repo parse.
+The paths of the analysis are absolute: they are stored with the root folder they were taken under,
+and moved under the root folder of the loading run (e.g. another checkout of the same tree).
+The store is local state (see `repo_documentation.utils.GITIGNORE_PATTERNS`), it is not committed.
+"""
+
+STORE_FOLDER_NAME = 'analysis'
+STORE_VERSION = 2
+MAX_STORED_TREES = 8
+
+
+def get_git_tree_sha(root_folder):
+    """
+    Returns the tree SHA of the HEAD commit of the repository at `root_folder`, or None if it is not
+    a git repository or if its Python files differ from HEAD (modified, staged or untracked).
+    """
+    try:
+        repo = git.Repo(root_folder, search_parent_directories=True)
+        if repo.git.status('--porcelain', '--', '*.py'):
+            return None
+        tree = repo.head.commit.tree
+        relative = os.path.relpath(os.path.abspath(root_folder), repo.working_tree_dir)
+        return tree.hexsha if relative == '.' else (tree / relative.replace(os.sep, '/')).hexsha
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError, git.GitCommandError, ValueError, KeyError):
+        return None
+
+
+class AnalysisStore():
+    """
+    Stores one analysis per tree SHA as JSON: the call graph and the file to functions map.
+    The callee view (which replaces the BFS exploration) is derived from the graph in linear time.
+    Only the MAX_STORED_TREES most recently used trees are kept.
+
+    Args:
+        output_dir (str): The docs output directory.
+    """
+
+    def __init__(self, output_dir):
+        self.folder = os.path.join(output_dir, STORE_FOLDER_NAME)
+
+    def _path(self, tree_sha):
+        return os.path.join(self.folder, f'{tree_sha}.json')
+
+    def load(self, tree_sha, root_folder=None):
+        """
+        Returns the stored (graph, file to functions) of the tree, or None.
+        With `root_folder`, the paths are moved under it if the analysis was stored under another root.
+        """
+        path = self._path(tree_sha)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != STORE_VERSION or data.get('tree_sha') != tree_sha:
+            return None
+        os.utime(path)
+        graph, file_to_functions = data['graph'], data['file_to_functions']
+        stored_root = data.get('root_folder')
+        if root_folder is not None and stored_root is not None and stored_root != root_folder:
+            graph = rebase_graph(graph, stored_root, root_folder)
+            file_to_functions = {file.replace(stored_root, root_folder):
+                                 [function.replace(stored_root, root_folder) for function in functions]
+                                 for file, functions in file_to_functions.items()}
+        return graph, file_to_functions
+
+    def save(self, tree_sha, graph, file_to_functions, root_folder=None):
+        """
+        Stores the analysis of the tree, taken under `root_folder`, replacing the file atomically,
+        and prunes the oldest trees.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(tree_sha)
+        data = {
+            'version': STORE_VERSION,
+            'tree_sha': tree_sha,
+            'root_folder': root_folder,
+            'graph': graph,
+            'file_to_functions': file_to_functions,
+        }
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        os.replace(path + '.tmp', path)
+        self._prune()
+
+    def _prune(self):
+        paths = [os.path.join(self.folder, name) for name in os.listdir(self.folder) if name.endswith('.json')]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[MAX_STORED_TREES:]:
+            os.remove(path)
+
+
+def load_call_graph(root_folder, output_folder, base_tree_sha=None, changed_files=(), deleted_files=()) -> tuple:
+    """
+    Returns the (graph, file to functions) of the repository.
+    The stored analysis of the current tree SHA is reused. Otherwise, if the analysis of
+    `base_tree_sha` (e.g. the main branch) is stored, it is updated for the files changed and deleted
+    since that tree; else the repository is parsed with code2flow.
+    The result is stored for the next run.
+    """
+    tree_sha = get_git_tree_sha(root_folder)
+    store = AnalysisStore(output_folder)
+    root = os.path.abspath(root_folder)
+    if tree_sha is not None:
+        stored = store.load(tree_sha, root)
+        if stored is not None:
+            return stored
+    # The changed files are only known relative to a committed tree
+    base = store.load(base_tree_sha, root) if base_tree_sha is not None and tree_sha is not None else None
+    if base is not None:
+        graph = update_call_graph(base[0], root_folder, changed_files, deleted_files, output_folder)
+    else:
+        code2flow_utils.generate_graph(root_folder, output_folder)
+        graph = code2flow_utils.get_call_graph(output_folder)
+    file_to_functions = code2flow_utils.get_file_to_functions(graph)
+    if tree_sha is not None:
+        store.save(tree_sha, graph, file_to_functions, root)
+    return graph, file_to_functions
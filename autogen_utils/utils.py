@@ -1,8 +1,10 @@
 import os
 from autogen import AssistantAgent, UserProxyAgent
 from repo_documentation.prompt import DOCUMENTATION_PROMPT, \
-    DOCUMENTATION_UPDATE_PROMPT, USR_PROMPT, PARENT_UPDATE, COMENT_UPDATE
+    DOCUMENTATION_UPDATE_PROMPT, USR_PROMPT, PARENT_UPDATE, COMENT_UPDATE, SECTION_UPDATE
 from repo_documentation import utils
+from llm_utils.rate_limiter import throttle_agent
+from llm_utils.response_cache import get_response_cache
 from . import config
 
 def get_documentation(file_path,
@@ -36,9 +38,9 @@ def get_documentation(file_path,
         additional_docs=additional_docs
     )
     
-    initiate_chat(user, assistant, prompt_message)
+    response = cached_chat(user, assistant, prompt_message, output_dir)
     
-    clean_out = assistant.last_message()['content'].replace('```html', '').replace('```', '').strip()
+    clean_out = response.replace('```html', '').replace('```', '').strip()
     
     if save_debug:
         utils.save_prompt_debug(
@@ -58,9 +60,11 @@ def get_updated_documentation(file_path,
                              user,
                              assistant,
                              output_dir,
-                             save_debug=False):
+                             save_debug=False,
+                             sections=None):
     """
     Update the file documentation using the old docs, diffs, and additional docs.
+    With `sections`, only these sections of the documentation are given and returned.
 
     Args:
         file_path (str): The path of the file being updated.
@@ -73,6 +77,7 @@ def get_updated_documentation(file_path,
         assistant (Assistant): The assistant object used for communication.
         output_dir (str): The directory to save debug information.
         save_debug (bool, optional): Whether to save debug information. Defaults to False.
+        sections (list, optional): The names of the sections to update. Defaults to the whole documentation.
 
     Returns:
         str: The content of the last message from the assistant.
@@ -85,58 +90,65 @@ def get_updated_documentation(file_path,
         diff=diff,
         changes=changes
     )
-    initiate_chat(user, assistant, prompt_message)
+    if sections:
+        prompt_message += SECTION_UPDATE.format(sections=', '.join(sections))
+    response = cached_chat(user, assistant, prompt_message, output_dir)
     if save_debug:
         utils.save_prompt_debug(
             output_dir, file_path, prompt_message, utils.Mode.UPDATE)
-    return assistant.last_message()['content']
+    return response
 
 
 def get_updated_parent_documentation(file_path,
                              updated_functions,
                              additional_docs,
-                             new_content,
                              functions,
                              parent_content,
                              old_parent_docs,
                              user,
                              assistant,
                              output_dir,
-                             save_debug=False):
+                             save_debug=False,
+                             sections=None):
     """
     Update the parent file documentation using the filtered changes, new content, functions, and old documentation.
+    With `sections`, only these sections of the documentation are given and returned.
 
     Args:
         file_path (str): The path of the parent file being updated.
-        updated_functions (dict): The mapping of functions to their change contents.
-        new_content (str): The new content of the parent file.
-        functions (str): The functions within the parent file that are affected by the changes.
+        updated_functions (dict): The mapping of the changed files to their changed functions.
+        additional_docs (str): The documentation of the callee functions.
+        functions (list): The functions within the parent file that are affected by the changes.
         parent_content (str): The content of the parent file.
         old_parent_docs (str): The old documentation of the parent file.
         user (UserProxyAgent): The user interacting with the assistant.
         assistant (AssistantAgent): The assistant object used for communication.
         output_dir (str): The directory to save debug information.
         save_debug (bool, optional): Whether to save debug information. Defaults to False.
+        sections (list, optional): The names of the sections to update. Defaults to the whole documentation.
 
     Returns:
         str: The content of the last message from the assistant.
     """
-    # Convert the updated functions to a string
+    # Convert the updated functions to a string, one line per changed file
+    updated_function_contents = '\n'.join(
+        f'{path}: {", ".join(names)}' for path, names in updated_functions.items())
 
     prompt_message = PARENT_UPDATE.format(
-        updated_function_contents=updated_functions,
+        updated_function_contents=updated_function_contents,
         additional_docs=additional_docs,
-        new_content=new_content,
         path=file_path,
-        functions=functions,
+        functions=', '.join(functions),
         parent_content=parent_content,
         old_parent_docs = old_parent_docs
     )
-    initiate_chat(user, assistant, prompt_message)
+    if sections:
+        prompt_message += SECTION_UPDATE.format(sections=', '.join(sections))
+    response = cached_chat(user, assistant, prompt_message, output_dir)
     if save_debug:
         utils.save_prompt_debug(
             output_dir, file_path, prompt_message, utils.Mode.UPDATE)
-    return assistant.last_message()['content']
+    return response
 
 def get_updated_commit_documentation(file_path,
                              comment,
@@ -168,20 +180,21 @@ def get_updated_commit_documentation(file_path,
         file_content=file_content,
         old_file_docs=old_file_docs,
     )
-    initiate_chat(user, assistant, prompt_message)
+    response = cached_chat(user, assistant, prompt_message, output_dir)
     if save_debug:
         utils.save_prompt_debug(
             output_dir, file_path, prompt_message, utils.Mode.UPDATE)
-    return assistant.last_message()['content']
+    return response
 
 def load_assistant_agent():
     # Load the assistant agent for LLM-based documentation generation
-    return AssistantAgent(
+    # Its replies are admitted by the shared rate limiter before reaching the LLM
+    return throttle_agent(AssistantAgent(
         name="assistant",
         system_message=USR_PROMPT,
         llm_config=config.llm_config,
         human_input_mode="NEVER"
-    )
+    ))
 
 
 def load_user_agent():
@@ -201,5 +214,26 @@ def initiate_chat(user: UserProxyAgent, assistant, prompt):
     )
 
 
+def cached_chat(user: UserProxyAgent, assistant, prompt, output_dir):
+    """
+    Returns the assistant's reply to the prompt.
+    The reply is looked up in the persistent response cache first, so prompts that
+    have been answered before (e.g. in a previous run) do not reach the LLM again.
+    """
+    cache = get_response_cache(output_dir)
+    key = cache.key(config.llm_config.get('model'),
+                    config.llm_config.get('temperature'),
+                    str(assistant.system_message),
+                    prompt)
+    response = cache.get(key)
+    if response is None:
+        initiate_chat(user, assistant, prompt)
+        response = last_message(assistant)
+        # A tool call or an empty reply has no content to reuse
+        if response:
+            cache.put(key, response)
+    return response
+
+
 def last_message(assistant):
     return assistant.last_message()['content']
@@ -1,7 +1,19 @@
 import os
 from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from llm_utils.rate_limiter import rate_limiter
+from llm_utils.tokens import count_message_tokens
 
-azure_chat_completion_service = AzureChatCompletion(
+class RateLimitedAzureChatCompletion(AzureChatCompletion):
+  """
+  Azure chat completion service whose requests are admitted by the shared rate limiter.
+  Every kernel invocation, including the automatic function calling rounds, goes through `_send_request`.
+  """
+  async def _send_request(self, request_settings):
+    tokens = count_message_tokens(getattr(request_settings, "messages", None) or [])
+    await rate_limiter.acquire_async(tokens + (getattr(request_settings, "max_tokens", None) or 0))
+    return await super()._send_request(request_settings)
+
+azure_chat_completion_service = RateLimitedAzureChatCompletion(
   deployment_name=os.getenv("CHAT_DEPLOYMENT_NAME"),
   api_key=os.getenv("AZURE_OPENAI_API_KEY"),
   endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
@@ -15,4 +27,4 @@ autogen_llm_config = dict(
   api_type=os.getenv("API_TYPE"),
   api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
   temperature=0
-)
\ No newline at end of file
+)
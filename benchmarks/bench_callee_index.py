@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import random
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from code2flow.code2flow import utils as code2flow_utils
+from analysis.callee_index import CalleeIndex
+from llm_utils.tokens import count_tokens
+
+"""
+Microbenchmark: callee context of every file, per-prompt BFS (legacy) vs. the precomputed CalleeIndex.
+
+Usage: python benchmarks/bench_callee_index.py --functions 40000 --files 4000
+"""
+
+
+def legacy_get_additional_docs_path(file_path, graph, bfs_explore, max_depth=5):
+    """
+    The prompt assembly before the index: the file map is rebuilt on every call, and a fresh
+    BFS with list.pop(0) and string concatenation runs for every function of the file.
+    """
+    additional_docs = ""
+    file_to_calls = code2flow_utils.get_file_to_functions(graph)
+    if file_path not in file_to_calls:
+        return additional_docs
+    processed_callees = set()
+    for call_name in file_to_calls[file_path]:
+        if 'EXTERNAL' in graph[call_name]['file_name']:
+            continue
+        queue = [(call_name, 0)]
+        visited = set()
+        while queue:
+            current_call, depth = queue.pop(0)
+            if depth > max_depth or current_call in visited:
+                continue
+            visited.add(current_call)
+            caller_file = graph[current_call]['file_name']
+            for callee in bfs_explore.get(current_call, []):
+                callee_call = graph[callee]
+                callee_file = callee_call['file_name']
+                if 'EXTERNAL' not in callee_file and callee not in processed_callees and caller_file != callee_file:
+                    additional_docs += f"\nFunction/Class {callee_call['name']}:\n{callee_call['content']}\n"
+                    processed_callees.add(callee)
+                if depth < max_depth and callee not in visited:
+                    queue.append((callee, depth + 1))
+    return additional_docs
+
+
+def make_graph(functions, files, fan_out, seed=0):
+    """
+    Returns a random call graph and its BFS exploration (direct callees only).
+    """
+    rng = random.Random(seed)
+    graph = {}
+    for i in range(functions):
+        name = f'func{i}'
+        body = '\n'.join(f'    x{j} = {j}' for j in range(rng.randint(2, 30)))
+        graph[name] = {
+            'name': name,
+            'file_name': f'pkg/module{i % files}.py',
+            'content': f'def {name}():\n    """Function {i}."""\n{body}',
+            'callers': [],
+            'callees': [],
+        }
+    bfs_explore = {}
+    for i in range(functions):
+        callees = [f'func{rng.randrange(functions)}' for _ in range(rng.randint(0, fan_out))]
+        graph[f'func{i}']['callees'] = callees
+        bfs_explore[f'func{i}'] = {callee: {} for callee in callees}
+    return graph, bfs_explore
+
+
+def measure(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {elapsed:10.3f}s')
+    return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark callee context assembly')
+    parser.add_argument('--functions', type=int, default=4000)
+    parser.add_argument('--files', type=int, default=400)
+    parser.add_argument('--fan-out', type=int, default=3)
+    parser.add_argument('--budget', type=int, default=4000)
+    args = parser.parse_args()
+
+    graph, bfs_explore = make_graph(args.functions, args.files, args.fan_out)
+    files = sorted({node['file_name'] for node in graph.values()})
+    print(f'{args.functions} functions, {len(files)} files, fan-out <= {args.fan_out}')
+    count_tokens('')  # load the tokenizer outside of the measurements
+
+    legacy, _ = measure('legacy (BFS per prompt)',
+                        lambda: [legacy_get_additional_docs_path(f, graph, bfs_explore) for f in files])
+    index = CalleeIndex(graph, bfs_explore)
+    build, _ = measure('index build (once per graph)', index.build)
+    lookup, _ = measure('index lookups (all files)',
+                        lambda: [index.get_context(f, args.budget) for f in files])
+    again, _ = measure('index lookups again (memoized)',
+                       lambda: [index.get_context(f, args.budget) for f in files])
+    print(f'speedup, first pass: {legacy / (build + lookup):.1f}x; repeated prompts: {legacy / again:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from collections import deque
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analysis.compact_graph import CompactCallGraph
+from bench_callee_index import make_graph
+
+"""
+Microbenchmark: memory and traversal time of the dict call graph vs. the CompactCallGraph.
+
+Usage: python benchmarks/bench_compact_graph.py --functions 100000 --files 5000
+"""
+
+
+def write_sources(graph, root):
+    """
+    Writes the function bodies of the graph to their source files under `root`.
+    """
+    sources = {}
+    for node in graph.values():
+        sources.setdefault(node['file_name'], []).append(node['content'])
+    for file_name, contents in sources.items():
+        path = os.path.join(root, file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n\n'.join(contents))
+
+
+def dict_reachable(graph, sources):
+    visited = set(sources)
+    queue = deque(sources)
+    while queue:
+        for callee in graph[queue.popleft()]['callees']:
+            if callee not in visited:
+                visited.add(callee)
+                queue.append(callee)
+    return visited
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def measure(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {elapsed:10.3f}s')
+    return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the compact call graph')
+    parser.add_argument('--functions', type=int, default=20000)
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--fan-out', type=int, default=3)
+    parser.add_argument('--sources', type=int, default=200)
+    args = parser.parse_args()
+
+    dict_size, (graph, _) = measure_memory(lambda: make_graph(args.functions, args.files, args.fan_out))
+    for node in graph.values():
+        for callee in node['callees']:
+            graph[callee]['callers'].append(node['name'])
+    sources = [f'func{i}' for i in range(0, args.functions, max(1, args.functions // args.sources))]
+
+    with tempfile.TemporaryDirectory() as root:
+        write_sources(graph, root)
+        compact_size, compact = measure_memory(lambda: CompactCallGraph(graph, root))
+        print(f'{args.functions} functions, {args.files} files, fan-out <= {args.fan_out}')
+        print(f'{"dict graph memory":<40} {dict_size / 2**20:9.1f}MB')
+        print(f'{"compact graph memory":<40} {compact_size / 2**20:9.1f}MB')
+        legacy, expected = measure('dict reachability', lambda: [dict_reachable(graph, [s]) for s in sources])
+        fast, result = measure('compact reachability', lambda: [compact.reachable([s]) for s in sources])
+        assert result == expected
+        print(f'memory: {dict_size / compact_size:.1f}x smaller; traversal: {legacy / fast:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
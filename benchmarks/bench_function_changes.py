@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from code2flow.code2flow.ast_utils import _get_similarity
+from analysis.function_changes import get_function_changes, get_functions_from_content
+
+"""
+Microbenchmark: rename detection for a refactor renaming every function of a file,
+exhaustive pairwise similarity (legacy) vs. the MinHash shortlist.
+
+Usage: python benchmarks/bench_function_changes.py --functions 500
+"""
+
+
+def make_function(name, i):
+    return (f'def {name}(items, limit={i}):\n'
+            f'    total = {i}\n'
+            f'    for item in items[:limit]:\n'
+            f'        total += item.value_{i} * {i % 7}\n'
+            f'    return total - offset_{i}\n')
+
+
+def legacy_renames(old_content, new_content):
+    """
+    The exact similarity of every removed function against every added function.
+    """
+    old_functions = get_functions_from_content(old_content)
+    new_functions = get_functions_from_content(new_content)
+    added = [name for name in new_functions if name not in old_functions]
+    renames = 0
+    for name, content in old_functions.items():
+        if name in new_functions:
+            continue
+        scores = [(_get_similarity(content, new_functions[new_name]), new_name) for new_name in added]
+        if scores and max(scores)[0] >= 0.8:
+            added.remove(max(scores)[1])
+            renames += 1
+    return renames
+
+
+def measure(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {elapsed:10.3f}s')
+    return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rename detection')
+    parser.add_argument('--functions', type=int, default=300)
+    args = parser.parse_args()
+
+    old = '\n'.join(make_function(f'old{i}', i) for i in range(args.functions))
+    new = '\n'.join(make_function(f'new{i}', i) for i in range(args.functions))
+    print(f'{args.functions} renamed functions')
+    legacy, expected = measure('exhaustive similarity', lambda: legacy_renames(old, new))
+    fast, changes = measure('MinHash shortlist', lambda: get_function_changes('bench.py', old, new))
+    assert sum(change.type.name == 'RENAMED' for change in changes) == expected
+    print(f'speedup: {legacy / fast:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
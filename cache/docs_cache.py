@@ -19,18 +19,21 @@ class DocsCache():
     def __str__(self) -> str:
         return str(self.__cache)
 
-    def add(self, source_path, source_content, gen_docs_path):
+    def add(self, source_path, source_content, gen_docs_path, mtime_ns=None):
         self.__cache[source_path] = Document(
-            source_path, source_content, gen_docs_path)
+            source_path, source_content, gen_docs_path, mtime_ns)
+
+    def put(self, doc: Document):
+        self.__cache[doc.source_file_path] = doc
 
     def get(self, key: str) -> Document:
         return self.__cache.get(key, None)
 
-    def update_docs(self, path, content, gen_docs_path):
+    def update_docs(self, path, content, gen_docs_path, mtime_ns=None):
         if path not in self.__cache:
-            self.add(path, content, gen_docs_path)
+            self.add(path, content, gen_docs_path, mtime_ns)
         else:
-            self.get(path).update(path, content, gen_docs_path)
+            self.get(path).update(path, content, gen_docs_path, mtime_ns)
 
     def remove(self, key: str):
         if key in self.__cache:
@@ -42,6 +45,9 @@ class DocsCache():
     def size(self) -> int:
         return len(self.__cache)
 
+    def items(self) -> list:
+        return list(self.__cache.items())
+
     def to_dict(self) -> dict:
         result = {}
         for key, value in self.__cache.items():
@@ -4,10 +4,14 @@ import hashlib
 class Document():
     """
     Represents a document with source file path, generated docs path, and other attributes.
+    Besides the content hash, it records the git blob SHA and the size of the content, and the
+    mtime of the source file, so that an unchanged file is detected without reading it
+    (see `cache.run_journal.is_up_to_date`).
 
     Args:
         source_file_path (str): The path of the source file.
         generated_docs_path (str): The path where the generated docs will be stored.
+        mtime_ns (int): The mtime of the source file when its content was read, if it was read from disk.
     """
 
     @staticmethod
@@ -17,23 +21,40 @@ class Document():
         doc.source_file_hash = data['source_file_hash']
         doc.generated_docs_path = data['generated_docs_path']
         doc.modified_on = data['modified_on']
+        # Not recorded by older caches
+        doc.blob_sha = data.get('blob_sha')
+        doc.size = data.get('size')
+        doc.mtime_ns = data.get('mtime_ns')
         return doc
 
-    def __init__(self, source_file_path, source_file_content, generated_docs_path):
+    def __init__(self, source_file_path, source_file_content, generated_docs_path, mtime_ns=None):
         self.source_file_path = source_file_path
         self.source_file_hash = sha256_hash(source_file_content) if source_file_content else ''
         self.generated_docs_path = generated_docs_path
         self.modified_on = self.__timestamp()
+        self.blob_sha = git_blob_sha(source_file_content) if source_file_content is not None else None
+        self.size = len(source_file_content.encode('utf-8')) if source_file_content is not None else None
+        self.mtime_ns = mtime_ns
 
     def __timestamp(self):
         return datetime.datetime.now().isoformat()
     
-    def update(self, path, content, generated_docs_path):
+    def update(self, path, content, generated_docs_path, mtime_ns=None):
         self.source_file_path = path
         self.source_file_hash = sha256_hash(content)
         self.generated_docs_path = generated_docs_path
         self.modified_on = self.__timestamp()
+        self.blob_sha = git_blob_sha(content)
+        self.size = len(content.encode('utf-8'))
+        self.mtime_ns = mtime_ns
         print(f'Cache updated for {self.source_file_path} at {self.modified_on}')
 
 def sha256_hash(content : str):
-    return hashlib.sha256(content.encode('utf-8')).hexdigest()
\ No newline at end of file
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def git_blob_sha(content : str):
+    """
+    Returns the SHA of the git blob of the content, as listed by `git ls-files -s` and `git ls-tree`.
+    """
+    data = content.encode('utf-8')
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
\ No newline at end of file
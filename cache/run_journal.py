@@ -0,0 +1,96 @@
+import os
+import json
+import threading
+from cache.document import Document, sha256_hash
+
+"""
+A journal of the files completed by a documentation run, so that an interrupted run can be resumed.
+"""
+
+JOURNAL_FILE_NAME = 'run_journal.jsonl'
+
+
+class RunJournal():
+    """
+    An append-only JSON lines file with one cached `Document` per completed file.
+    Every record is flushed and fsynced before `record` returns, so a crash loses at most
+    the file being written; a torn last line is ignored when the journal is loaded.
+
+    Args:
+        output_dir (str): The docs output directory where the journal is stored.
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, JOURNAL_FILE_NAME)
+        self.__lock = threading.Lock()
+
+    def load(self) -> dict:
+        """
+        Returns a dict mapping: (source file path, Document) of the completed files.
+        """
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    doc = Document.from_dict(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+                completed[doc.source_file_path] = doc
+        return completed
+
+    def record(self, source_path, source_content, gen_docs_path, mtime_ns=None):
+        """
+        Appends a completed file to the journal.
+        """
+        self.put(Document(source_path, source_content, gen_docs_path, mtime_ns))
+
+    def put(self, doc: Document):
+        """
+        Appends the cached document of a completed file to the journal.
+        """
+        line = json.dumps(doc.__dict__) + '\n'
+        with self.__lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+
+    def clear(self):
+        """
+        Removes the journal, e.g. when a run starts from scratch or has completed.
+        """
+        with self.__lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def is_completed(doc: Document, source_content) -> bool:
+    """
+    Returns True if the journaled document is still valid for the current file content.
+    """
+    return doc is not None \
+        and doc.source_file_hash == sha256_hash(source_content) \
+        and os.path.exists(doc.generated_docs_path)
+
+
+def is_up_to_date(doc: Document, file_path, blob_sha=None) -> bool:
+    """
+    Returns True if the document is still valid for the file, reading the file only if needed:
+    a matching git blob SHA (e.g. from `git ls-files -s`) or a matching size and mtime
+    is enough, otherwise the content hash is compared.
+    """
+    if doc is None or not os.path.exists(doc.generated_docs_path):
+        return False
+    if blob_sha is not None and blob_sha == doc.blob_sha:
+        return True
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    if doc.mtime_ns is not None and (stat.st_size, stat.st_mtime_ns) == (doc.size, doc.mtime_ns):
+        return True
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return is_completed(doc, file.read())
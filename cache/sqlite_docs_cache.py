@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from cache.document import Document
+
+"""
+A DocsCache backend on SQLite, so that every cache write is a single-row transaction
+instead of a rewrite of the whole `cache.json`.
+"""
+
+CACHE_DB_NAME = 'cache.db'
+
+_COLUMNS = ('source_file_path', 'source_file_hash', 'generated_docs_path', 'modified_on',
+            'blob_sha', 'size', 'mtime_ns')
+_INSERT = f'INSERT OR REPLACE INTO documents VALUES ({", ".join("?" * len(_COLUMNS))})'
+# The key of the hash of the `cache.json` last exported or imported, in the `meta` table
+_JSON_HASH = 'json_hash'
+
+
+def _file_hash(path) -> str:
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class SqliteDocsCache():
+    """
+    A cache mapping project file paths to their documentation, with the API of `DocsCache`.
+    The database is in WAL mode: readers do not block the writer, a crash never leaves a partial
+    write behind, and parallel workers (threads or processes) can share it. Each thread uses
+    its own connection.
+
+    Args:
+        db_path (str): The path of the SQLite database (created if it does not exist).
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.__local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS documents ('
+                               'source_file_path TEXT PRIMARY KEY, '
+                               'source_file_hash TEXT NOT NULL, '
+                               'generated_docs_path TEXT, '
+                               'modified_on TEXT NOT NULL, '
+                               'blob_sha TEXT, '
+                               'size INTEGER, '
+                               'mtime_ns INTEGER)')
+            connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self.__local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.__local.connection = connection
+        return connection
+
+    def __str__(self) -> str:
+        return str(dict(self.items()))
+
+    def put(self, doc: Document):
+        with self._connection() as connection:
+            connection.execute(_INSERT, tuple(getattr(doc, column) for column in _COLUMNS))
+
+    def add(self, source_path, source_content, gen_docs_path, mtime_ns=None):
+        self.put(Document(source_path, source_content, gen_docs_path, mtime_ns))
+
+    def get(self, key: str) -> Document:
+        row = self._connection().execute(
+            'SELECT * FROM documents WHERE source_file_path = ?', (key,)).fetchone()
+        return Document.from_dict(dict(zip(_COLUMNS, row))) if row else None
+
+    def update_docs(self, path, content, gen_docs_path, mtime_ns=None):
+        doc = Document(path, None, None)
+        doc.update(path, content, gen_docs_path, mtime_ns)
+        self.put(doc)
+
+    def remove(self, key: str):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM documents WHERE source_file_path = ?', (key,))
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM documents')
+
+    def size(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def items(self) -> list:
+        rows = self._connection().execute('SELECT * FROM documents ORDER BY rowid').fetchall()
+        return [(row[0], Document.from_dict(dict(zip(_COLUMNS, row)))) for row in rows]
+
+    def to_dict(self) -> dict:
+        return {key: value.__dict__ for key, value in self.items()}
+
+    def replace(self, items):
+        """
+        Replaces the content of the cache with the (path, Document) items, in one transaction.
+        """
+        with self._connection() as connection:
+            connection.execute('DELETE FROM documents')
+            connection.executemany(_INSERT, [tuple(getattr(doc, column) for column in _COLUMNS) for _, doc in items])
+
+    def export_json(self, json_path):
+        """
+        Writes the cache in the legacy `cache.json` format (atomically), and records its hash.
+        """
+        tmp_path = f'{json_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=4)
+        json_hash = _file_hash(tmp_path)
+        os.replace(tmp_path, json_path)
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (_JSON_HASH, json_hash))
+
+    def import_json(self, json_path):
+        """
+        Replaces the content of the cache with a `cache.json`, in one transaction, and records its hash.
+        """
+        with open(json_path, 'r', encoding='utf-8') as file:
+            docs = [Document.from_dict(value) for value in json.load(file).values()]
+        json_hash = _file_hash(json_path)
+        with self._connection() as connection:
+            connection.execute('DELETE FROM documents')
+            connection.executemany(_INSERT, [tuple(getattr(doc, column) for column in _COLUMNS) for doc in docs])
+            connection.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (_JSON_HASH, json_hash))
+
+    def is_json_changed(self, json_path) -> bool:
+        """
+        Returns whether the `cache.json` differs from the one last exported or imported, e.g. after a pull.
+        """
+        row = self._connection().execute('SELECT value FROM meta WHERE key = ?', (_JSON_HASH,)).fetchone()
+        return row is None or row[0] != _file_hash(json_path)
+
+    def close(self):
+        """
+        Closes the connection of the current thread.
+        """
+        connection = getattr(self.__local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.__local.connection = None
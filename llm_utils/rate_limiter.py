@@ -0,0 +1,112 @@
+import os
+import time
+import asyncio
+import threading
+from llm_utils.tokens import count_tokens, count_message_tokens
+
+"""
+A shared scheduler that admits LLM requests under the requests-per-minute (RPM)
+and tokens-per-minute (TPM) quota of the Azure OpenAI deployment.
+"""
+
+
+class TokenBucket():
+    """
+    A bucket holding up to `capacity` units, refilled continuously at `capacity` units per minute.
+    The level may go negative: a reservation that cannot be served yet is queued behind
+    the earlier ones, and the caller waits until the bucket has refilled enough.
+    """
+
+    def __init__(self, capacity_per_minute):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self, amount, now) -> float:
+        """
+        Takes `amount` units from the bucket and returns the seconds to wait before they are available.
+        """
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        # A single request larger than the whole budget can only wait for a full bucket
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter():
+    """
+    Admits requests under both the RPM and the TPM budget.
+    A budget set to None is not limited. Requests are admitted in the order they are made,
+    which gives a steady throughput instead of bursts followed by 429 backoffs.
+    """
+
+    @staticmethod
+    def from_env():
+        """
+        Creates a limiter from the AZURE_OPENAI_RPM and AZURE_OPENAI_TPM environment variables.
+        """
+        rpm = os.getenv('AZURE_OPENAI_RPM')
+        tpm = os.getenv('AZURE_OPENAI_TPM')
+        return RateLimiter(int(rpm) if rpm else None, int(tpm) if tpm else None)
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.__requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.__tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.__lock = threading.Lock()
+        self.requests = 0
+        self.tokens = 0
+        self.waited = 0.0
+
+    def reserve(self, tokens) -> float:
+        """
+        Reserves one request and `tokens` tokens, returning the seconds to wait before dispatching.
+        """
+        with self.__lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.__requests:
+                wait = max(wait, self.__requests.reserve(1, now))
+            if self.__tokens:
+                wait = max(wait, self.__tokens.reserve(tokens, now))
+            self.requests += 1
+            self.tokens += tokens
+            self.waited += wait
+            return wait
+
+    def acquire(self, tokens=0) -> float:
+        """
+        Blocks the current thread until the request is admitted.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=0) -> float:
+        """
+        Suspends the current coroutine until the request is admitted.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+def throttle_agent(agent, limiter=None):
+    """
+    Registers a hook on an autogen agent, so that each LLM reply it generates is admitted by the limiter first.
+    The prompt size is estimated from the system message and the conversation sent to the model.
+    """
+    limiter = limiter or rate_limiter
+
+    def admit(messages):
+        limiter.acquire(count_message_tokens(messages) + count_tokens(agent.system_message))
+        return messages
+
+    agent.register_hook('process_all_messages_before_reply', admit)
+    return agent
+
+
+# The limiter shared by every LLM call path of the process
+rate_limiter = RateLimiter.from_env()
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+"""
+A persistent, content-addressed cache of LLM responses.
+Responses are keyed by a hash of everything that determines them (deployment, temperature,
+system prompt and prompt), so reruns on unchanged input do not pay for the same prompt twice.
+"""
+
+CACHE_FILE_NAME = 'llm_cache.sqlite'
+DEFAULT_MAX_SIZE_MB = 256
+
+
+class ResponseCache():
+    """
+    An on-disk LRU cache stored in SQLite, bounded by the total size of the cached responses.
+
+    Args:
+        path (str): The path of the SQLite database file.
+        max_size (int): The maximum total size of the cached responses in bytes.
+    """
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE_MB * 1024 * 1024):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)')
+        self.__connection.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)')
+        self.__connection.commit()
+        self.__size = self.__connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def key(model, temperature, system_prompt, prompt) -> str:
+        """
+        Returns the content address of a request.
+        """
+        payload = json.dumps([model, temperature, system_prompt, prompt], default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached response, or None if the request has not been seen before.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT response FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.__connection.execute(
+                'UPDATE responses SET last_used = ? WHERE key = ?', (time.time(), key))
+            self.__connection.commit()
+            return row[0]
+
+    def put(self, key, response):
+        """
+        Stores a response and evicts the least recently used ones if the cache grows over its size bound.
+        """
+        size = len(response.encode('utf-8'))
+        with self.__lock:
+            previous = self.__connection.execute(
+                'SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)',
+                (key, response, size, time.time()))
+            self.__size += size - (previous[0] if previous else 0)
+            self.__evict()
+            self.__connection.commit()
+
+    def __evict(self):
+        while self.__size > self.max_size:
+            row = self.__connection.execute(
+                'SELECT key, size FROM responses ORDER BY last_used LIMIT 1').fetchone()
+            if row is None:
+                break
+            self.__connection.execute('DELETE FROM responses WHERE key = ?', (row[0],))
+            self.__size -= row[1]
+
+    def size(self) -> int:
+        return self.__size
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': self.__size}
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+
+__caches = {}
+__caches_lock = threading.Lock()
+
+
+def get_response_cache(output_dir) -> ResponseCache:
+    """
+    Returns the response cache shared by the process for the output directory.
+    The size bound is read from the LLM_CACHE_MAX_SIZE_MB environment variable.
+    """
+    path = os.path.abspath(os.path.join(output_dir, CACHE_FILE_NAME))
+    with __caches_lock:
+        if path not in __caches:
+            max_size_mb = int(os.getenv('LLM_CACHE_MAX_SIZE_MB') or DEFAULT_MAX_SIZE_MB)
+            __caches[path] = ResponseCache(path, max_size_mb * 1024 * 1024)
+        return __caches[path]
@@ -0,0 +1,46 @@
+import os
+from functools import lru_cache
+
+# Rough number of characters per token, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+# Extra tokens the chat format adds around every message
+TOKENS_PER_MESSAGE = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model):
+    """
+    Returns the tiktoken encoding of the model, or None if tiktoken or its encoding files are not available.
+    """
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('cl100k_base')
+    except Exception:
+        return None
+
+
+def count_tokens(text, model=None) -> int:
+    """
+    Returns the number of tokens of the text for the chat deployment.
+    Falls back to a character based estimate if the tokenizer cannot be loaded.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model or os.getenv('CHAT_DEPLOYMENT_NAME') or 'gpt-4')
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model=None) -> int:
+    """
+    Returns the number of prompt tokens of a list of chat messages (dicts with a `content` key).
+    """
+    total = 0
+    for message in messages:
+        content = message.get('content') if isinstance(message, dict) else message
+        total += TOKENS_PER_MESSAGE + count_tokens(content if isinstance(content, str) else str(content or ''), model)
+    return total
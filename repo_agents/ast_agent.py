@@ -1,6 +1,6 @@
 import os
-from code2flow.code2flow import utils as graph_utils
-from repo_documentation.utils import get_additional_docs_calls
+from analysis.snapshot import get_analysis_snapshot
+from analysis.scheduling import get_generation_levels
 
 class ASTAgent:
   """
@@ -9,21 +9,29 @@ class ASTAgent:
   def __init__(self) -> None:
     self.root_folder = os.path.abspath(os.getenv("ROOT_FOLDER"))
     self.output_folder = os.path.join(self.root_folder, "docs_output")
-    graph_utils.generate_graph(self.root_folder, self.output_folder)
-    self.graph = graph_utils.get_call_graph(self.output_folder)
-    self.file_to_calls = graph_utils.get_file_to_functions(self.graph)
-    self.bfs_explore = graph_utils.explore_call_graph(self.graph)
+    # The repository is parsed once per process and tree, and shared by all agents and plugins
+    snapshot = get_analysis_snapshot(self.root_folder, self.output_folder)
+    self.graph = snapshot.graph
+    self.file_to_calls = snapshot.file_to_functions
+    self.bfs_explore = snapshot.bfs_explore
+    self.callee_index = snapshot.callee_index
 
   def get_callee_function_info(self, file_path) -> str:
     """
     Returns callee functions in a file
     """
-    calls = self.file_to_calls[file_path]
-    callee_function_info = get_additional_docs_calls(calls, self.graph, self.bfs_explore)
-    return callee_function_info
+    return self.callee_index.get_context(file_path)
   
   def get_file_call_dict(self) -> dict:
     """
     Returns a dict mapping: (file, callee functions)
     """
-    return self.file_to_calls
\ No newline at end of file
+    return self.file_to_calls
+  
+  def get_generation_levels(self) -> list:
+    """
+    Returns the files grouped in dependency levels, leaves first.
+    Files of the same level do not call each other and can be generated in parallel.
+    """
+    files = [file_path for file_path in self.file_to_calls if file_path != 'EXTERNAL']
+    return get_generation_levels(self.graph, files)
\ No newline at end of file
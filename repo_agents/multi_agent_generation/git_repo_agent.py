@@ -47,8 +47,9 @@ class GitRepoAgent:
       GithubInfoPlugin(),
       plugin_name="github_info_plugin",
     )
+    self.documentation_plugin = DocumentationPlugin()
     self.kernel.add_plugin(
-      DocumentationPlugin(),
+      self.documentation_plugin,
       plugin_name="documentation_plugin"
     )
 
@@ -67,14 +68,15 @@ class GitRepoAgent:
     print("Assistant > " + str(result))
     self.history.add_message(result)
 
-  def generate_all_documentation(self) -> None:
+  def generate_all_documentation(self, resume=False, skip_unchanged=False) -> None:
     """
     Generates documentation for all files under the ROOT_FOLDER.
     Alternatively, you can chat with the agent to get your repo information, generate documentation for specified file, and also generate all documentation in one command.
     The chat_with_agent option is recommended for fully manipulating the repo agent.
+    With `resume`, the files completed by an interrupted run are skipped.
+    With `skip_unchanged`, the files whose cached documentation is up to date are skipped.
     """
-    documentation_helper = DocumentationPlugin()
-    documentation_helper.generate_all()
+    self.documentation_plugin.generate_all(resume=resume, skip_unchanged=skip_unchanged)
   
 # Test this agent
 # Note: nested async functions are problematic. (code_context_explanation is never awaited)
@@ -2,6 +2,7 @@ import os
 import asyncio
 from autogen import ConversableAgent, register_function
 import azure_openai_settings as ai_service_settings
+from llm_utils.rate_limiter import throttle_agent
 from repo_agents.multi_agent_generation.code_context_agent import CodeContextAgent
 from repo_agents.multi_agent_generation.prompt import DOCUMENTATION_PROMPT, REVIEWER_PROMPT, REVISOR_PROMPT
 from repo_documentation.utils import Mode, save_prompt_debug, read_file_content
@@ -41,6 +42,10 @@ revise_agent = ConversableAgent(
   human_input_mode="NEVER"
 )
 
+# Every LLM-backed agent shares the process-wide rate limiter
+for agent in (documentation_generation_agent, review_agent, revise_agent):
+  throttle_agent(agent)
+
 agent_manager = ConversableAgent(
   name="agent_manager",
   llm_config=False,
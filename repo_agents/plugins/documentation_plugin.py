@@ -3,7 +3,10 @@ import repo_agents.multi_agent_generation.multi_agent_conversation as mac
 from repo_agents.ast_agent import ASTAgent
 from semantic_kernel.functions import kernel_function
 from cache.docs_cache import DocsCache
-from repo_documentation.utils import save_cache, write_file_docs, read_file_content
+from cache.run_journal import RunJournal, is_up_to_date
+from repo_documentation.utils import save_cache, write_file_docs, read_file_content, get_reusable_docs
+from repo_documentation.git_utils import get_worktree_blob_shas
+from llm_utils.response_cache import get_response_cache
 from typing import Annotated
 
 class DocumentationPlugin:
@@ -12,6 +15,8 @@ class DocumentationPlugin:
     self.output_folder = os.path.join(self.root_folder, "docs_output")
     self.ast_agent = ASTAgent()
     self.cache = DocsCache()
+    self.journal = RunJournal(self.output_folder)
+    self.response_cache = get_response_cache(self.output_folder)
 
   @kernel_function(
     name="generate_documentation_for_file",
@@ -24,30 +29,58 @@ class DocumentationPlugin:
     """
     Generates documentation for a file.
     """
+    # The mtime is taken before the read, so that a later change is never missed
+    mtime_ns = os.stat(file_path).st_mtime_ns
     file_content = read_file_content(file_path)
-    documentation = mac.multi_agent_documentation_generation(file_path)
+    # The conversation is determined by the agents, the file and the callee functions it can look up
+    response_key = self.response_cache.key(
+      mac.ai_service_settings.autogen_llm_config.get("model"),
+      mac.ai_service_settings.autogen_llm_config.get("temperature"),
+      [agent.system_message for agent in (mac.documentation_generation_agent, mac.review_agent, mac.revise_agent)],
+      [file_path, file_content, self.ast_agent.get_callee_function_info(file_path)]
+    )
+    documentation = self.response_cache.get(response_key)
+    if documentation is None:
+      documentation = mac.multi_agent_documentation_generation(file_path)
+      if documentation:
+        self.response_cache.put(response_key, documentation)
     output_path = write_file_docs(
       self.output_folder,
       self.root_folder,
       file_path,
       documentation
     )
-    self.cache.add(file_path, file_content, output_path)
+    self.cache.add(file_path, file_content, output_path, mtime_ns)
 
   @kernel_function(
     name="generate_all_documentation",
     description="Generates documentation for all files under the root folder"
   )
-  def generate_all(self) -> None:
+  def generate_all(
+    self,
+    resume: Annotated[bool, "Whether to skip the files completed by an interrupted run"] = False,
+    skip_unchanged: Annotated[bool, "Whether to skip the files whose documentation is up to date"] = False
+  ) -> None:
     """
     Generates documentation for all files under the root folder.
+    Files are processed in call graph order, so callees are documented before their callers.
+    Every completed file is recorded in the run journal, so that an interrupted run can be resumed.
+    Reusable files are checked with their git blob SHAs (one `git ls-files` pass) and stats first.
     """
-    file_and_callee_function_dict = self.ast_agent.get_file_call_dict()
-    
-    for file_path, callee_functions in file_and_callee_function_dict.items():
-      if file_path == 'EXTERNAL':  # Skip all external functions
-        continue
-
-      self.generate_documentation_for_file(file_path)
+    reusable = get_reusable_docs(self.output_folder, self.journal, resume, skip_unchanged)
+    blob_shas = get_worktree_blob_shas(self.root_folder) if reusable else {}
+    if not resume:
+      self.journal.clear()
+    for level in self.ast_agent.get_generation_levels():
+      for file_path in level:
+        if is_up_to_date(reusable.get(file_path), file_path, blob_shas.get(file_path)):
+          print(f"Skipping {file_path}, documentation is up to date.")
+          self.cache.put(reusable[file_path])
+          continue
+        self.generate_documentation_for_file(file_path)
+        cached = self.cache.get(file_path)
+        self.journal.put(cached)
     
-    save_cache(self.output_folder, self.cache)
\ No newline at end of file
+    save_cache(self.output_folder, self.cache)
+    # The run is complete, nothing left to resume
+    self.journal.clear()
\ No newline at end of file
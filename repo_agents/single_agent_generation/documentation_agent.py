@@ -6,9 +6,23 @@ from semantic_kernel.connectors.ai.open_ai.prompt_execution_settings.azure_chat_
 from repo_agents.single_agent_generation.prompt import DOCUMENTATION_PROMPT
 from repo_agents.ast_agent import ASTAgent
 from cache.docs_cache import DocsCache
+from cache.document import Document
+from cache.run_journal import RunJournal, is_up_to_date
 from repo_documentation import utils as doc_utils
+from repo_documentation.git_utils import get_worktree_blob_shas
+from repo_documentation.doc_sections import merge_documents
+from analysis.chunking import get_chunks
+from llm_utils.response_cache import get_response_cache
 from exceptions import SemanticKernelError
 
+DEFAULT_MAX_CONCURRENCY = 4
+
+def get_max_concurrency() -> int:
+  """
+  Returns the number of LLM requests in flight, read from the MAX_CONCURRENCY environment variable.
+  """
+  return max(1, int(os.getenv("MAX_CONCURRENCY") or DEFAULT_MAX_CONCURRENCY))
+
 class DocumentationAgent:
   """
   This agent generates documentation for file(s).
@@ -19,6 +33,8 @@ class DocumentationAgent:
     self.output_folder = os.path.join(self.root_folder, "docs_output")
     self.ast_agent = ASTAgent()
     self.cache = DocsCache()
+    self.journal = RunJournal(self.output_folder)
+    self.response_cache = get_response_cache(self.output_folder)
     # Semantic kernel args
     self.kernel = Kernel()
     self.kernel.add_service(ai_service_settings.azure_chat_completion_service)
@@ -30,15 +46,71 @@ class DocumentationAgent:
     """
     Generate documentation for a file using LLM and save to the output folder.
     """
+    semaphore = asyncio.Semaphore(get_max_concurrency())
+    file_content, output_path, mtime_ns = await self._generate_documentation(file_path, semaphore, save_debug)
+    # Save the cache
+    self.cache.add(file_path, file_content, output_path, mtime_ns)
+
+  async def _generate_documentation(self, file_path, semaphore, save_debug=False) -> tuple:
+    """
+    Generates and writes the documentation of a file without touching the cache.
+    Returns (file_content, output_path, mtime_ns), so that the caller decides when the cache is updated.
+    A large file is documented chunk by chunk, concurrently, and the documentation of the chunks is merged.
+    Every LLM request holds the semaphore, which bounds the requests in flight across files and chunks.
+    """
     file_name = os.path.basename(file_path)
+    # The mtime is taken before the read, so that a later change is never missed
+    mtime_ns = os.stat(file_path).st_mtime_ns
     file_content = doc_utils.read_file_content(file_path)
     callee_functions = self.ast_agent.get_callee_function_info(file_path)
-    prompt = DOCUMENTATION_PROMPT.format(
+    prompts = [DOCUMENTATION_PROMPT.format(
       file_name=file_name,
-      file_content=file_content,
+      file_content=chunk,
       callee_functions=callee_functions
+    ) for chunk in get_chunks(file_content)]
+    if len(prompts) > 1:
+      print(f"Documenting {file_name} in {len(prompts)} chunks")
+    async def get_documentation(prompt):
+      async with semaphore:
+        return await self._get_documentation(file_name, prompt)
+
+    chunk_docs = await asyncio.gather(*(get_documentation(prompt) for prompt in prompts))
+    documentation = chunk_docs[0] if len(chunk_docs) == 1 else merge_documents(chunk_docs)
+
+    # Save the documentation
+    output_path = doc_utils.write_file_docs(
+      self.output_folder,
+      self.root_folder,
+      file_path,
+      documentation
+    )
+
+    # Save the prompt message for debug
+    if save_debug:
+      doc_utils.save_prompt_debug(self.output_folder, file_path, '\n\n'.join(prompts), doc_utils.Mode.CREATE)
+    return file_content, output_path, mtime_ns
+
+  async def _get_documentation(self, file_name, prompt) -> str:
+    """
+    Returns the response to the documentation prompt, reused if the same prompt has been answered before.
+    """
+    response_key = self.response_cache.key(
+      os.getenv("CHAT_DEPLOYMENT_NAME"),
+      self.execution_settings.temperature,
+      None,
+      prompt
     )
+    documentation = self.response_cache.get(response_key)
+    if documentation is None:
+      documentation = await self._invoke_kernel(file_name, prompt)
+      if documentation:
+        self.response_cache.put(response_key, documentation)
+    return documentation
 
+  async def _invoke_kernel(self, file_name, prompt) -> str:
+    """
+    Sends the documentation prompt to the LLM and returns the generated documentation.
+    """
     # Configure the prompt template
     prompt_template_config = PromptTemplateConfig(
       template=prompt,
@@ -59,31 +131,50 @@ class DocumentationAgent:
       documentation = str(await self.kernel.invoke(documentation_generator))
     except:
       raise SemanticKernelError(f"The generation for {file_name} failed. Please check kernel configurations and try again.")
+    return documentation
 
-    # Save the documentation
-    output_path = doc_utils.write_file_docs(
-      self.output_folder,
-      self.root_folder,
-      file_path,
-      documentation
-    )
-    # Save the cache
-    self.cache.add(file_path, file_content, output_path)
-
-    # Save the prompt message for debug
-    if save_debug:
-      doc_utils.save_prompt_debug(self.output_folder, file_path, prompt, doc_utils.Mode.CREATE)
-  
-  def generate_all_documentation(self) -> None:
+  def generate_all_documentation(self, max_concurrency=None, resume=False, skip_unchanged=False) -> None:
     """
     Generates documentation for all files under the root folder.
+    Files are generated level by level following the call graph (callees before callers).
+    The files of a level are generated concurrently on one event loop, with at most `max_concurrency` LLM requests in flight.
+    The limit defaults to the MAX_CONCURRENCY environment variable (1 means sequential generation).
+    Every completed file is recorded in the run journal. With `resume`, files completed by an
+    interrupted run (and unchanged since) are skipped. With `skip_unchanged`, files whose cached
+    hash matches the current content and whose docs exist are skipped. Reusable files are checked
+    with their git blob SHAs (one `git ls-files` pass) and stats first.
     """
-    file_and_callee_function_dict = self.ast_agent.get_file_call_dict()
-    
-    for file_path, callee_functions in file_and_callee_function_dict.items():
-      if file_path == 'EXTERNAL':  # Skip all external functions
-        continue
-      # Generate documentation for the file
-      asyncio.run(self.generate_documentation_for_file(file_path, save_debug=True))
+    if max_concurrency is None:
+      max_concurrency = get_max_concurrency()
+    reusable = doc_utils.get_reusable_docs(self.output_folder, self.journal, resume, skip_unchanged)
+    blob_shas = get_worktree_blob_shas(self.root_folder) if reusable else {}
+    if not resume:
+      self.journal.clear()
+    levels = self.ast_agent.get_generation_levels()
+    asyncio.run(self._generate_all_documentation(levels, max_concurrency, reusable, blob_shas))
     # Save cache
-    doc_utils.save_cache(self.output_folder, self.cache)
\ No newline at end of file
+    doc_utils.save_cache(self.output_folder, self.cache)
+    # The run is complete, nothing left to resume
+    self.journal.clear()
+    print(f"LLM response cache: {self.response_cache.stats()}")
+
+  async def _generate_all_documentation(self, levels, max_concurrency, reusable, blob_shas=None) -> None:
+    """
+    Runs the generation of all levels with a bounded number of in-flight requests (chunks included).
+    The cache is filled in level order rather than the completion order, so its content stays deterministic.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    blob_shas = blob_shas or {}
+
+    async def generate(file_path):
+      if is_up_to_date(reusable.get(file_path), file_path, blob_shas.get(file_path)):
+        print(f"Skipping {file_path}, documentation is up to date.")
+        return reusable[file_path]
+      file_content, output_path, mtime_ns = await self._generate_documentation(file_path, semaphore, save_debug=True)
+      self.journal.record(file_path, file_content, output_path, mtime_ns)
+      return Document(file_path, file_content, output_path, mtime_ns)
+
+    for file_paths in levels:
+      for doc in await asyncio.gather(*(generate(file_path) for file_path in file_paths)):
+        self.cache.put(doc)
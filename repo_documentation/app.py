@@ -1,4 +1,4 @@
-import time, os, sys
+import time, os, sys, argparse
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(parent_dir)
 from dotenv import load_dotenv
@@ -7,21 +7,27 @@ load_dotenv(dotenv_path="../.env")
 from repo_agents.single_agent_generation.documentation_agent import DocumentationAgent
 from repo_documentation.merging.merger import create_documentation
 
-def run_generate_documentation():
+def run_generate_documentation(resume=False, skip_unchanged=False):
   """
   Invoke this function to trigger the doc gen process (single-agent pattern).
   Tradeoff: Cheap (use fewer tokens), less accurate (lightweight generation process)
   Ensure you have all environment variables set up correctly. Check `.env_example` file to find out what they are.
+  With `resume`, the files completed by an interrupted run are skipped (see `cache/run_journal.py`).
+  With `skip_unchanged`, the files whose hash in `docs_output/cache.json` matches their content are skipped.
   """
   start_time = time.time()
   da = DocumentationAgent()
-  da.generate_all_documentation()
+  da.generate_all_documentation(resume=resume, skip_unchanged=skip_unchanged)
   total = round(time.time() - start_time, 3)
-  if os.getenv("FORMAT") == "html":
+  if os.getenv("FORMAT") in ("html", "html-split"):
     root_folder = os.path.abspath(os.getenv("ROOT_FOLDER"))
     output_folder = os.path.join(root_folder, "docs_output")
     create_documentation(output_folder)
   print(f"Documentation generation completed in {total}s.")
 
 # Test it
-run_generate_documentation()
\ No newline at end of file
+parser = argparse.ArgumentParser(description='Generate documentation for all files under ROOT_FOLDER')
+parser.add_argument('--resume', action='store_true', help='Skip the files completed by an interrupted run')
+parser.add_argument('--skip-unchanged', action='store_true', help='Skip the files whose cached documentation is up to date')
+args = parser.parse_args()
+run_generate_documentation(resume=args.resume, skip_unchanged=args.skip_unchanged)
\ No newline at end of file
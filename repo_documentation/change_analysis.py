@@ -0,0 +1,94 @@
+import threading
+from code2flow.code2flow import ast_utils
+from repo_documentation import git_utils
+from analysis.function_changes import get_function_changes
+
+"""
+The change analysis of a documentation update run, computed once per (path, commit) and shared
+by every stage: file contents, unified diffs, function changes and parent dependencies.
+"""
+
+
+class ChangeAnalysis():
+    """
+    Memoizes the artifacts of the changes between the main branch and the current branch.
+    Safe to use from several threads: an artifact computed twice concurrently is stored once.
+
+    Args:
+        root_folder (str): The repository root.
+        graph (CompactCallGraph): The call graph of the current branch.
+        main_branch_commit (Commit): The latest commit of the main branch.
+        curr_branch_commit (Commit): The latest commit of the current branch.
+    """
+
+    def __init__(self, root_folder, graph, main_branch_commit=None, curr_branch_commit=None):
+        self.root_folder = root_folder
+        self.graph = graph
+        self.main_branch_commit = main_branch_commit
+        self.curr_branch_commit = curr_branch_commit
+        self.__memo = {}
+        self.__lock = threading.Lock()
+
+    def _memoize(self, key, compute):
+        with self.__lock:
+            if key in self.__memo:
+                return self.__memo[key]
+        value = compute()
+        with self.__lock:
+            return self.__memo.setdefault(key, value)
+
+    def content(self, file_path, commit) -> str:
+        """
+        Returns the content of the file at the commit (empty if it does not exist).
+        """
+        return self._memoize(('content', file_path, commit.hexsha),
+                             lambda: git_utils.get_file__commit_content(self.root_folder, file_path, commit))
+
+    def blob_sha(self, file_path, commit) -> str:
+        """
+        Returns the blob SHA of the file at the commit (None if it does not exist), without reading it.
+        """
+        return self._memoize(('blob', file_path, commit.hexsha),
+                             lambda: git_utils.get_file__commit_blob_sha(self.root_folder, file_path, commit))
+
+    def old_content(self, file_path) -> str:
+        return self.content(file_path, self.main_branch_commit)
+
+    def new_content(self, file_path) -> str:
+        return self.content(file_path, self.curr_branch_commit)
+
+    def unified_diff(self, file_path) -> str:
+        return self._memoize(('diff', file_path), lambda: git_utils.get_unified_diff(
+            self.old_content(file_path), self.new_content(file_path)))
+
+    def function_changes(self, file_path) -> list:
+        return self._memoize(('changes', file_path), lambda: get_function_changes(
+            file_path, self.old_content(file_path), self.new_content(file_path)))
+
+    def filtered_changes(self, file_path) -> list:
+        """
+        Returns the names of the functions of the file whose changes are relevant to its parents.
+        """
+        return self._memoize(('filtered', file_path),
+                             lambda: ast_utils.filter_changes(self.function_changes(file_path)))
+
+    def parent_dependencies(self, file_path) -> dict:
+        """
+        Returns a dict mapping: (file, functions calling the changed functions of the file).
+        """
+        return self._memoize(('parents', file_path), lambda: self.graph.get_parent_dependencies(
+            self.filtered_changes(file_path), file_path))
+
+    def parent_updates(self, file_paths) -> dict:
+        """
+        Returns the parent dependencies of the files, coalesced per parent file: a dict mapping
+        (parent file, (dict mapping: (changed file, its changed functions), affected functions of the parent)).
+        The affected functions are deduplicated, in order.
+        """
+        updates = {}
+        for file_path in file_paths:
+            for parent_path, functions in self.parent_dependencies(file_path).items():
+                upstream, affected = updates.setdefault(parent_path, ({}, []))
+                upstream[file_path] = self.filtered_changes(file_path)
+                affected.extend(function for function in functions if function not in affected)
+        return updates
@@ -0,0 +1,212 @@
+import re
+import ast
+from analysis.function_changes import get_functions_from_content
+
+"""
+Splits the generated documentation of a file into its class and function sections, so that an
+update only sends the affected sections to the LLM and splices the revised ones back in, and
+the documentation of a large file is assembled from the documentation of its chunks.
+The documentation template delimits every section with a `<div class="class-section">` or
+`<div class="function-section">` block, addressed by its `<h2>ClassDef/FunctionDef Name</h2>` heading.
+The Markdown documentation of the single agent has a `## ClassDef/FunctionDef Name` heading per section.
+"""
+
+_SECTION_START = re.compile(r'<div\s+class="(?:class|function)-section"\s*>')
+_DIV = re.compile(r'<div\b[^>]*>|</div\s*>')
+_HEADING = re.compile(r'<h2>\s*(?:ClassDef|FunctionDef)\s+([\w.]+)')
+_H1 = re.compile(r'<h1>.*?</h1>', re.S)
+_MD_HEADING = re.compile(r'##\s+(?:(?:ClassDef|FunctionDef)\s+([\w.]+)|(.*\S))')
+_MD_H1 = re.compile(r'\A\s*#\s.*\n?')
+_HUNK = re.compile(r'@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@')
+
+# The name of the module-level code in the changed sections (it has no section of its own)
+MODULE_LEVEL = '(module)'
+
+
+def split_sections(docs) -> list:
+    """
+    Returns the documentation as a list of (section name, text) segments, in order. The text
+    between the sections (e.g. the file heading) is in segments named None.
+    Joining the texts gives back the documentation.
+    """
+    segments = []
+    position = 0
+    while True:
+        start = _SECTION_START.search(docs, position)
+        if start is None:
+            break
+        depth, end = 0, None
+        for tag in _DIV.finditer(docs, start.start()):
+            depth += -1 if tag.group().startswith('</') else 1
+            if depth == 0:
+                end = tag.end()
+                break
+        if end is None:
+            break
+        if start.start() > position:
+            segments.append((None, docs[position:start.start()]))
+        heading = _HEADING.search(docs, start.end(), end)
+        segments.append((heading.group(1) if heading else None, docs[start.start():end]))
+        position = end
+    if position < len(docs):
+        segments.append((None, docs[position:]))
+    return segments
+
+
+def get_sections(docs) -> dict:
+    """
+    Returns a dict mapping: (section name, section text) of the named sections of the documentation.
+    """
+    sections = {}
+    for name, text in split_sections(docs.replace('```html', '').replace('```', '')):
+        if name is not None:
+            sections.setdefault(name, text)
+    return sections
+
+
+def get_top_level_names(content) -> list:
+    """
+    Returns the names of the classes and functions defined at the top level of the content, in order.
+    """
+    names = []
+    for name in get_functions_from_content(content):
+        top_level = name.split('.')[0]
+        if top_level not in names:
+            names.append(top_level)
+    return names
+
+
+def get_definition_ranges(content) -> list:
+    """
+    Returns the (name, first line, last line) of the classes and functions defined at the top level
+    of the content, decorators included. Returns an empty list if the content cannot be parsed.
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return []
+    return [(node.name, min([node.lineno] + [decorator.lineno for decorator in node.decorator_list]), node.end_lineno)
+            for node in tree.body if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))]
+
+
+def get_changed_lines(diff) -> tuple:
+    """
+    Returns the (removed, added) lines of a unified diff, as dicts mapping: (line number, text),
+    numbered in the old and in the new content.
+    """
+    removed, added = {}, {}
+    old_number = new_number = None
+    for line in diff.splitlines():
+        hunk = _HUNK.match(line)
+        if hunk:
+            old_number, new_number = int(hunk.group(1)), int(hunk.group(2))
+        elif old_number is None or not line:
+            continue
+        elif line[0] == '-':
+            removed[old_number] = line[1:]
+            old_number += 1
+        elif line[0] == '+':
+            added[new_number] = line[1:]
+            new_number += 1
+        else:
+            old_number += 1
+            new_number += 1
+    return removed, added
+
+
+def get_changed_sections(diff, old_content, new_content) -> set:
+    """
+    Returns the names of the top-level classes and functions with a line changed by the unified diff
+    (e.g. a class attribute, not only a method), and MODULE_LEVEL if a changed line is outside of them.
+    Blank and comment lines outside of the definitions are ignored.
+    """
+    changed = set()
+    for lines, content in zip(get_changed_lines(diff), (old_content, new_content)):
+        ranges = get_definition_ranges(content)
+        for number, text in lines.items():
+            name = next((name for name, first, last in ranges if first <= number <= last), MODULE_LEVEL)
+            if name != MODULE_LEVEL or (text.strip() and not text.strip().startswith('#')):
+                changed.add(name)
+    return changed
+
+
+def get_section_name(function, top_level_names):
+    """
+    Returns the section documenting the function (e.g. `Class` for `Class.method`), or None.
+    The function may be a call graph key (`file::Class.method`).
+    """
+    for part in function.rsplit('::', 1)[-1].split('.'):
+        if part in top_level_names:
+            return part
+    return None
+
+
+def splice_sections(docs, revised, removed=()) -> str:
+    """
+    Returns the documentation with the revised sections (a dict mapping: (section name, text))
+    replaced, the removed sections dropped, and the new sections added after the last section.
+    """
+    segments = split_sections(docs)
+    names = {name for name, _ in segments}
+    added = [text for name, text in revised.items() if name not in names]
+    last = max((i for i, (name, _) in enumerate(segments) if name is not None), default=len(segments) - 1)
+    result = []
+    for i, (name, text) in enumerate(segments):
+        if name not in removed:
+            result.append(revised.get(name, text) if name is not None else text)
+        if i == last and added:
+            result.extend('\n\n' + text for text in added)
+    if not segments:
+        result.extend(added)
+    return ''.join(result)
+
+
+def split_markdown_sections(docs) -> list:
+    """
+    Returns the Markdown documentation as a list of (section name, text) segments, in order: a section
+    starts at a `## ` heading outside of the code blocks, and is named after its class or function
+    (or its heading). The text before the first section is in a segment named None.
+    Joining the texts gives back the documentation.
+    """
+    segments = [(None, [])]
+    fenced = False
+    for line in docs.splitlines(keepends=True):
+        if line.lstrip().startswith('```'):
+            fenced = not fenced
+        elif not fenced and _MD_HEADING.match(line):
+            heading = _MD_HEADING.match(line)
+            segments.append((heading.group(1) or heading.group(2), []))
+        segments[-1][1].append(line)
+    return [(name, ''.join(lines)) for name, lines in segments if lines]
+
+
+def merge_documents(documents) -> str:
+    """
+    Assembles the documentation of a file from the documentation of its chunks: the heading of
+    the first chunk, then the sections of every chunk in order (the first one of a name wins).
+    The text before the sections of a later chunk (e.g. an intro paragraph) is kept before them,
+    without its `<h1>` (or Markdown `# `) heading, as a chunk without sections.
+    HTML and Markdown documentation are told apart by their section blocks.
+    """
+    heading, sections = '', []
+    names = set()
+    markdown = not any(_SECTION_START.search(docs) for docs in documents)
+    for i, docs in enumerate(documents):
+        if markdown:
+            docs = docs.strip()
+            segments = [(name, text.strip()) for name, text in split_markdown_sections(docs)]
+        else:
+            docs = docs.replace('```html', '').replace('```', '').strip()
+            segments = split_sections(docs)
+        for j, (name, text) in enumerate(segments):
+            if name is None and j == 0:
+                if i == 0:
+                    heading = text.strip()
+                else:
+                    text = (_MD_H1 if markdown else _H1).sub('', text).strip()
+                    if text:
+                        sections.append(text)
+            elif name is not None and name not in names:
+                names.add(name)
+                sections.append(text)
+    return '\n\n'.join(part for part in [heading] + sections if part)
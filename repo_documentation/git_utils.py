@@ -1,5 +1,11 @@
 import difflib
 import os
+import subprocess
+import threading
+from collections import OrderedDict
+
+# Memory bound of the decoded blob contents cached by a BlobReader
+DEFAULT_BLOB_CACHE_SIZE = 64 * 1024 * 1024
 
 
 def get_latest_commit_sha(repo, branch):
@@ -53,22 +59,163 @@ def get_file__commit_content(root_folder, file_path, commit):
     Returns the content of the file at the specified commit. 
     If the file does not exist, an empty string is returned.
     """
+    reader = get_blob_reader(commit.repo.git_dir)
+    blob_sha = reader.get_blob_sha(commit.hexsha, _tree_path(root_folder, file_path))
+    return reader.read(blob_sha) if blob_sha else ''
+
+
+def get_file__commit_blob_sha(root_folder, file_path, commit):
+    """
+    Get the blob SHA of a file at a specific commit, or None if the file does not exist.
+    Two versions of a file are identical if and only if their blob SHAs are equal.
+    """
+    reader = get_blob_reader(commit.repo.git_dir)
+    return reader.get_blob_sha(commit.hexsha, _tree_path(root_folder, file_path))
+
+
+def get_worktree_blob_shas(root_folder) -> dict:
+    """
+    Returns a dict mapping: (absolute path, blob SHA) of the tracked files under the folder whose
+    working tree content is the one staged in the index, from `git ls-files -s` (files modified in
+    the working tree, as listed by `git status`, are left out). Empty if it is not a git repository.
+    """
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=root_folder, capture_output=True, check=True).stdout.decode('utf-8')
+
     try:
-        relative_path = os.path.relpath(file_path, root_folder)
-        blob = commit.tree
+        staged = git('ls-files', '-s', '-z', '--full-name')
+        status = git('status', '--porcelain', '-z', '--untracked-files=no', '--', '.').split('\0')
+        top_level = git('rev-parse', '--show-toplevel').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+    modified = set()
+    entries = iter(status)
+    for entry in entries:
+        if not entry:
+            continue
+        if entry[1] != ' ':
+            modified.add(entry[3:])
+        if entry[0] in 'RC':
+            # The source path of a staged rename or copy
+            next(entries, None)
+    blob_shas = {}
+    for entry in staged.split('\0'):
+        if not entry:
+            continue
+        info, path = entry.split('\t', 1)
+        _, sha, stage = info.split()
+        if stage == '0' and path not in modified:
+            blob_shas[os.path.normpath(os.path.join(top_level, path))] = sha
+    return blob_shas
 
-        # Split the path and traverse the tree
-        for part in relative_path.split(os.path.sep):
-            blob = blob[part]
 
-        # If it's a blob, return its content
-        if blob.type == 'blob':
-            return blob.data_stream.read().decode('utf-8')
-        else:
-            # If it's not a blob (e.g., it's a tree), return an empty string
-            return ''
-    except KeyError:
-        return ''
+def _tree_path(root_folder, file_path):
+    """
+    Returns the path of the file in the commit tree, with '/' separators.
+    """
+    return os.path.relpath(file_path, root_folder).replace(os.sep, '/')
+
+
+class BlobReader():
+    """
+    Reads file contents at commits through a single persistent `git cat-file --batch` process.
+    The blobs of a commit are resolved in one pass (`git ls-tree -r`) and the decoded contents
+    are cached by blob SHA, least recently used first out, within `max_cache_size` bytes.
+
+    Args:
+        repo_path (str): The git directory (or working tree) of the repository.
+        max_cache_size (int): The memory bound of the cached contents, in bytes.
+    """
+
+    def __init__(self, repo_path, max_cache_size=DEFAULT_BLOB_CACHE_SIZE):
+        self.repo_path = repo_path
+        self.max_cache_size = max_cache_size
+        self.cache_size = 0
+        self.reads = 0
+        self.hits = 0
+        self.__trees = {}
+        self.__cache = OrderedDict()
+        self.__process = None
+        self.__lock = threading.Lock()
+
+    def get_blob_shas(self, commit_sha) -> dict:
+        """
+        Returns a dict mapping: (path, blob SHA) of every file of the commit.
+        """
+        with self.__lock:
+            if commit_sha not in self.__trees:
+                output = subprocess.run(['git', 'ls-tree', '-r', '-z', '--full-tree', commit_sha],
+                                        cwd=self.repo_path, capture_output=True, check=True).stdout
+                blobs = {}
+                for entry in output.decode('utf-8').split('\0'):
+                    if not entry:
+                        continue
+                    info, path = entry.split('\t', 1)
+                    _, object_type, sha = info.split()
+                    if object_type == 'blob':
+                        blobs[path] = sha
+                self.__trees[commit_sha] = blobs
+            return self.__trees[commit_sha]
+
+    def get_blob_sha(self, commit_sha, path):
+        """
+        Returns the blob SHA of the path at the commit, or None if it does not exist.
+        """
+        return self.get_blob_shas(commit_sha).get(path)
+
+    def read(self, blob_sha) -> str:
+        """
+        Returns the decoded content of the blob.
+        """
+        with self.__lock:
+            self.reads += 1
+            if blob_sha in self.__cache:
+                self.hits += 1
+                self.__cache.move_to_end(blob_sha)
+                return self.__cache[blob_sha]
+            content = self.__cat_file(blob_sha).decode('utf-8')
+            self.__cache[blob_sha] = content
+            self.cache_size += len(content)
+            while self.cache_size > self.max_cache_size and len(self.__cache) > 1:
+                _, evicted = self.__cache.popitem(last=False)
+                self.cache_size -= len(evicted)
+            return content
+
+    def __cat_file(self, blob_sha) -> bytes:
+        if self.__process is None or self.__process.poll() is not None:
+            self.__process = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=self.repo_path,
+                                              stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.__process.stdin.write(f'{blob_sha}\n'.encode('ascii'))
+        self.__process.stdin.flush()
+        header = self.__process.stdout.readline().decode('ascii').split()
+        if len(header) != 3:
+            raise KeyError(f'Blob {blob_sha} not found.')
+        data = self.__process.stdout.read(int(header[2]))
+        self.__process.stdout.read(1)
+        return data
+
+    def close(self):
+        with self.__lock:
+            if self.__process is not None:
+                self.__process.stdin.close()
+                self.__process.wait()
+                self.__process.stdout.close()
+                self.__process = None
+
+
+__blob_readers = {}
+__blob_readers_lock = threading.Lock()
+
+
+def get_blob_reader(repo_path) -> BlobReader:
+    """
+    Returns the blob reader shared by the process for the repository.
+    """
+    repo_path = os.path.abspath(repo_path)
+    with __blob_readers_lock:
+        if repo_path not in __blob_readers:
+            __blob_readers[repo_path] = BlobReader(repo_path)
+        return __blob_readers[repo_path]
 
 
 def get_unified_diff(old_content, new_content):
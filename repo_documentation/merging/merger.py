@@ -1,9 +1,19 @@
 import os
+import json
+import hashlib
 import markdown
+from string import Formatter
+from collections import Counter
+from repo_documentation.merging import search_index
 
 # Define the extensions for HTML and Markdown files
 HTML_EXTENSION = '.html'
 MD_EXTENSION = '.md'
+# The folder of the docs output where the rendered documents are cached
+FRAGMENT_CACHE_FOLDER = 'merge_cache'
+# The folder of the file cards of the split-page site, and their manifest
+SITE_FOLDER = 'site'
+MANIFEST_FILE = 'manifest.json'
 
 # Load HTML template parts
 with open('/docAider/repo_documentation/merging/head.html', 'r', encoding='utf-8') as f:
@@ -18,7 +28,23 @@ with open('/docAider/repo_documentation/merging/file-card.html', 'r', encoding='
 with open('/docAider/repo_documentation/merging/script.html', 'r', encoding='utf-8') as f:
     script = f.read()
 
-def create_documentation(docs_folder):
+with open('/docAider/repo_documentation/merging/lazy-script.html', 'r', encoding='utf-8') as f:
+    lazy_script = f.read()
+
+with open('/docAider/repo_documentation/merging/search-script.html', 'r', encoding='utf-8') as f:
+    search_script = f.read()
+
+def create_documentation(docs_folder, split_pages=None):
+    """
+    Writes the documentation site (index.html) of the docs folder. Only the documents whose content
+    changed since the last run are rendered from Markdown (see `FragmentCache`), and the page is
+    streamed to disk instead of being assembled in memory.
+    With `split_pages` (defaults to FORMAT=html-split), index.html only has the table of contents and
+    the file cards are loaded on demand (see `write_file_cards`); the site must be served over HTTP.
+    The search box of the site queries the index written by `write_search_index`.
+    """
+    if split_pages is None:
+        split_pages = os.getenv('FORMAT') == 'html-split'
     # Generate table of contents
     files = []
     for root, _, _files in os.walk(docs_folder):
@@ -37,29 +63,39 @@ def create_documentation(docs_folder):
     print(f"Files: {files}")
     table_of_contents = get_table_of_contents(tree)
 
-    # Get the documentation file-cards
-    documentation_content = get_documentation_content(files)
-
-    # Replace placeholders in the template
-    filled_template = body.format(
-        table_of_contents=table_of_contents,
-        documentation_content=documentation_content,
-        script=script
-    )
+    # Get the documentation file-cards, rendered on demand
+    cache = FragmentCache(os.path.join(docs_folder, FRAGMENT_CACHE_FOLDER))
+    placeholders = {
+        'table_of_contents': lambda: [table_of_contents],
+        'documentation_content': lambda: iter_documentation_content(files, cache),
+        'script': lambda: [script, search_script]
+    }
+    if split_pages:
+        write_file_cards(docs_folder, files, cache)
+        placeholders['documentation_content'] = lambda: ['<div id="file-cards"></div>']
+        placeholders['script'] = lambda: [script, lazy_script, search_script]
+    write_search_index(docs_folder, files, cache)
 
-    # Write the filled template to the output file
-    output = head + filled_template
+    # Stream the filled template to the output file, replaced once complete
     output_file = os.path.join(docs_folder, f'index{HTML_EXTENSION}')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(output)
+    tmp_file = f'{output_file}.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(head)
+        for literal, field, _, _ in Formatter().parse(body):
+            f.write(literal)
+            if field is not None:
+                f.writelines(placeholders[field]())
+    os.replace(tmp_file, output_file)
+    cache.prune()
 
+    print(f"Rendered {cache.rendered} of {cache.rendered + cache.hits} documents.")
     print(f"Final documentation has been generated in {output_file}")
 
 def create_file_card(file_path: str, docs):
     # Clean the path to create a valid HTML id
     id = clean_path(file_path)
     # Remove file extensions for display purposes
-    file_name = file_path.replace('\\', '/').replace(MD_EXTENSION, '')
+    file_name = get_display_name(file_path)
     # Format the file card template with the id and content
     return file_card_template.format(id=id, file_name=file_name, content=docs)
 
@@ -98,6 +134,9 @@ def get_table_of_contents(tree, prefix=""):
     table_of_contents += "</ul>\n"
     return table_of_contents
 
+def get_display_name(path):
+    return path.replace('\\', '/').replace(MD_EXTENSION, '')
+
 def clean_path(path):
     # Clean the path to create a valid HTML id
     return path.replace(MD_EXTENSION, '') \
@@ -105,17 +144,116 @@ def clean_path(path):
         .replace('/', '-') \
         .replace('.', '-')
 
-def get_documentation_content(files):
-    documentation_content = ""
+def get_documentation_content(files, cache=None):
+    return ''.join(iter_documentation_content(files, cache))
+
+def iter_documentation_content(files, cache=None):
+    """
+    Yields the file card of every documentation file, rendered through the cache if one is given.
+    """
     for root, path in files:
         basename = os.path.basename(path)
         file_path = os.path.join(root, basename)
         with open(file_path, 'r', encoding='utf-8') as f:
             # Convert Markdown files to HTML
-            content = markdown.markdown(f.read(), extensions=['fenced_code'])
-            # Create file card for each file
-            documentation_content += create_file_card(path, content)
-    return documentation_content
+            text = f.read()
+        content = cache.render(text) if cache else render_markdown(text)
+        # Create file card for each file
+        yield create_file_card(path, content)
+
+def render_markdown(text):
+    return markdown.markdown(text, extensions=['fenced_code'])
+
+class FragmentCache():
+    """
+    The rendered HTML of the Markdown documents, one file per document keyed by the SHA-256 of its content.
+    The fragments not used by a run are removed by `prune`.
+
+    Args:
+        folder (str): The folder of the cached fragments.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.used = set()
+        self.rendered = 0
+        self.hits = 0
+
+    def render(self, text):
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        self.used.add(key)
+        path = os.path.join(self.folder, key + HTML_EXTENSION)
+        if os.path.exists(path):
+            self.hits += 1
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        self.rendered += 1
+        content = render_markdown(text)
+        write_atomically(path, content)
+        return content
+
+    def terms(self, text):
+        """
+        Returns the search terms of the document (see `search_index.get_text_terms`).
+        """
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        self.used.add(key)
+        path = os.path.join(self.folder, f'{key}.terms.json')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        terms = search_index.get_text_terms(text)
+        write_atomically(path, json.dumps(terms, separators=(',', ':')))
+        return terms
+
+    def prune(self):
+        if not os.path.isdir(self.folder):
+            return
+        for file in os.listdir(self.folder):
+            if file.split('.')[0] not in self.used:
+                os.remove(os.path.join(self.folder, file))
+
+def write_file_cards(docs_folder, files, cache=None):
+    """
+    Writes the file card of every documentation file as its own fragment, named after its id and
+    the hash of its content (so that it can be cached by browsers and CDNs), and the manifest mapping
+    the card ids to the fragments. The fragments of previous runs are removed. Returns the manifest.
+    """
+    site_folder = os.path.join(docs_folder, SITE_FOLDER)
+    manifest = {}
+    for (_, path), card in zip(files, iter_documentation_content(files, cache)):
+        digest = hashlib.sha256(card.encode('utf-8')).hexdigest()[:16]
+        name = f'{clean_path(path)}.{digest}{HTML_EXTENSION}'
+        if not os.path.exists(os.path.join(site_folder, name)):
+            write_atomically(os.path.join(site_folder, name), card)
+        manifest[clean_path(path)] = f'{SITE_FOLDER}/{name}'
+    write_atomically(os.path.join(site_folder, MANIFEST_FILE), json.dumps(manifest, indent=4))
+
+    fragments = {os.path.basename(fragment) for fragment in manifest.values()}
+    for file in os.listdir(site_folder):
+        if file != MANIFEST_FILE and file not in fragments:
+            os.remove(os.path.join(site_folder, file))
+    return manifest
+
+def write_search_index(docs_folder, files, cache=None):
+    """
+    Writes the sharded search index of the documentation files (see `search_index`),
+    with the terms of the unchanged documents taken from the cache.
+    """
+    documents = []
+    for root, path in files:
+        with open(os.path.join(root, os.path.basename(path)), 'r', encoding='utf-8') as f:
+            text = f.read()
+        terms = Counter(cache.terms(text) if cache else search_index.get_text_terms(text))
+        terms.update(search_index.get_path_terms(get_display_name(path)))
+        documents.append((clean_path(path), get_display_name(path), terms))
+    return search_index.write_search_index(docs_folder, documents, write_atomically)
+
+def write_atomically(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(f'{path}.tmp', path)
 
 def to_tree(files):
     tree = {'files': []}
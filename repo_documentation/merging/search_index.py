@@ -0,0 +1,103 @@
+import os
+import re
+import json
+from collections import Counter
+
+"""
+Builds the search index of the documentation site: an inverted index of the terms of the file paths,
+the class and function names and the body text of every document. The index is sharded by the first
+characters of the terms, so that the browser only fetches the shards of the terms it searches for.
+"""
+
+# The folder of the docs output where the index is written
+SEARCH_FOLDER = 'search'
+INDEX_FILE = 'index.json'
+# Terms are sharded by their first characters
+SHARD_PREFIX_LENGTH = 2
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 40
+# Only the best scored documents of a term are kept
+MAX_POSTINGS = 200
+# Weights of the occurrences of a term in the body, the class and function names and the path
+BODY_WEIGHT = 1
+NAME_WEIGHT = 5
+PATH_WEIGHT = 3
+
+_WORD = re.compile(r'[A-Za-z0-9_]+')
+_CAMEL_CASE = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+')
+_TAG = re.compile(r'<[^>]+>|&\w+;')
+_HTML_HEADING = re.compile(r'<h[1-3][^>]*>(.*?)</h[1-3]>', re.S)
+_MD_HEADING = re.compile(r'^#{1,3}\s+(.+)$', re.M)
+
+
+def tokenize(text) -> list:
+    """
+    Returns the lower-case terms of the text. An identifier is a term, and so are its parts
+    (e.g. `get_table_of_contents`, `get`, `table`, `of`, `contents`; `DocsCache`, `docs`, `cache`).
+    """
+    terms = []
+    for word in _WORD.findall(text):
+        parts = [part for piece in word.split('_') for part in _CAMEL_CASE.findall(piece)]
+        for term in [word] + (parts if len(parts) > 1 else []):
+            if MIN_TERM_LENGTH <= len(term) <= MAX_TERM_LENGTH:
+                terms.append(term.lower())
+    return terms
+
+
+def get_text_terms(text) -> dict:
+    """
+    Returns a dict mapping: (term, score) of a document, from its names (headings) and its body text.
+    """
+    terms = Counter()
+    names = _HTML_HEADING.findall(text) + _MD_HEADING.findall(text)
+    for term in tokenize(' '.join(names)):
+        terms[term] += NAME_WEIGHT
+    for term in tokenize(_TAG.sub(' ', text)):
+        terms[term] += BODY_WEIGHT
+    return dict(terms)
+
+
+def get_path_terms(path) -> dict:
+    return {term: PATH_WEIGHT for term in tokenize(path)}
+
+
+def get_shard_key(term) -> str:
+    return term[:SHARD_PREFIX_LENGTH]
+
+
+def build_search_index(documents) -> tuple:
+    """
+    Returns the index and its shards for the documents, a list of (card id, title, terms) where
+    terms is a dict mapping: (term, score).
+    The index lists the documents ([card id, title]) and the shard keys; a shard maps its terms to
+    their postings, a flat list of document numbers and scores, the best scored first.
+    """
+    postings = {}
+    for number, (_, _, terms) in enumerate(documents):
+        for term, score in terms.items():
+            postings.setdefault(term, []).append((score, number))
+    shards = {}
+    for term in sorted(postings):
+        best = sorted(postings[term], key=lambda posting: (-posting[0], posting[1]))[:MAX_POSTINGS]
+        shards.setdefault(get_shard_key(term), {})[term] = [value for score, number in best for value in (number, score)]
+    index = {
+        'docs': [[card_id, title] for card_id, title, _ in documents],
+        'shards': sorted(shards)
+    }
+    return index, shards
+
+
+def write_search_index(docs_folder, documents, write):
+    """
+    Writes the index and its shards to the search folder of the docs output with `write(path, content)`,
+    and removes the shards of previous runs.
+    """
+    search_folder = os.path.join(docs_folder, SEARCH_FOLDER)
+    index, shards = build_search_index(documents)
+    for key, shard in shards.items():
+        write(os.path.join(search_folder, f'{key}.json'), json.dumps(shard, separators=(',', ':')))
+    write(os.path.join(search_folder, INDEX_FILE), json.dumps(index, separators=(',', ':')))
+    for file in os.listdir(search_folder):
+        if file != INDEX_FILE and file[:-len('.json')] not in shards:
+            os.remove(os.path.join(search_folder, file))
+    return index
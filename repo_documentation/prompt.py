@@ -129,18 +129,23 @@ Please update the documentation accordingly, ensuring it accurately reflects the
 3. DO NOT CHANGE THE FORMAT OF THE DOCUMENTATION.)
 """
 
+SECTION_UPDATE = """
+Only the sections of the documentation that may be affected by the changes are given as the old documentation.
+Return only the updated sections, for: {sections}.
+Each section must be a complete <div class="class-section"> or <div class="function-section"> block with its <h2>ClassDef NameOfClass</h2> or <h2>FunctionDef NameOfFunction</h2> heading, following the format of the old sections.
+A section of the list that is not in the old documentation is new: write it in the same format.
+Do not return the other sections, nor the file heading.
+"""
+
 USR_PROMPT = """You are a documentation generation assistant for Python programs. Keep in mind that your audience is document readers, so use a deterministic tone to generate precise content and don't let them know you're provided with code snippet and documents. AVOID ANY SPECULATION and inaccurate descriptions! Now, provide the documentation for the target object in a professional way."""
 
 
 PARENT_UPDATE = """
 
-The following functions:
+The following functions have been updated (changed file: functions):
 {updated_function_contents}
 
-In the file below:
-{new_content}
-
-Have been updated. These changes influence the current file on the path: 
+These changes influence the current file on the path: 
 {path}
 
 Please make sure to update the following functions in the file accordingly.
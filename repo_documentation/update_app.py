@@ -3,17 +3,25 @@ import os
 import sys
 import time
 import git
+import threading
 from enum import Enum
 
 
 sys.path.append(os.path.abspath(
 	os.path.join(os.path.dirname(__file__), './../')))
 
-from code2flow.code2flow import ast_utils
-from code2flow.code2flow import utils as code2flow_utils
 from autogen_utils import utils as autogen_utils
 from repo_documentation import utils
 from cache.document import sha256_hash
+from analysis.callee_index import CalleeIndex
+from analysis.compact_graph import CompactCallGraph
+from analysis.store import load_call_graph
+from repo_documentation.change_analysis import ChangeAnalysis
+from repo_documentation.update_scheduler import UpdateScheduler, get_max_workers
+from analysis.chunking import get_chunks
+from concurrent.futures import ThreadPoolExecutor
+from repo_documentation import doc_sections
+from code2flow.code2flow.ast_utils import FunctionChangeType
 import argparse
 from repo_documentation.merging.merger import create_documentation
 
@@ -38,9 +46,11 @@ class DocumentationUpdate():
 			print("Updating documentation based on PR comment...")
 			curr_branch_sha = git_utils.get_latest_commit_sha(self.repo, self.branch)
 			curr_branch_commit = self.repo.commit(curr_branch_sha)
+			self.analysis = ChangeAnalysis(self.root_folder, self.graph, curr_branch_commit=curr_branch_commit)
 			abs_file_path = os.path.join(self.root_folder, self.file_path)
 			print(f"File path: {abs_file_path}")
 			self.update_documentation_based_on_comment(abs_file_path, self.comment, curr_branch_commit)
+			utils.save_cache(self.output_dir, self.cache)
 			create_documentation(self.output_dir)
 		else:
 			print("Updating documentation based on branch changes...")
@@ -60,73 +70,171 @@ class DocumentationUpdate():
 				return
 
 			# 3. Initialize the necessary dependencies for the documentation update process
-			self._initialize()
+			self._initialize(diffs, main_branch_commit, curr_branch_commit)
 			print("Starting the documentation update process...")
 			start_time = time.time()
 
-			# Sort diffs by number of parent dependencies, so that we update the leaves first
-			diffs = [(diff, self._get_changes(diff, main_branch_commit, curr_branch_commit)) for diff in diffs]
-			diffs.sort(key=lambda x: self._parents_count(self._file_path(x[0]), x[1]))
+			# Contents, diffs, function changes and parent dependencies are computed once per run
+			self.analysis = ChangeAnalysis(self.root_folder, self.graph, main_branch_commit, curr_branch_commit)
+
+			# Sort diffs by number of parent dependencies, so that we schedule the leaves first
+			diffs = [(diff, self.analysis.function_changes(self._file_path(diff))) for diff in diffs]
+			diffs.sort(key=lambda x: self._parents_count(self._file_path(x[0])))
 
-			# 4. Update the documentation for each Python file that has changed
+			# 4. Update the documentation for each Python file that has changed, and its parents,
+			# concurrently where the updates are independent
+			scheduler = UpdateScheduler()
 			for diff, changes in diffs:
-				path = self._file_path(diff)
-
-				# Attempt to get the cached documentation for the file
-				cached = self.cache.get(path)
-				
-				change_type = ChangeType(diff.change_type)
-
-				# 6a. Generate new documentation if the file is not cached
-				if change_type == ChangeType.ADDED:
-					self._create_docs(path, curr_branch_commit)
-
-				# 6b. Skip if the file has not been modified since last update
-				elif cached and cached.source_file_hash == sha256_hash(self._new_commit_content(path, curr_branch_commit)):
-					print(f'Skipping documentation update for file={path} as it has not been modified since last update.')
-					
-				# 6c. If the file has been modified, update the documentation
-				elif change_type == ChangeType.MODIFIED:
-					self._update_docs(file_path=path, main_branch_commit=main_branch_commit, current_branch_commit=curr_branch_commit, changes=changes)
-				# 6d. If the file has been renamed
-				elif change_type == ChangeType.RENAMED:
-					# TODO: Handle renamed files
-					pass
-				# 6e. If the file has been deleted
-				elif change_type == ChangeType.DELETED:
-					self._handle_deleted(path)
+				self._schedule_update(scheduler, diff, changes, main_branch_commit, curr_branch_commit)
+			self._schedule_parent_updates(scheduler, [self._file_path(diff) for diff, _ in diffs
+													  if ChangeType(diff.change_type) == ChangeType.MODIFIED], curr_branch_commit)
+			try:
+				scheduler.run()
+			finally:
+				self.__chunk_executor.shutdown()
+				# Every update is already in the cache database, export it once
+				utils.save_cache(self.output_dir, self.cache)
 
 			create_documentation(self.output_dir)	
 			total = round(time.time() - start_time, 3)
 			print(f"Total time taken to execute doc update: {total}s.")
 
-	def _initialize(self):
+	def _initialize(self, diffs=None, main_branch_commit=None, curr_branch_commit=None):
 		"""
 		Initialize all necessary dependencies for the documentation update process.
 		The reason for this method is to ensure that all dependencies are only initialized
 		when required, and not if there are no new changes in the repository.
+		With the diffs from the main branch, the call graph stored for main is updated
+		incrementally for the changed files instead of parsing the whole repository.
 
 		The following dependencies are initialized:
 		- Assistant Agent
 		- User Agent
 		- Graph & Call Graph
 		- BFS Exploration
+		- Callee Index
 		- Cache
 		"""
-		# Load assistants
-		self.assistant = autogen_utils.load_assistant_agent()
-		self.user = autogen_utils.load_user_agent()
+		# Load assistants (one pair per worker thread, see `user` and `assistant`)
+		self.__agents = threading.local()
+
+		# The LLM requests of the concurrent updates (chunks included) hold one of these slots, and the
+		# chunks of the large files are documented on one shared pool
+		self.__llm_slots = threading.BoundedSemaphore(get_max_workers())
+		self.__chunk_executor = ThreadPoolExecutor(max_workers=get_max_workers())
+
+		# The modified files skipped as up to date
+		self.__skipped = set()
 
-		# Generate graph
-		code2flow_utils.generate_graph(self.root_folder, self.output_dir)
-		self.graph = code2flow_utils.get_call_graph(self.output_dir)
+		# Generate graph (or reuse the analysis stored for the current tree, or update main's)
+		graph, _ = load_call_graph(self.root_folder, self.output_dir, **self._graph_update_args(
+			diffs, main_branch_commit, curr_branch_commit))
+		self.graph = CompactCallGraph(graph, self.root_folder)
 
-		# Build BFS exploration of the call graph
-		self.bfs_explore = code2flow_utils.explore_call_graph(self.graph)
+		# Direct callees of every function, explored by the callee index
+		self.bfs_explore = self.graph.adjacency()
+
+		# Index the callee context of the files (lazily, only the changed files and parents are needed)
+		self.callee_index = CalleeIndex(self.graph, self.bfs_explore)
 
 		# Load cache
 		self.cache = utils.get_cache(self.output_dir)
 
+	def _graph_update_args(self, diffs, main_branch_commit, curr_branch_commit):
+		"""
+		Returns the arguments to update main's call graph for the diffs, if the working tree
+		is the current branch commit.
+		"""
+		if not diffs or self.repo.is_dirty() or self.repo.head.commit != curr_branch_commit:
+			return {}
+		changed_files, deleted_files = [], []
+		for diff in diffs:
+			change_type = ChangeType(diff.change_type)
+			if change_type in (ChangeType.DELETED, ChangeType.RENAMED):
+				deleted_files.append(self._file_path(diff))
+			if change_type != ChangeType.DELETED:
+				changed_files.append(os.path.abspath(os.path.join(self.root_folder, diff.b_path or diff.a_path)))
+		return {
+			'base_tree_sha': main_branch_commit.tree.hexsha,
+			'changed_files': changed_files,
+			'deleted_files': deleted_files,
+		}
+
+	@property
+	def user(self):
+		self.__load_agents()
+		return self.__agents.user
+
+	@property
+	def assistant(self):
+		self.__load_agents()
+		return self.__agents.assistant
+
+	def __load_agents(self):
+		"""
+		Loads the agents of the current thread: a conversation must not be shared by concurrent updates.
+		"""
+		if not hasattr(self.__agents, 'user'):
+			self.__agents.assistant = autogen_utils.load_assistant_agent()
+			self.__agents.user = autogen_utils.load_user_agent()
+
+	def _schedule_update(self, scheduler, diff, changes, main_branch_commit, curr_branch_commit):
+		"""
+		Adds the update of the changed file to the scheduler.
+		"""
+		path = self._file_path(diff)
+		change_type = ChangeType(diff.change_type)
+
+		# 6a. Generate new documentation if the file is not cached
+		if change_type == ChangeType.ADDED:
+			scheduler.add(path, lambda: self._create_docs(path, curr_branch_commit), resource=path)
+
+		# 6c. If the file has been modified, update the documentation (its parents are updated by
+		# `_schedule_parent_updates`)
+		elif change_type == ChangeType.MODIFIED:
+			scheduler.add(path, lambda: self._update_modified(path, main_branch_commit, curr_branch_commit, changes),
+						  resource=path)
+
+		# 6d. If the file has been renamed
+		elif change_type == ChangeType.RENAMED:
+			# TODO: Handle renamed files
+			pass
+		# 6e. If the file has been deleted
+		elif change_type == ChangeType.DELETED:
+			self._handle_deleted(path)
+
+	def _schedule_parent_updates(self, scheduler, paths, curr_branch_commit):
+		"""
+		Adds one update per parent dependency of the modified files to the scheduler, with all the
+		affected functions and upstream changes, after the updates of the changed files.
+		"""
+		parent_updates = self.analysis.parent_updates(paths)
+		print(f'Parent dependencies: {parent_updates}')
+		for parent_path, (upstream, _) in parent_updates.items():
+			scheduler.add(('parent', parent_path), lambda parent_path=parent_path, children=list(upstream):
+						  self._update_parent(parent_path, curr_branch_commit, children),
+						  after=list(upstream), resource=parent_path)
+
+	def _update_modified(self, path, main_branch_commit, curr_branch_commit, changes):
+		# 6b. Skip if the file has not been modified since last update
+		if self._is_up_to_date(self.cache.get(path), path, curr_branch_commit):
+			print(f'Skipping documentation update for file={path} as it has not been modified since last update.')
+			# Its parents are skipped as well
+			self.__skipped.add(path)
+			return
+		self._update_docs(file_path=path, main_branch_commit=main_branch_commit, current_branch_commit=curr_branch_commit, changes=changes)
+
+	def _is_up_to_date(self, cached, path, commit):
+		"""
+		Returns True if the cached documentation was generated for the content of the file at the commit.
+		The blob SHAs are compared first, the content is only read and hashed if they differ.
+		"""
+		if cached is None:
+			return False
+		if cached.blob_sha is not None and cached.blob_sha == self.analysis.blob_sha(path, commit):
+			return True
+		return cached.source_file_hash == sha256_hash(self.analysis.content(path, commit))
+
 	def _get_old_file_docs(self, cache, file_path):
 		cached_docs_path = cache.get(file_path).generated_docs_path
 		return utils.read_file_content(cached_docs_path)
@@ -139,46 +247,40 @@ class DocumentationUpdate():
 		path = os.path.abspath(path)
 		return path
 
-	def _new_commit_content(self, file_path, current_branch_commit):
-		return git_utils.get_file__commit_content(self.root_folder, file_path, current_branch_commit)
-
 	def _create_docs(self, file_path, current_branch_commit):
 		print(f"Generating documentation for file={file_path}")
 		# 1. Get the file content
-		content = git_utils.get_file__commit_content(self.root_folder,
-													 file_path, current_branch_commit)
+		content = self.analysis.content(file_path, current_branch_commit)
 
 		# 2. Prepare additional context for LLM
-		additional_docs = utils.get_additional_docs_path(
-			file_path, self.graph, self.bfs_explore)
-
-		# 3. Generate the documentation for the file
-		docs = autogen_utils.get_documentation(
-			file_path=file_path,
-			file_content=content,
-			additional_docs=additional_docs,
-			user=self.user,
-			assistant=self.assistant,
-			output_dir=self.output_dir,
-			root_folder=self.root_folder,
-			save_debug=True
-		)
+		additional_docs = self.callee_index.get_context(file_path)
+
+		# 3. Generate the documentation for the file (a large file chunk by chunk, concurrently)
+		def generate(chunk):
+			with self.__llm_slots:
+				return autogen_utils.get_documentation(
+					file_path=file_path,
+					file_content=chunk,
+					additional_docs=additional_docs,
+					user=self.user,
+					assistant=self.assistant,
+					output_dir=self.output_dir,
+					root_folder=self.root_folder,
+					save_debug=True
+				)
+
+		chunks = get_chunks(content)
+		if len(chunks) == 1:
+			docs = generate(content)
+		else:
+			print(f"Documenting file={file_path} in {len(chunks)} chunks")
+			docs = doc_sections.merge_documents(list(self.__chunk_executor.map(generate, chunks)))
 
 		# 4. Write the generated documentation to the output directory and save to cache
 		self._write_docs_and_cache(file_path, content, docs)
 
-	def _get_changes(self, diff, main_branch_commit, curr_branch_commit):
-		path = self._file_path(diff)
-		old_content = git_utils.get_file__commit_content(self.root_folder, path, main_branch_commit)
-		new_content = git_utils.get_file__commit_content(self.root_folder, path, curr_branch_commit)
-		return ast_utils.get_function_changes(path, old_content, new_content)
-
-	
-	def _parents_count(self, path, changes):
-		filtered = ast_utils.filter_changes(changes)
-		parent_dependencies = code2flow_utils.get_parent_dependencies(
-			self.graph, filtered, path)
-		return len(parent_dependencies)
+	def _parents_count(self, path):
+		return len(self.analysis.parent_dependencies(path))
 
 	def _update_docs(self, file_path,
 					 main_branch_commit,
@@ -187,86 +289,122 @@ class DocumentationUpdate():
 					 additional_functions_info=None):
 		print(f"Updating documentation for file={file_path}")
 		# 1. Get the file contents from the main and current branch
-		old_content = git_utils.get_file__commit_content(self.root_folder,
-														 file_path, main_branch_commit)
-		new_content = git_utils.get_file__commit_content(self.root_folder,
-														 file_path, current_branch_commit)
+		old_content = self.analysis.content(file_path, main_branch_commit)
+		new_content = self.analysis.content(file_path, current_branch_commit)
 
 		# 2. Get the unified diff between the old and new file contents
-		diff = git_utils.get_unified_diff(old_content, new_content)
+		diff = self.analysis.unified_diff(file_path)
 
 		# 3. Find out all the relevant changes in the functions
-		filtered = ast_utils.filter_changes(changes)
+		filtered = self.analysis.filtered_changes(file_path)
 		print(f'Filtered changes: {filtered}')
-		parent_dependencies = code2flow_utils.get_parent_dependencies(
-			self.graph, filtered, file_path)
 
 		# 5. Prepare additional context for LLM
-		additional_docs = utils.get_additional_docs_path(
-			file_path, self.graph, self.bfs_explore)
+		additional_docs = self.callee_index.get_context(file_path)
 
 		if additional_functions_info:
 			additional_docs += additional_functions_info
 
-		# 6. Update the documentation based on the diffs and additional docs
-		updated_docs = autogen_utils.get_updated_documentation(
-			file_path=file_path,
-			old_file_docs=self._get_old_file_docs(self.cache, file_path),
-			old_file_content=old_content,
-			new_file_content=new_content,
-			diff=diff,
-			additional_docs=additional_docs,
-			changes=self._changes_to_string(changes),
-			user=self.user,
-			assistant=self.assistant,
-			output_dir=self.output_dir,
-			save_debug=True
-		)
+		# 6. Update the sections of the documentation affected by the changed functions (and the new ones)
+		def update(old_file_docs, sections=None):
+			with self.__llm_slots:
+				return autogen_utils.get_updated_documentation(
+					file_path=file_path,
+					old_file_docs=old_file_docs,
+					old_file_content=old_content,
+					new_file_content=new_content,
+					diff=diff,
+					additional_docs=additional_docs,
+					changes=self._changes_to_string(changes),
+					user=self.user,
+					assistant=self.assistant,
+					output_dir=self.output_dir,
+					save_debug=True,
+					sections=sections
+				)
+
+		# The sections of the changed functions, and of the classes and functions with any changed line
+		names = doc_sections.get_top_level_names(new_content)
+		affected = {doc_sections.get_section_name(change.name, names) for change in changes
+					if change.type != FunctionChangeType.EQUAL}
+		affected |= doc_sections.get_changed_sections(diff, old_content, new_content)
+		updated_docs = self._update_sections(self._get_old_file_docs(self.cache, file_path), names,
+											 doc_sections.get_top_level_names(old_content), affected, update)
 
 		# 7. Write the updated documentation to the output directory and save to cache
 		self._write_docs_and_cache(file_path, new_content, updated_docs)
 
-		# 8. For each parent dependency (file -> all functions affected by changes), update docs
-		print(f'Parent dependencies: {parent_dependencies}')
-		for path, functions in parent_dependencies.items():
-			new_content = git_utils.get_file__commit_content(self.root_folder,
-													path, current_branch_commit)
-			self._update_parent(path, current_branch_commit,
-								new_content, filtered, functions)
+		# 8. The parent dependencies (file -> all functions affected by changes) are updated once
+		# for all the changed files, see `_schedule_parent_updates`
 
-	def _update_parent(self, file_path, curr_branch_commit,
-					   new_content, filtered, functions):
+	def _update_parent(self, file_path, curr_branch_commit, children):
+		"""
+		Updates the documentation of the parent file once for all its changed children.
+		children: the changed files the parent depends on.
+		"""
 		cached = self.cache.get(file_path)
 		assert cached is not None, f"File {file_path} not found in cache."
 
+		# The children skipped as up to date do not update their parents, nor the functions calling them
+		children = [path for path in children if path not in self.__skipped]
+		if not children:
+			return
+		# upstream: dict mapping (changed file, its changed functions), functions: the affected functions
+		upstream, functions = self.analysis.parent_updates(children)[file_path]
+
 		print(f'Updating parent dependency for file={file_path}')
-		print(f"New content for parent dependency: {new_content}")
   
-		parent_content = git_utils.get_file__commit_content(self.root_folder,
-		 												 file_path, curr_branch_commit)
+		parent_content = self.analysis.content(file_path, curr_branch_commit)
 
-		# Update the documentation based on the diffs and additional docs
-
-
-		additional_docs = utils.get_additional_docs_path(file_path, self.graph, self.bfs_explore)
+		additional_docs = self.callee_index.get_context(file_path)
   
-		# Update the documentation based on the diffs and additional docs
-		updated_docs = autogen_utils.get_updated_parent_documentation(
-			file_path=file_path,
-			updated_functions=filtered,
-			additional_docs=additional_docs,
-			new_content=new_content,
-			functions=functions,
-			parent_content=parent_content,
-			old_parent_docs = self._get_old_file_docs(self.cache, file_path),
-			user=self.user,
-			assistant=self.assistant,
-			output_dir=self.output_dir,
-			save_debug=True
-		)
+		# Update the sections of the affected functions based on the upstream changes and additional docs
+		def update(old_parent_docs, sections=None):
+			with self.__llm_slots:
+				return autogen_utils.get_updated_parent_documentation(
+					file_path=file_path,
+					updated_functions=upstream,
+					additional_docs=additional_docs,
+					functions=functions,
+					parent_content=parent_content,
+					old_parent_docs=old_parent_docs,
+					user=self.user,
+					assistant=self.assistant,
+					output_dir=self.output_dir,
+					save_debug=True,
+					sections=sections
+				)
+
+		names = doc_sections.get_top_level_names(parent_content)
+		affected = {doc_sections.get_section_name(function, names) for function in functions}
+		updated_docs = self._update_sections(self._get_old_file_docs(self.cache, file_path), names, names, affected, update)
 
 		# Write the updated documentation to the output directory and save to cache
-		self._write_docs_and_cache(file_path, new_content, updated_docs)
+		self._write_docs_and_cache(file_path, parent_content, updated_docs)
+
+	def _update_sections(self, old_docs, names, old_names, affected, update):
+		"""
+		Sends only the affected sections of the documentation to `update(old_sections, section_names)`
+		and splices the revised sections back in; the sections of the functions and classes that
+		no longer exist are dropped, and the ones that are new are added.
+		The whole documentation is updated (`update(old_docs)`) if it has no recognizable sections, or
+		if module-level code is affected (see `doc_sections.get_changed_sections`).
+		names: the top level functions and classes of the file, old_names: the ones of the previous version.
+		"""
+		sections = doc_sections.get_sections(old_docs)
+		if doc_sections.MODULE_LEVEL in affected or not any(name.split('.')[0] in names for name in sections):
+			return update(old_docs)
+		revised = [name for name in names if name in affected or (name not in sections and name not in old_names)]
+		removed = [name for name in sections if name.split('.')[0] not in names]
+		if not revised:
+			return doc_sections.splice_sections(old_docs, {}, removed)
+		print(f'Updating documentation sections: {revised}')
+		old_sections = '\n\n'.join(sections[name] for name in revised if name in sections)
+		response = doc_sections.get_sections(update(old_sections, revised))
+		if not response:
+			return update(old_docs)
+		return doc_sections.splice_sections(old_docs, {name: text for name, text in response.items() if name in revised},
+											removed)
 
 	def _write_docs_and_cache(self, file_path, content, docs):
 		# Write the updated documentation to the output directory
@@ -275,9 +413,8 @@ class DocumentationUpdate():
 												  file_path=file_path,
 												  docs=docs)
 
-		# 7. Update the cache with the new documentation path and save
+		# 7. Update the cache with the new documentation path (a transaction of the cache database)
 		self.cache.update_docs(file_path, content, updated_docs_path)
-		utils.save_cache(self.output_dir, self.cache)
 
 	def _handle_deleted(self, file_path):
 		print(f"File deleted: {file_path}")
@@ -290,8 +427,7 @@ class DocumentationUpdate():
 
 	def update_documentation_based_on_comment(self, file_path, comment, curr_branch_commit):
 		# Convert the relative file path to an absolute path		
-		new_content = git_utils.get_file__commit_content(self.root_folder,
-													file_path, curr_branch_commit)
+		new_content = self.analysis.content(file_path, curr_branch_commit)
 
 		# Read the current file content
 		with open(file_path, 'r') as f:
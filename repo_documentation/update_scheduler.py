@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+"""
+Runs the documentation updates of a PR as a DAG of tasks on a worker pool: a task starts once
+all the tasks it depends on have completed, and independent tasks run concurrently.
+"""
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def get_max_workers() -> int:
+    """
+    Returns the number of concurrent updates, read from the MAX_CONCURRENCY environment variable.
+    """
+    return max(1, int(os.getenv('MAX_CONCURRENCY') or DEFAULT_MAX_WORKERS))
+
+
+class UpdateScheduler():
+    """
+    A DAG of update tasks. Tasks are added with the keys of the tasks they must run after;
+    unknown keys are ignored, so that a dependency on a task that was not scheduled is satisfied.
+    Tasks on the same resource (e.g. the documentation of a file) run one after the other, in the
+    order they were added.
+
+    Args:
+        max_workers (int): The number of tasks run concurrently (defaults to `get_max_workers`).
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or get_max_workers()
+        self.tasks = {}
+        self.dependencies = {}
+        self.__last_on_resource = {}
+
+    def add(self, key, task, after=(), resource=None):
+        """
+        Adds the task (a callable without arguments) to run after the tasks `after`,
+        and after the previous task on `resource`.
+        """
+        if key in self.tasks:
+            raise ValueError(f'Task {key} is already scheduled.')
+        self.tasks[key] = task
+        self.dependencies[key] = list(after)
+        if resource is not None:
+            if resource in self.__last_on_resource:
+                self.dependencies[key].append(self.__last_on_resource[resource])
+            self.__last_on_resource[resource] = key
+        return key
+
+    def run(self):
+        """
+        Runs every task, dependencies first. If a task fails, no further task is started,
+        the running ones are awaited and the first error is raised.
+        """
+        remaining = {key: {dependency for dependency in dependencies if dependency in self.tasks}
+                     for key, dependencies in self.dependencies.items()}
+        dependents = {key: [] for key in self.tasks}
+        for key, dependencies in remaining.items():
+            for dependency in dependencies:
+                dependents[dependency].append(key)
+        ready = [key for key, dependencies in remaining.items() if not dependencies]
+        running = {}
+        done = 0
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while ready or running:
+                while ready and error is None:
+                    key = ready.pop(0)
+                    running[executor.submit(self.tasks[key])] = key
+                if not running:
+                    break
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    key = running.pop(future)
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                        continue
+                    done += 1
+                    for dependent in dependents[key]:
+                        remaining[dependent].discard(key)
+                        if not remaining[dependent]:
+                            ready.append(dependent)
+
+        if error is not None:
+            raise error
+        if done != len(self.tasks):
+            raise ValueError('The update tasks have a dependency cycle.')
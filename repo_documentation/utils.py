@@ -3,7 +3,18 @@ from enum import Enum
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), './../')))
 
 from cache.docs_cache import DocsCache
+from cache.sqlite_docs_cache import SqliteDocsCache, CACHE_DB_NAME
+from cache.run_journal import JOURNAL_FILE_NAME
+from llm_utils.response_cache import CACHE_FILE_NAME as RESPONSE_CACHE_FILE_NAME
+from analysis.store import STORE_FOLDER_NAME
 from code2flow.code2flow import utils as code2flow_utils
+from analysis.context_packer import collect_callees, pack_callee_context
+
+# The local state of the docs output, kept out of the documentation commits: the SQLite databases
+# (with their WAL files), the stored analyses, the rendered fragments (see `merger.FRAGMENT_CACHE_FOLDER`)
+# and the run journal. The cache database is imported from `cache.json` in a fresh checkout or after a pull.
+GITIGNORE_PATTERNS = [f'{CACHE_DB_NAME}*', f'{RESPONSE_CACHE_FILE_NAME}*', f'{STORE_FOLDER_NAME}/',
+                      'merge_cache/', JOURNAL_FILE_NAME]
 
 class Mode(Enum):
     CREATE = 1
@@ -18,17 +29,67 @@ def read_file_content(file_path):
         return file.read()
 
 
-def get_cache(output_dir):
+def get_cache(output_dir) -> SqliteDocsCache:
+    """
+    Returns the cache database of the output directory.
+    The `cache.json` is imported into the database if there is none yet (a fresh checkout), or if it
+    was changed since the database last exported or imported it (e.g. by a pull).
+    """
+    db_path = os.path.join(output_dir, CACHE_DB_NAME)
     cache_path = os.path.join(output_dir, 'cache.json')
-    assert os.path.exists(cache_path), f"Cache file not found at {cache_path}"
-    with open(cache_path, 'r', encoding='utf-8') as file:
-        return DocsCache().from_dict(json.load(file))
+    if os.path.exists(db_path):
+        cache = SqliteDocsCache(db_path)
+        if not os.path.exists(cache_path) or not cache.is_json_changed(cache_path):
+            return cache
+    else:
+        assert os.path.exists(cache_path), f"Cache file not found at {cache_path}"
+        cache = SqliteDocsCache(db_path)
+    cache.import_json(cache_path)
+    return cache
+
+
+def get_reusable_docs(output_dir, journal, resume=False, skip_unchanged=False) -> dict:
+    """
+    Returns a dict mapping: (source file path, Document) of the docs a full generation run may reuse.
+    With `skip_unchanged`, every document of the existing cache is a candidate.
+    With `resume`, the files completed by an interrupted run (recorded in the journal) are candidates.
+    Candidates are only reused if they match the current content (see `cache.run_journal.is_up_to_date`).
+    """
+    reusable = {}
+    if skip_unchanged and (os.path.exists(os.path.join(output_dir, CACHE_DB_NAME))
+                           or os.path.exists(os.path.join(output_dir, 'cache.json'))):
+        reusable.update(get_cache(output_dir).items())
+    if resume:
+        reusable.update(journal.load())
+    return reusable
 
 
 def save_cache(output_dir, cache : DocsCache):
-    cache_path = os.path.join(output_dir, 'cache.json')
-    with open(cache_path, 'w', encoding='utf-8') as file:
-        json.dump(cache.to_dict(), file, indent=4)
+    """
+    Saves an in-memory cache to the cache database (replacing its content), and exports the
+    database to the legacy `cache.json`. A `SqliteDocsCache` is already saved, so it is only exported.
+    The database itself is not committed with the docs (see `write_gitignore`).
+    """
+    if not isinstance(cache, SqliteDocsCache):
+        db = SqliteDocsCache(os.path.join(output_dir, CACHE_DB_NAME))
+        db.replace(cache.items())
+        cache = db
+    cache.export_json(os.path.join(output_dir, 'cache.json'))
+    write_gitignore(output_dir)
+
+
+def write_gitignore(output_dir):
+    """
+    Adds the patterns of the local state (see `GITIGNORE_PATTERNS`) to the `.gitignore` of the docs output.
+    """
+    path = os.path.join(output_dir, '.gitignore')
+    existing = read_file_content(path).splitlines() if os.path.exists(path) else []
+    missing = [pattern for pattern in GITIGNORE_PATTERNS if pattern not in existing]
+    if missing:
+        with open(path, 'a', encoding='utf-8') as file:
+            if existing and not read_file_content(path).endswith('\n'):
+                file.write('\n')
+            file.write(''.join(f'{pattern}\n' for pattern in missing))
 
 
 def save_prompt_debug(output_dir, file_path, prompt_message, mode):
@@ -101,38 +162,14 @@ def get_additional_docs_path(file_path, graph, bfs_explore):
         additional_docs += get_additional_docs_calls(calls, graph, bfs_explore)
     return additional_docs
 
-def get_additional_docs_calls(calls, graph, bfs_explore, max_depth=5):
-    additional_docs = ""
-    processed_callees = set()
-
-    for call_name in calls:
-        call = graph[call_name]
-        if 'EXTERNAL' in call['file_name']:
-            continue
-        queue = [(call_name, 0)]
-        visited = set()
-
-        while queue:
-            current_call, depth = queue.pop(0)
-            if depth > max_depth:
-                continue
-            if current_call in visited:
-                continue
-            visited.add(current_call)
-
-            caller_file = graph[current_call]['file_name']
-
-            for callee in bfs_explore.get(current_call, []):
-                callee_call = graph[callee]
-                callee_file = callee_call['file_name']
-
-                if 'EXTERNAL' not in callee_file and callee not in processed_callees and caller_file != callee_file:
-                    additional_docs += f"\nFunction/Class {callee_call['name']}:\n{callee_call['content']}\n"
-                    processed_callees.add(callee)
-                if depth < max_depth and callee not in visited:
-                    queue.append((callee, depth + 1))
-
-    return additional_docs
+def get_additional_docs_calls(calls, graph, bfs_explore, max_depth=5, budget=None):
+    """
+    Returns the source of the cross-file callees of `calls`, packed into a token budget
+    (CONTEXT_TOKEN_BUDGET by default). Closer and more frequently called callees come first;
+    the ones that do not fit are reduced to their signature and docstring.
+    """
+    callees = collect_callees(calls, graph, bfs_explore, max_depth)
+    return pack_callee_context(callees, graph, budget)
 
 def __get_project_relative_path(output_dir, file_path):
     project_relative_path = os.path.relpath(file_path, output_dir)
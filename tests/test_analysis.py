@@ -0,0 +1,590 @@
+import os
+import sys
+import tempfile
+import unittest
+import git
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), './../')))
+
+from analysis import scheduling, context_packer
+from analysis.callee_index import CalleeIndex
+from analysis.compact_graph import CompactCallGraph
+from analysis import snapshot, store, incremental_graph
+from analysis.function_changes import get_functions_from_content, get_function_changes
+from analysis.similarity import SimilarityIndex, get_shingles, get_signature, estimate_jaccard
+from analysis.chunking import get_chunks, split_into_chunks
+from code2flow.code2flow.ast_utils import FunctionChangeType
+from code2flow.code2flow import utils as code2flow_utils
+
+def node(file_name, callees=()):
+    return {'file_name': file_name, 'callers': [], 'callees': list(callees)}
+
+class TestScheduling(unittest.TestCase):
+    def setUp(self):
+        # a.py -> b.py -> c.py, d.py <-> e.py -> c.py, f.py is isolated
+        self.graph = {
+            'a::main': node('a.py', ['b::run', 'a::helper', 'EXTERNAL::print']),
+            'a::helper': node('a.py'),
+            'b::run': node('b.py', ['c::util']),
+            'c::util': node('c.py'),
+            'd::ping': node('d.py', ['e::pong']),
+            'e::pong': node('e.py', ['d::ping', 'c::util']),
+            'f::alone': node('f.py'),
+            'EXTERNAL::print': node('EXTERNAL'),
+        }
+
+    def test_get_file_dependencies(self):
+        dependencies = scheduling.get_file_dependencies(self.graph)
+        self.assertEqual(dependencies['a.py'], {'b.py'})
+        self.assertEqual(dependencies['b.py'], {'c.py'})
+        self.assertEqual(dependencies['c.py'], set())
+        self.assertEqual(dependencies['e.py'], {'d.py', 'c.py'})
+        self.assertNotIn('EXTERNAL', dependencies)
+
+    def test_get_file_dependencies_restricted(self):
+        dependencies = scheduling.get_file_dependencies(self.graph, ['a.py', 'c.py'])
+        self.assertEqual(dependencies, {'a.py': set(), 'c.py': set()})
+
+    def test_get_strongly_connected_components(self):
+        dependencies = scheduling.get_file_dependencies(self.graph)
+        components = scheduling.get_strongly_connected_components(dependencies)
+        self.assertIn(['d.py', 'e.py'], components)
+        self.assertEqual(len(components), 5)
+        # Reverse topological order: dependencies come first
+        position = {file: i for i, component in enumerate(components) for file in component}
+        self.assertLess(position['c.py'], position['b.py'])
+        self.assertLess(position['b.py'], position['a.py'])
+        self.assertLess(position['c.py'], position['e.py'])
+
+    def test_get_generation_levels(self):
+        levels = scheduling.get_generation_levels(self.graph)
+        self.assertEqual(levels, [
+            ['c.py', 'f.py'],
+            ['b.py', 'd.py', 'e.py'],
+            ['a.py'],
+        ])
+
+    def test_get_generation_levels_deep_chain(self):
+        graph = {f'f{i}': node(f'{i}.py', [f'f{i + 1}']) for i in range(5000)}
+        graph['f5000'] = node('5000.py')
+        levels = scheduling.get_generation_levels(graph)
+        self.assertEqual(len(levels), 5001)
+        self.assertEqual(levels[0], ['5000.py'])
+
+    def test_get_generation_levels_empty(self):
+        self.assertEqual(scheduling.get_generation_levels({}), [])
+
+
+def function(file_name, name, content):
+    return {'file_name': file_name, 'name': name, 'content': content, 'callers': [], 'callees': []}
+
+def fake_count_tokens(text, model=None):
+    return len(text.split())
+
+class TestContextPacker(unittest.TestCase):
+    def setUp(self):
+        self.graph = {
+            'main': function('a.py', 'main', 'def main():\n    run()\n    log()'),
+            'local': function('a.py', 'local', 'def local(): pass'),
+            'run': function('b.py', 'run', 'def run():\n    """Runs it."""\n    log()\n    deep()'),
+            'log': function('c.py', 'log', 'def log(): pass'),
+            'deep': function('d.py', 'deep', 'def deep(x):\n    """Deep work."""\n' + '    x += 1\n' * 50),
+            'EXTERNAL::print': function('EXTERNAL', 'print', ''),
+        }
+        self.bfs_explore = {
+            'main': {'run': {}, 'log': {}, 'local': {}, 'EXTERNAL::print': {}},
+            'local': {},
+            'run': {'log': {}, 'deep': {}},
+            'log': {},
+            'deep': {},
+        }
+
+    def test_collect_callees(self):
+        callees = context_packer.collect_callees(['main', 'local'], self.graph, self.bfs_explore)
+        self.assertEqual(callees, [('log', 1, 2), ('run', 1, 1), ('deep', 2, 1)])
+
+    def test_collect_callees_max_depth(self):
+        callees = context_packer.collect_callees(['main'], self.graph, self.bfs_explore, max_depth=0)
+        self.assertEqual([callee for callee, _, _ in callees], ['log', 'run'])
+
+    def test_summarize_source(self):
+        summary = context_packer.summarize_source(self.graph['deep']['content'])
+        self.assertIn('def deep(x):', summary)
+        self.assertIn('Deep work.', summary)
+        self.assertNotIn('x += 1', summary)
+
+    def test_summarize_method(self):
+        summary = context_packer.summarize_source('    def method(self):\n        return 1')
+        self.assertEqual(summary, 'def method(self):\n    ...')
+
+    def test_summarize_invalid_source(self):
+        self.assertEqual(context_packer.summarize_source('def broken(:\n  pass'), 'def broken(:')
+
+    @patch('analysis.context_packer.count_tokens', side_effect=fake_count_tokens)
+    def test_pack_unbounded(self, mock_count_tokens):
+        callees = context_packer.collect_callees(['main'], self.graph, self.bfs_explore)
+        docs = context_packer.pack_callee_context(callees, self.graph, budget=10_000)
+        self.assertLess(docs.index('Function/Class log'), docs.index('Function/Class run'))
+        self.assertIn('x += 1', docs)
+
+    @patch('analysis.context_packer.count_tokens', side_effect=fake_count_tokens)
+    def test_pack_falls_back_to_summary(self, mock_count_tokens):
+        callees = context_packer.collect_callees(['main'], self.graph, self.bfs_explore)
+        docs = context_packer.pack_callee_context(callees, self.graph, budget=40)
+        self.assertIn('Function/Class deep', docs)
+        self.assertIn('Deep work.', docs)
+        self.assertNotIn('x += 1', docs)
+
+    @patch('analysis.context_packer.count_tokens', side_effect=fake_count_tokens)
+    def test_pack_skips_what_does_not_fit(self, mock_count_tokens):
+        callees = context_packer.collect_callees(['main'], self.graph, self.bfs_explore)
+        docs = context_packer.pack_callee_context(callees, self.graph, budget=6)
+        self.assertIn('Function/Class log', docs)
+        self.assertNotIn('Function/Class deep', docs)
+
+    @patch.dict(os.environ, {'CONTEXT_TOKEN_BUDGET': '123'})
+    def test_get_context_token_budget(self):
+        self.assertEqual(context_packer.get_context_token_budget(), 123)
+
+
+class TestCalleeIndex(unittest.TestCase):
+    def setUp(self):
+        self.graph = {
+            'main': function('a.py', 'main', 'def main(): run()'),
+            'run': function('b.py', 'run', 'def run(): log()'),
+            'log': function('c.py', 'log', 'def log(): pass'),
+        }
+        self.bfs_explore = {'main': {'run': {}}, 'run': {'log': {}}, 'log': {}}
+        self.index = CalleeIndex(self.graph, self.bfs_explore).build()
+
+    def test_get_callees(self):
+        self.assertEqual(self.index.get_callees('a.py'), [('run', 1, 1), ('log', 2, 1)])
+        self.assertEqual(self.index.get_callees('c.py'), [])
+        self.assertEqual(self.index.get_callees('missing.py'), [])
+
+    def test_get_context(self):
+        docs = self.index.get_context('a.py', budget=10_000)
+        self.assertEqual(docs, '\nFunction/Class run:\ndef run(): log()\n'
+                               '\nFunction/Class log:\ndef log(): pass\n')
+
+    def test_get_context_matches_packer(self):
+        callees = context_packer.collect_callees(['main'], self.graph, self.bfs_explore)
+        expected = context_packer.pack_callee_context(callees, self.graph, budget=10_000)
+        self.assertEqual(self.index.get_context('a.py', budget=10_000), expected)
+
+    def test_invalidate(self):
+        self.assertIn('pass', self.index.get_context('b.py', budget=10_000))
+        self.graph['log']['content'] = 'def log(): print()'
+        self.bfs_explore['main'] = {}
+        self.index.invalidate(['a.py'])
+        self.assertEqual(self.index.get_callees('a.py'), [])
+        # The formatted sources are only dropped by a full invalidation
+        self.assertIn('pass', self.index.get_context('b.py', budget=10_000))
+        self.index.invalidate()
+        self.assertIn('print()', self.index.get_context('b.py', budget=10_000))
+
+
+class TestCompactCallGraph(unittest.TestCase):
+    def setUp(self):
+        self.sample_graph = {
+            'func1': {'file_name': 'file1.py', 'callers': [], 'callees': ['func2', 'func3']},
+            'func2': {'file_name': 'file1.py', 'callers': ['func1'], 'callees': ['func4']},
+            'func3': {'file_name': 'file2.py', 'callers': ['func1'], 'callees': []},
+            'func4': {'file_name': 'file2.py', 'callers': ['func2'], 'callees': ['EXTERNAL::dict']},
+            'EXTERNAL::dict': {'file_name': 'EXTERNAL', 'callers': ['func4'], 'callees': []}
+        }
+        self.graph = CompactCallGraph(self.sample_graph)
+
+    def test_mapping(self):
+        self.assertEqual(len(self.graph), 5)
+        self.assertIn('func1', self.graph)
+        self.assertNotIn('func5', self.graph)
+        self.assertIsNone(self.graph.get('func5'))
+        for name, node in self.sample_graph.items():
+            self.assertEqual(self.graph[name]['file_name'], node['file_name'])
+            self.assertEqual(self.graph[name]['callees'], node['callees'])
+            self.assertEqual(self.graph[name]['callers'], node['callers'])
+            self.assertEqual(self.graph[name]['name'], name)
+
+    def test_get_file_to_functions(self):
+        self.assertEqual(self.graph.get_file_to_functions(), {
+            'file1.py': ['func1', 'func2'],
+            'file2.py': ['func3', 'func4'],
+            'EXTERNAL': ['EXTERNAL::dict']
+        })
+
+    def test_bfs(self):
+        self.assertEqual(list(self.graph.bfs(['func1'])),
+                         [('func1', 0), ('func2', 1), ('func3', 1), ('func4', 2), ('EXTERNAL::dict', 3)])
+        self.assertEqual(self.graph.reachable(['func1'], max_depth=1), {'func1', 'func2', 'func3'})
+        self.assertEqual(self.graph.reachable(['func4'], reverse=True), {'func4', 'func2', 'func1'})
+
+    def test_adjacency(self):
+        adjacency = self.graph.adjacency()
+        self.assertEqual(adjacency['func1'], ['func2', 'func3'])
+        self.assertEqual(adjacency.get('func3', []), [])
+        self.assertNotIn('EXTERNAL::dict', adjacency)
+        self.assertEqual(len(adjacency), 4)
+
+    def test_get_parent_dependencies(self):
+        result = self.graph.get_parent_dependencies(['func3', 'func4'], 'file2.py')
+        self.assertEqual(result, {'file1.py': ['func1', 'func2']})
+        self.assertEqual(self.graph.get_parent_dependencies(['func1'], 'file1.py'), {})
+
+    def test_content_offsets(self):
+        with tempfile.TemporaryDirectory() as root:
+            source = '# é\ndef main():\n    run()\n\n\ndef run():\n    pass\n'
+            with open(os.path.join(root, 'a.py'), 'w', encoding='utf-8') as file:
+                file.write(source)
+            graph = CompactCallGraph({
+                'main': function('a.py', 'main', 'def main():\n    run()'),
+                'run': function('a.py', 'run', 'def run():\n    pass'),
+                'moved': function('a.py', 'moved', 'def moved(): pass'),
+            }, root)
+            self.assertEqual(graph.inline_content, {2: 'def moved(): pass'})
+            self.assertEqual(graph['main']['content'], 'def main():\n    run()')
+            self.assertEqual(graph['run']['content'], 'def run():\n    pass')
+            self.assertEqual(graph['moved']['content'], 'def moved(): pass')
+
+    def test_callee_index(self):
+        graph = {
+            'main': function('a.py', 'main', 'def main(): run()'),
+            'run': function('b.py', 'run', 'def run(): pass'),
+        }
+        graph['main']['callees'] = ['run']
+        compact = CompactCallGraph(graph)
+        expected = CalleeIndex(graph, {'main': {'run': {}}, 'run': {}}).get_context('a.py', budget=10_000)
+        self.assertEqual(CalleeIndex(compact, compact.adjacency()).get_context('a.py', budget=10_000), expected)
+
+
+@patch('analysis.snapshot.load_call_graph')
+class TestAnalysisSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.root.name, 'a.py')
+        with open(self.path, 'w') as file:
+            file.write('def main(): pass\n')
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_get_tree_hash(self, mock_load):
+        tree_hash = snapshot.get_tree_hash(self.root.name)
+        os.makedirs(os.path.join(self.root.name, 'docs_output'))
+        with open(os.path.join(self.root.name, 'docs_output', 'b.py'), 'w') as file:
+            file.write('')
+        with open(os.path.join(self.root.name, 'README.md'), 'w') as file:
+            file.write('')
+        self.assertEqual(snapshot.get_tree_hash(self.root.name), tree_hash)
+        with open(self.path, 'a') as file:
+            file.write('def run(): pass\n')
+        self.assertNotEqual(snapshot.get_tree_hash(self.root.name), tree_hash)
+
+    def test_shared_per_tree(self, mock_load):
+        mock_load.return_value = ({'main': function('a.py', 'main', '')}, {'a.py': ['main']})
+        first = snapshot.get_analysis_snapshot(self.root.name)
+        self.assertIs(snapshot.get_analysis_snapshot(self.root.name), first)
+        self.assertEqual(mock_load.call_count, 1)
+        self.assertEqual(first.file_to_functions, {'a.py': ['main']})
+        self.assertEqual(list(first.graph), ['main'])
+
+        with open(self.path, 'a') as file:
+            file.write('def run(): pass\n')
+        self.assertIsNot(snapshot.get_analysis_snapshot(self.root.name), first)
+        self.assertEqual(mock_load.call_count, 2)
+
+
+class TestAnalysisStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.repo = git.Repo.init(self.root.name)
+        with self.repo.config_writer() as config:
+            config.set_value('user', 'name', 'test')
+            config.set_value('user', 'email', 'test@example.com')
+        self.path = os.path.join(self.root.name, 'a.py')
+        with open(self.path, 'w') as file:
+            file.write('def main(): pass\n')
+        self.repo.index.add(['a.py'])
+        self.repo.index.commit('init')
+        self.output_dir = os.path.join(self.root.name, 'docs_output')
+        self.graph = {'main': function('a.py', 'main', 'def main(): pass')}
+
+    def tearDown(self):
+        self.repo.close()
+        self.root.cleanup()
+
+    def test_get_git_tree_sha(self):
+        tree_sha = store.get_git_tree_sha(self.root.name)
+        self.assertEqual(tree_sha, self.repo.head.commit.tree.hexsha)
+        # Files other than Python sources do not invalidate the tree
+        os.makedirs(self.output_dir)
+        with open(os.path.join(self.output_dir, 'a.md'), 'w') as file:
+            file.write('docs')
+        self.assertEqual(store.get_git_tree_sha(self.root.name), tree_sha)
+        with open(self.path, 'a') as file:
+            file.write('def run(): pass\n')
+        self.assertIsNone(store.get_git_tree_sha(self.root.name))
+
+    def test_get_git_tree_sha_not_a_repo(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertIsNone(store.get_git_tree_sha(folder))
+
+    def test_save_and_load(self):
+        analysis_store = store.AnalysisStore(self.output_dir)
+        self.assertIsNone(analysis_store.load('abc'))
+        analysis_store.save('abc', self.graph, {'a.py': ['main']})
+        self.assertEqual(analysis_store.load('abc'), (self.graph, {'a.py': ['main']}))
+
+    def test_prune(self):
+        analysis_store = store.AnalysisStore(self.output_dir)
+        for i in range(store.MAX_STORED_TREES + 2):
+            analysis_store.save(f'tree{i}', self.graph, {})
+            os.utime(analysis_store._path(f'tree{i}'), (i, i))
+        analysis_store.save('last', self.graph, {})
+        self.assertEqual(len(os.listdir(analysis_store.folder)), store.MAX_STORED_TREES)
+        self.assertIsNone(analysis_store.load('tree0'))
+        self.assertIsNotNone(analysis_store.load('last'))
+
+    def test_load_under_another_root(self):
+        analysis_store = store.AnalysisStore(self.output_dir)
+        workspace, checkout = '/workspace/repo', '/home/user/repo'
+        graph = {f'{workspace}/a.py::main': dict(function(f'{workspace}/a.py', 'main', 'def main(): pass'),
+                                                  callees=[f'{workspace}/b.py::run'])}
+        analysis_store.save('abc', graph, {f'{workspace}/a.py': [f'{workspace}/a.py::main']}, workspace)
+        self.assertEqual(analysis_store.load('abc', workspace)[0], graph)
+
+        loaded, file_to_functions = analysis_store.load('abc', checkout)
+        self.assertEqual(list(loaded), [f'{checkout}/a.py::main'])
+        self.assertEqual(loaded[f'{checkout}/a.py::main']['file_name'], f'{checkout}/a.py')
+        self.assertEqual(loaded[f'{checkout}/a.py::main']['callees'], [f'{checkout}/b.py::run'])
+        self.assertEqual(file_to_functions, {f'{checkout}/a.py': [f'{checkout}/a.py::main']})
+
+    @patch('analysis.store.code2flow_utils')
+    def test_load_call_graph_in_another_checkout(self, mock_code2flow):
+        graph = {f'{self.path}::main': function(self.path, 'main', 'def main(): pass')}
+        mock_code2flow.get_call_graph.return_value = graph
+        mock_code2flow.get_file_to_functions.return_value = {self.path: [f'{self.path}::main']}
+        store.load_call_graph(self.root.name, self.output_dir)
+
+        with tempfile.TemporaryDirectory() as folder:
+            checkout = os.path.join(folder, 'checkout')
+            self.repo.clone(checkout).close()
+            loaded, file_to_functions = store.load_call_graph(checkout, self.output_dir)
+        path = os.path.join(checkout, 'a.py')
+        self.assertEqual(mock_code2flow.generate_graph.call_count, 1)
+        self.assertEqual(loaded, {f'{path}::main': function(path, 'main', 'def main(): pass')})
+        self.assertEqual(file_to_functions, {path: [f'{path}::main']})
+
+    @patch('analysis.store.code2flow_utils')
+    def test_load_call_graph(self, mock_code2flow):
+        mock_code2flow.get_call_graph.return_value = self.graph
+        mock_code2flow.get_file_to_functions.return_value = {'a.py': ['main']}
+        first = store.load_call_graph(self.root.name, self.output_dir)
+        second = store.load_call_graph(self.root.name, self.output_dir)
+        self.assertEqual(first, second)
+        self.assertEqual(mock_code2flow.generate_graph.call_count, 1)
+
+        with open(self.path, 'a') as file:
+            file.write('def run(): pass\n')
+        store.load_call_graph(self.root.name, self.output_dir)
+        self.assertEqual(mock_code2flow.generate_graph.call_count, 2)
+
+    @patch('analysis.store.update_call_graph')
+    @patch('analysis.store.code2flow_utils')
+    def test_load_call_graph_from_base_tree(self, mock_code2flow, mock_update):
+        mock_code2flow.get_call_graph.return_value = self.graph
+        mock_code2flow.get_file_to_functions.return_value = {'a.py': ['main']}
+        store.load_call_graph(self.root.name, self.output_dir)
+        base_tree_sha = self.repo.head.commit.tree.hexsha
+
+        with open(self.path, 'a') as file:
+            file.write('def run(): pass\n')
+        self.repo.index.add(['a.py'])
+        self.repo.index.commit('change')
+        mock_update.return_value = {'run': function('a.py', 'run', 'def run(): pass')}
+        store.load_call_graph(self.root.name, self.output_dir, base_tree_sha, [self.path])
+        mock_update.assert_called_once_with(self.graph, self.root.name, [self.path], (), self.output_dir)
+        self.assertEqual(mock_code2flow.generate_graph.call_count, 1)
+        # The updated graph is stored for the new tree
+        self.assertEqual(store.AnalysisStore(self.output_dir).load(self.repo.head.commit.tree.hexsha)[0],
+                         mock_update.return_value)
+
+
+def normalize_graph(graph):
+    return {key: (node['file_name'], node.get('content'), sorted(node['callers']), sorted(node['callees']))
+            for key, node in graph.items()}
+
+class TestIncrementalGraph(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.files = {
+            'a.py': 'from b import run\n\ndef main():\n    run()\n    helper()\n\ndef helper():\n    print()\n',
+            'b.py': 'def run():\n    util()\n\ndef unused():\n    pass\n',
+            'pkg/c.py': 'def util():\n    return 1\n\ndef common():\n    return 2\n',
+            'pkg/d.py': 'def other():\n    common()\n    format_it()\n',
+            'e.py': 'def format_it():\n    return str()\n',
+        }
+        for name, content in self.files.items():
+            self.write(name, content)
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.root.name, name)
+
+    def write(self, name, content):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), 'w') as file:
+            file.write(content)
+
+    def full_graph(self):
+        output_folder = os.path.join(self.root.name, 'docs_output')
+        code2flow_utils.generate_graph(self.root.name, output_folder)
+        return code2flow_utils.get_call_graph(output_folder)
+
+    def assert_incremental_equals_full(self, changed, deleted=()):
+        previous = self.full_graph()
+        for name, content in changed.items():
+            self.write(name, content)
+        for name in deleted:
+            os.remove(self.path(name))
+        updated = incremental_graph.update_call_graph(
+            previous, self.root.name, [self.path(name) for name in changed], [self.path(name) for name in deleted])
+        self.assertEqual(normalize_graph(updated), normalize_graph(self.full_graph()))
+
+    def test_modified_file(self):
+        self.assert_incremental_equals_full({'b.py': 'def run():\n    util()\n    common()\n'})
+
+    def test_call_to_unconnected_function(self):
+        # `unused` of the unchanged b.py is not in the graph until a.py calls it
+        self.assert_incremental_equals_full({'a.py': self.files['a.py'] + '\ndef user():\n    unused()\n'})
+
+    def test_new_definition_makes_calls_ambiguous(self):
+        self.assert_incremental_equals_full({'b.py': self.files['b.py'] + '\ndef common():\n    util()\n'})
+
+    def test_removed_definition_resolves_calls(self):
+        self.write('b.py', self.files['b.py'] + '\ndef common():\n    util()\n')
+        self.assert_incremental_equals_full({'b.py': self.files['b.py']})
+
+    def test_added_and_deleted_files(self):
+        self.assert_incremental_equals_full(
+            {'pkg/f.py': 'def format_it():\n    helper()\n', 'g.py': 'def go():\n    other()\n'},
+            deleted=['e.py'])
+
+    def test_renamed_file(self):
+        self.assert_incremental_equals_full({'pkg/e2.py': self.files['e.py']}, deleted=['e.py'])
+
+    def test_get_affected_files(self):
+        graph = self.full_graph()
+        affected, context = incremental_graph.get_affected_files(
+            graph, self.root.name, [self.path('pkg/c.py')], [])
+        self.assertEqual(affected, {self.path('pkg/c.py'), self.path('b.py'), self.path('pkg/d.py')})
+        self.assertEqual(context, {self.path('e.py')})
+
+
+class TestFunctionChanges(unittest.TestCase):
+    def test_get_functions_from_content(self):
+        content = (
+            'import os\n\n'
+            '@decorator\n'
+            'def func1(a,\n          b):\n    return a + b\n\n'
+            'class Parser:\n'
+            '    def parse(self):\n        pass\n\n'
+            '    class Inner:\n        async def run(self):\n            pass\n'
+        )
+        self.assertEqual(get_functions_from_content(content), {
+            'func1': 'def func1(a,\n          b):\n    return a + b',
+            'Parser.parse': 'def parse(self):\n        pass',
+            'Parser.Inner.run': 'async def run(self):\n            pass',
+        })
+
+    def test_get_functions_from_invalid_content(self):
+        self.assertEqual(get_functions_from_content('def broken(:\n'), {})
+        self.assertEqual(get_functions_from_content(''), {})
+
+    def test_get_function_changes(self):
+        old = 'def func1():\n    pass\n\ndef func2():\n    return 1\n'
+        new = 'def func1():\n    pass\n\ndef func2():\n    return 2\n\ndef func3():\n    pass\n'
+        changes = get_function_changes('test.py', old, new)
+        self.assertEqual([(change.name, change.type) for change in changes], [
+            ('func1', FunctionChangeType.EQUAL),
+            ('func2', FunctionChangeType.UPDATED),
+            ('func3', FunctionChangeType.ADDED),
+        ])
+
+    def test_get_function_changes_renamed_and_removed(self):
+        body = '    total = 0\n    for item in items:\n        total += item.price * item.quantity\n    return total\n'
+        old = f'def compute_total(items):\n{body}\ndef gone():\n    return 1\n'
+        new = f'def compute_order_total(items):\n{body}'
+        changes = get_function_changes('test.py', old, new)
+        self.assertEqual([(change.name, change.type) for change in changes], [
+            ('compute_total', FunctionChangeType.RENAMED),
+            ('gone', FunctionChangeType.REMOVED),
+        ])
+
+
+def make_function(name, i):
+    return (f'def {name}(items, limit={i}):\n'
+            f'    total = {i}\n'
+            f'    for item in items[:limit]:\n'
+            f'        total += item.value_{i} * {i % 7}\n'
+            f'    return total - offset_{i}\n')
+
+class TestSimilarity(unittest.TestCase):
+    def test_shingles(self):
+        self.assertEqual(len(get_shingles('a b c d')), 2)
+        self.assertEqual(len(get_shingles('a')), 1)
+        self.assertEqual(get_shingles(''), set())
+
+    def test_estimate_jaccard(self):
+        signature = get_signature(get_shingles(make_function('f', 1)))
+        self.assertEqual(estimate_jaccard(signature, signature), 1.0)
+        other = get_signature(get_shingles('class Unrelated:\n    name = "other"\n'))
+        self.assertLess(estimate_jaccard(signature, other), 0.2)
+
+    def test_candidates(self):
+        index = SimilarityIndex({f'new{i}': make_function(f'new{i}', i) for i in range(50)})
+        self.assertEqual(index.candidates(make_function('old7', 7), limit=1), ['new7'])
+        index.remove('new7')
+        self.assertNotIn('new7', index.candidates(make_function('old7', 7)))
+        self.assertEqual(SimilarityIndex({}).candidates('def f(): pass'), [])
+
+    def test_many_renamed_functions(self):
+        old = '\n'.join(make_function(f'old{i}', i) for i in range(300))
+        new = '\n'.join(make_function(f'new{i}', i) for i in range(300))
+        changes = get_function_changes('test.py', old, new)
+        self.assertEqual(len(changes), 300)
+        self.assertTrue(all(change.type == FunctionChangeType.RENAMED for change in changes))
+
+
+class TestChunking(unittest.TestCase):
+    def setUp(self):
+        self.header = '"""Module."""\nimport os\n'
+        self.functions = [f'# Function {i}\n@decorator\ndef function_{i}():\n    return {i}\n' for i in range(6)]
+        self.content = self.header + ''.join(self.functions)
+
+    @patch('analysis.chunking.count_tokens', side_effect=lambda text: len(text.splitlines()))
+    def test_split_into_chunks(self, _):
+        chunks = split_into_chunks(self.content, 10)
+        self.assertEqual(len(chunks), 3)
+        for i, chunk in enumerate(chunks):
+            # The header is repeated and the functions stay whole, with their decorators and comments
+            self.assertTrue(chunk.startswith(self.header))
+            self.assertEqual(chunk[len(self.header):], ''.join(self.functions[2 * i:2 * i + 2]))
+        # A header over a quarter of the budget is a chunk of its own
+        chunks = split_into_chunks(self.content, 4)
+        self.assertEqual(chunks[0], self.header)
+        self.assertEqual(chunks[1:], self.functions)
+
+    @patch('analysis.chunking.count_tokens', side_effect=lambda text: len(text.splitlines()))
+    def test_get_chunks(self, _):
+        self.assertEqual(get_chunks(self.content, threshold=100), [self.content])
+        self.assertEqual(len(get_chunks(self.content, threshold=10, max_tokens=10)), 3)
+        self.assertEqual(get_chunks('def broken(:\n' * 20, threshold=10, max_tokens=10), ['def broken(:\n' * 20])
+
+
+if __name__ == '__main__':
+    unittest.main()
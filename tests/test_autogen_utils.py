@@ -1,5 +1,6 @@
 import sys
 import os
+import tempfile
 import unittest
 
 from unittest.mock import Mock, patch
@@ -9,6 +10,7 @@ sys.path.append(os.path.abspath(
     os.path.join(os.path.dirname(__file__), './../')))
 
 from autogen_utils import utils as autogen_utils
+from llm_utils.response_cache import get_response_cache
 
 class TestAutogenUtils(unittest.TestCase):
     def setUp(self):
@@ -67,10 +69,9 @@ class TestAutogenUtils(unittest.TestCase):
     @patch('autogen_utils.utils.initiate_chat')
     def test_get_updated_parent_documentation(self, mock_initiate_chat):
         file_path = '/test/parent.py'
-        updated_functions = {'func1': 'Updated content'}
+        updated_functions = {'/test/a.py': ['func1'], '/test/b.py': ['func3', 'func4']}
         additional_docs = 'Additional docs'
-        new_content = 'New parent content'
-        functions = 'func1, func2'
+        functions = ['func1', 'func2']
         parent_content = 'Old parent content'
         old_parent_docs = 'Old parent docs'
 
@@ -78,11 +79,19 @@ class TestAutogenUtils(unittest.TestCase):
             'content': 'Updated parent docs'}
 
         result = autogen_utils.get_updated_parent_documentation(
-            file_path, updated_functions, additional_docs, new_content, functions,
+            file_path, updated_functions, additional_docs, functions,
             parent_content, old_parent_docs, self.user, self.assistant, self.output_dir, save_debug=True
         )
 
         self.assertEqual(result, 'Updated parent docs')
+        prompt = mock_initiate_chat.call_args[0][2]
+        self.assertIn('/test/a.py: func1\n/test/b.py: func3, func4', prompt)
+        self.assertIn('func1, func2', prompt)
+
+        autogen_utils.get_updated_parent_documentation(
+            file_path, updated_functions, additional_docs, functions,
+            parent_content, 'Old sections', self.user, self.assistant, self.output_dir, sections=['func1'])
+        self.assertIn('Return only the updated sections, for: func1.', mock_initiate_chat.call_args[0][2])
 
     @patch('autogen_utils.utils.initiate_chat')
     def test_get_updated_commit_documentation(self, mock_initiate_chat):
@@ -101,6 +110,20 @@ class TestAutogenUtils(unittest.TestCase):
 
         self.assertEqual(result, 'Updated commit docs')
 
+    @patch('autogen_utils.utils.initiate_chat')
+    def test_cached_chat_without_content(self, mock_initiate_chat):
+        with tempfile.TemporaryDirectory() as output_dir:
+            self.assistant.system_message = 'System'
+            self.assistant.last_message.return_value = {'content': None}
+            self.assertIsNone(autogen_utils.cached_chat(self.user, self.assistant, 'Prompt', output_dir))
+
+            # The empty reply was not cached
+            self.assistant.last_message.return_value = {'content': 'Docs'}
+            self.assertEqual(autogen_utils.cached_chat(self.user, self.assistant, 'Prompt', output_dir), 'Docs')
+            self.assertEqual(autogen_utils.cached_chat(self.user, self.assistant, 'Prompt', output_dir), 'Docs')
+            self.assertEqual(mock_initiate_chat.call_count, 2)
+            get_response_cache(output_dir).close()
+
 
 if __name__ == '__main__':
     unittest.main()
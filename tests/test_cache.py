@@ -1,5 +1,8 @@
 import os
 import sys
+import json
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch
 from datetime import datetime
@@ -7,8 +10,10 @@ from datetime import datetime
 sys.path.append(os.path.abspath(
     os.path.join(os.path.dirname(__file__), './../')))
 
-from cache.document import Document, sha256_hash
+from cache.document import Document, sha256_hash, git_blob_sha
 from cache import docs_cache
+from cache.run_journal import RunJournal, is_completed, is_up_to_date
+from cache.sqlite_docs_cache import SqliteDocsCache
 
 class TestDocsCache(unittest.TestCase):
     def setUp(self):
@@ -51,6 +56,13 @@ class TestDocsCache(unittest.TestCase):
         self.cache.add("path2.py", "content2", "docs2.md")
         self.assertEqual(self.cache.size(), 2)
 
+    def test_items(self):
+        self.cache.add("path1.py", "content1", "docs1.md")
+        self.cache.add("path2.py", "content2", "docs2.md")
+        items = self.cache.items()
+        self.assertEqual([key for key, _ in items], ["path1.py", "path2.py"])
+        self.assertIsInstance(items[0][1], Document)
+
     def test_to_dict(self):
         self.cache.add("path.py", "content", "docs.md")
         cache_dict = self.cache.to_dict()
@@ -72,6 +84,8 @@ class TestDocsCache(unittest.TestCase):
         doc = cache.get("path.py")
         self.assertIsInstance(doc, Document)
         self.assertEqual(doc.source_file_path, "path.py")
+        self.assertIsNone(doc.blob_sha)
+        self.assertIsNone(doc.mtime_ns)
 
     @patch('cache.document.datetime')
     def test_document_update(self, mock_datetime):
@@ -84,5 +98,148 @@ class TestDocsCache(unittest.TestCase):
         self.assertEqual(doc.modified_on, "2023-01-01T00:00:00")
 
 
+class TestRunJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = RunJournal(self.tmp.name)
+        self.docs_path = os.path.join(self.tmp.name, 'file.py.md')
+        with open(self.docs_path, 'w') as f:
+            f.write('docs')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_load_empty(self):
+        self.assertEqual(self.journal.load(), {})
+
+    def test_record_and_load(self):
+        self.journal.record('file.py', 'content', self.docs_path)
+        self.journal.record('other.py', 'other', 'other.py.md')
+        completed = RunJournal(self.tmp.name).load()
+        self.assertEqual(set(completed), {'file.py', 'other.py'})
+        self.assertEqual(completed['file.py'].source_file_hash, sha256_hash('content'))
+        self.assertEqual(completed['file.py'].generated_docs_path, self.docs_path)
+
+    def test_torn_line_is_ignored(self):
+        self.journal.record('file.py', 'content', self.docs_path)
+        with open(self.journal.path, 'a') as f:
+            f.write('{"source_file_path": "oth')
+        self.assertEqual(set(self.journal.load()), {'file.py'})
+
+    def test_clear(self):
+        self.journal.record('file.py', 'content', self.docs_path)
+        self.journal.clear()
+        self.assertFalse(os.path.exists(self.journal.path))
+        self.assertEqual(self.journal.load(), {})
+
+    def test_is_up_to_date(self):
+        source_path = os.path.join(self.tmp.name, 'file.py')
+        with open(source_path, 'w') as f:
+            f.write('content')
+        stat = os.stat(source_path)
+        doc = Document(source_path, 'content', self.docs_path, stat.st_mtime_ns)
+        self.assertEqual(doc.blob_sha, git_blob_sha('content'))
+        self.assertEqual(doc.size, len('content'))
+        self.assertFalse(is_up_to_date(None, source_path))
+        # The blob SHA or the stat is enough, without reading the file
+        with patch('builtins.open') as mock_open:
+            self.assertTrue(is_up_to_date(doc, source_path, git_blob_sha('content')))
+            self.assertTrue(is_up_to_date(doc, source_path))
+            mock_open.assert_not_called()
+        # Otherwise the content hash is compared
+        os.utime(source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertTrue(is_up_to_date(doc, source_path, git_blob_sha('other')))
+        with open(source_path, 'w') as f:
+            f.write('changed')
+        self.assertFalse(is_up_to_date(doc, source_path))
+        self.assertFalse(is_up_to_date(doc, os.path.join(self.tmp.name, 'missing.py')))
+
+    def test_is_completed(self):
+        self.journal.record('file.py', 'content', self.docs_path)
+        self.journal.record('missing.py', 'content', 'missing.py.md')
+        completed = self.journal.load()
+        self.assertTrue(is_completed(completed['file.py'], 'content'))
+        self.assertFalse(is_completed(completed['file.py'], 'changed content'))
+        self.assertFalse(is_completed(completed['missing.py'], 'content'))
+        self.assertFalse(is_completed(None, 'content'))
+
+
+class TestSqliteDocsCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'cache.db')
+        self.cache = SqliteDocsCache(self.db_path)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_add_get_remove(self):
+        self.cache.add('file.py', 'content', 'file.py.md')
+        doc = self.cache.get('file.py')
+        self.assertEqual(doc.source_file_hash, sha256_hash('content'))
+        self.assertEqual(doc.generated_docs_path, 'file.py.md')
+        self.assertIsNone(self.cache.get('missing.py'))
+        self.cache.remove('file.py')
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_update_docs(self):
+        self.cache.update_docs('file.py', 'content', 'file.py.md')
+        self.cache.update_docs('file.py', 'new content', 'new.py.md')
+        self.assertEqual(self.cache.size(), 1)
+        self.assertEqual(self.cache.get('file.py').source_file_hash, sha256_hash('new content'))
+        self.assertEqual(self.cache.get('file.py').generated_docs_path, 'new.py.md')
+
+    def test_persisted(self):
+        self.cache.add('file.py', 'content', 'file.py.md')
+        self.cache.add('other.py', 'other', 'other.py.md')
+        reopened = SqliteDocsCache(self.db_path)
+        self.assertEqual([key for key, _ in reopened.items()], ['file.py', 'other.py'])
+        reopened.clear()
+        self.assertEqual(self.cache.size(), 0)
+        reopened.close()
+
+    def test_export_json(self):
+        legacy = docs_cache.DocsCache()
+        legacy.add('file.py', 'content', 'file.py.md')
+        self.cache.replace(legacy.items())
+        json_path = os.path.join(self.tmp.name, 'cache.json')
+        self.cache.export_json(json_path)
+        with open(json_path) as f:
+            self.assertEqual(json.load(f), legacy.to_dict())
+
+    def test_import_json(self):
+        legacy = docs_cache.DocsCache()
+        legacy.add('file.py', 'content', 'file.py.md')
+        json_path = os.path.join(self.tmp.name, 'cache.json')
+        with open(json_path, 'w') as f:
+            json.dump(legacy.to_dict(), f)
+        self.assertTrue(self.cache.is_json_changed(json_path))
+        self.cache.add('stale.py', 'stale', 'stale.py.md')
+        self.cache.import_json(json_path)
+        self.assertEqual(self.cache.to_dict(), legacy.to_dict())
+        self.assertFalse(self.cache.is_json_changed(json_path))
+
+        self.cache.add('other.py', 'other', 'other.py.md')
+        self.assertFalse(self.cache.is_json_changed(json_path))
+        self.cache.export_json(json_path)
+        self.assertFalse(self.cache.is_json_changed(json_path))
+        with open(json_path, 'a') as f:
+            f.write('\n')
+        self.assertTrue(self.cache.is_json_changed(json_path))
+
+    def test_parallel_writers(self):
+        def write(worker):
+            for i in range(20):
+                self.cache.update_docs(f'{worker}/{i}.py', str(i), f'{worker}/{i}.py.md')
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.size(), 80)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,169 @@
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), './../')))
+
+from llm_utils import tokens
+from llm_utils.rate_limiter import TokenBucket, RateLimiter, throttle_agent
+from llm_utils.response_cache import ResponseCache, get_response_cache
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_within_capacity(self):
+        bucket = TokenBucket(60)
+        now = bucket.updated_at
+        self.assertEqual(bucket.reserve(10, now), 0.0)
+        self.assertEqual(bucket.level, 50)
+
+    def test_reserve_over_capacity_waits_for_refill(self):
+        bucket = TokenBucket(60)  # One unit per second
+        now = bucket.updated_at
+        bucket.reserve(60, now)
+        self.assertAlmostEqual(bucket.reserve(2, now), 2.0)
+        # Reservations queue behind each other
+        self.assertAlmostEqual(bucket.reserve(1, now), 3.0)
+
+    def test_refill_is_capped(self):
+        bucket = TokenBucket(60)
+        now = bucket.updated_at
+        bucket.reserve(30, now)
+        bucket.reserve(0, now + 3600)
+        self.assertEqual(bucket.level, 60)
+
+    def test_oversized_request_is_clamped(self):
+        bucket = TokenBucket(60)
+        now = bucket.updated_at
+        self.assertEqual(bucket.reserve(1000, now), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1000, now), 60.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_unlimited(self):
+        limiter = RateLimiter()
+        for _ in range(100):
+            self.assertEqual(limiter.reserve(10_000), 0.0)
+        self.assertEqual(limiter.requests, 100)
+        self.assertEqual(limiter.tokens, 1_000_000)
+
+    def test_requests_budget(self):
+        limiter = RateLimiter(requests_per_minute=2)
+        self.assertEqual(limiter.reserve(0), 0.0)
+        self.assertEqual(limiter.reserve(0), 0.0)
+        self.assertGreater(limiter.reserve(0), 29.0)
+
+    def test_tokens_budget(self):
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=600)
+        self.assertEqual(limiter.reserve(600), 0.0)
+        self.assertAlmostEqual(limiter.reserve(60), 6.0, places=1)
+
+    @patch('llm_utils.rate_limiter.time.sleep')
+    def test_acquire_sleeps(self, mock_sleep):
+        limiter = RateLimiter(requests_per_minute=1)
+        limiter.acquire()
+        mock_sleep.assert_not_called()
+        limiter.acquire()
+        mock_sleep.assert_called_once()
+
+    def test_acquire_async(self):
+        limiter = RateLimiter(tokens_per_minute=6000)
+        self.assertEqual(asyncio.run(limiter.acquire_async(100)), 0.0)
+
+    @patch.dict(os.environ, {'AZURE_OPENAI_RPM': '10', 'AZURE_OPENAI_TPM': ''})
+    def test_from_env(self):
+        limiter = RateLimiter.from_env()
+        for _ in range(10):
+            self.assertEqual(limiter.reserve(1_000_000), 0.0)
+        self.assertGreater(limiter.reserve(0), 0.0)
+
+    def test_throttle_agent(self):
+        agent = Mock()
+        agent.system_message = 'system'
+        limiter = Mock()
+        throttle_agent(agent, limiter)
+        hookable_method, hook = agent.register_hook.call_args[0]
+        self.assertEqual(hookable_method, 'process_all_messages_before_reply')
+        messages = [{'role': 'user', 'content': 'Hello'}]
+        self.assertIs(hook(messages), messages)
+        limiter.acquire.assert_called_once()
+
+
+class TestTokens(unittest.TestCase):
+    def test_count_tokens_empty(self):
+        self.assertEqual(tokens.count_tokens(''), 0)
+        self.assertEqual(tokens.count_tokens(None), 0)
+
+    @patch('llm_utils.tokens._get_encoding', return_value=None)
+    def test_count_tokens_fallback(self, mock_encoding):
+        self.assertEqual(tokens.count_tokens('a' * 9), 3)
+
+    @patch('llm_utils.tokens._get_encoding', return_value=None)
+    def test_count_message_tokens(self, mock_encoding):
+        messages = [{'role': 'user', 'content': 'a' * 8}, {'role': 'assistant', 'content': None}]
+        self.assertEqual(tokens.count_message_tokens(messages), 2 + 2 * tokens.TOKENS_PER_MESSAGE)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'llm_cache.sqlite')
+        self.cache = ResponseCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_key(self):
+        key = ResponseCache.key('gpt-4', 0, 'system', 'prompt')
+        self.assertEqual(key, ResponseCache.key('gpt-4', 0, 'system', 'prompt'))
+        self.assertNotEqual(key, ResponseCache.key('gpt-4', 0.5, 'system', 'prompt'))
+        self.assertNotEqual(key, ResponseCache.key('gpt-4', 0, 'other', 'prompt'))
+        self.assertNotEqual(key, ResponseCache.key('gpt-35', 0, 'system', 'prompt'))
+
+    def test_get_and_put(self):
+        key = ResponseCache.key('gpt-4', 0, None, 'prompt')
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, 'response')
+        self.assertEqual(self.cache.get(key), 'response')
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'size': 8})
+
+    def test_persistence(self):
+        self.cache.put('key', 'response')
+        self.cache.close()
+        self.cache = ResponseCache(self.path)
+        self.assertEqual(self.cache.get('key'), 'response')
+        self.assertEqual(self.cache.size(), 8)
+
+    def test_replace_keeps_size(self):
+        self.cache.put('key', 'aaaa')
+        self.cache.put('key', 'bb')
+        self.assertEqual(self.cache.size(), 2)
+
+    @patch('llm_utils.response_cache.time.time')
+    def test_lru_eviction(self, mock_time):
+        cache = ResponseCache(os.path.join(self.tmp.name, 'small.sqlite'), max_size=10)
+        mock_time.return_value = 1
+        cache.put('a', 'aaaa')
+        mock_time.return_value = 2
+        cache.put('b', 'bbbb')
+        mock_time.return_value = 3
+        cache.get('a')  # 'b' is now the least recently used
+        mock_time.return_value = 4
+        cache.put('c', 'cccc')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'aaaa')
+        self.assertEqual(cache.get('c'), 'cccc')
+        self.assertEqual(cache.size(), 8)
+        cache.close()
+
+    def test_get_response_cache_is_shared(self):
+        cache = get_response_cache(self.tmp.name)
+        self.assertIs(cache, get_response_cache(self.tmp.name + '/'))
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
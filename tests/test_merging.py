@@ -1,13 +1,15 @@
 import re
+import json
 import sys
 import unittest
 from unittest.mock import patch, mock_open
 import os
+import tempfile
 
 sys.path.append(os.path.abspath(
     os.path.join(os.path.dirname(__file__), './../')))
 
-from repo_documentation.merging import merger
+from repo_documentation.merging import merger, search_index
 
 class TestDocumentationGenerator(unittest.TestCase):
 
@@ -27,24 +29,34 @@ class TestDocumentationGenerator(unittest.TestCase):
             }
         }
 
+    @patch('repo_documentation.merging.merger.write_search_index')
+    @patch('os.replace')
     @patch('builtins.open', new_callable=mock_open)
     @patch('os.walk')
     @patch('repo_documentation.merging.merger.get_table_of_contents')
-    @patch('repo_documentation.merging.merger.get_documentation_content')
-    def test_create_documentation(self, mock_get_content, mock_get_toc, mock_walk, mock_file):
+    @patch('repo_documentation.merging.merger.iter_documentation_content')
+    def test_create_documentation(self, mock_get_content, mock_get_toc, mock_walk, mock_file, mock_replace,
+                                  mock_search_index):
         mock_walk.return_value = [
             ('root', [], ['file1.md']),
             ('root/folder1', [], ['file2.md']),
             ('root/folder1/subfolder', [], ['file3.md'])
         ]
         mock_get_toc.return_value = "<ul><li>Sample TOC</li></ul>"
-        mock_get_content.return_value = "<div>Sample Content</div>"
+        mock_get_content.return_value = iter(["<div>Sample Content</div>"])
 
         merger.create_documentation('docs_folder')
 
         mock_file.assert_called()
         mock_get_toc.assert_called()
         mock_get_content.assert_called()
+        mock_search_index.assert_called_once()
+        written = ''.join(str(call.args[0]) for call in mock_file().write.call_args_list)
+        written += ''.join(''.join(call.args[0]) for call in mock_file().writelines.call_args_list)
+        self.assertIn('<ul><li>Sample TOC</li></ul>', written)
+        self.assertIn('<div>Sample Content</div>', written)
+        mock_replace.assert_called_once_with(os.path.join('docs_folder', 'index.html.tmp'),
+                                             os.path.join('docs_folder', 'index.html'))
 
     def test_create_file_card(self):
         file_path = "folder/file.md"
@@ -79,6 +91,99 @@ class TestDocumentationGenerator(unittest.TestCase):
             r'<div class=\"file-card\" id=\"file-file[0-9]\">', result)
         self.assertEqual(len(regex_match), 3)
 
+    def test_fragment_cache(self):
+        with tempfile.TemporaryDirectory() as docs_folder:
+            for name, text in [('a.py.md', '# A'), ('b.py.md', '# B')]:
+                with open(os.path.join(docs_folder, name), 'w', encoding='utf-8') as f:
+                    f.write(text)
+            merger.create_documentation(docs_folder)
+            with open(os.path.join(docs_folder, 'index.html'), encoding='utf-8') as f:
+                first = f.read()
+            self.assertIn('<h1>A</h1>', first)
+
+            # Only the changed document is rendered again, and its old fragment is removed
+            with open(os.path.join(docs_folder, 'b.py.md'), 'w', encoding='utf-8') as f:
+                f.write('# B2')
+            with patch('repo_documentation.merging.merger.render_markdown', wraps=merger.render_markdown) as render:
+                merger.create_documentation(docs_folder)
+                render.assert_called_once_with('# B2')
+            with open(os.path.join(docs_folder, 'index.html'), encoding='utf-8') as f:
+                self.assertEqual(f.read(), first.replace('<h1>B</h1>', '<h1>B2</h1>'))
+            # A rendered fragment and the search terms of each document
+            self.assertEqual(len(os.listdir(os.path.join(docs_folder, merger.FRAGMENT_CACHE_FOLDER))), 4)
+
+    def test_split_pages(self):
+        with tempfile.TemporaryDirectory() as docs_folder:
+            os.makedirs(os.path.join(docs_folder, 'pkg'))
+            for name, text in [('a.py.md', '# A'), (os.path.join('pkg', 'b.py.md'), '# B')]:
+                with open(os.path.join(docs_folder, name), 'w', encoding='utf-8') as f:
+                    f.write(text)
+            merger.create_documentation(docs_folder, split_pages=True)
+            with open(os.path.join(docs_folder, 'index.html'), encoding='utf-8') as f:
+                index = f.read()
+            self.assertNotIn('<h1>A</h1>', index)
+            self.assertIn("showFile('pkg-b-py')", index)
+            self.assertIn('site/manifest.json', index)
+            with open(os.path.join(docs_folder, 'site', 'manifest.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.assertEqual(set(manifest), {'a-py', 'pkg-b-py'})
+            with open(os.path.join(docs_folder, manifest['pkg-b-py']), encoding='utf-8') as f:
+                self.assertIn('<div class="file-card" id="file-pkg-b-py">', f.read())
+
+            # A changed card gets a new name, the unchanged one keeps its name
+            with open(os.path.join(docs_folder, 'a.py.md'), 'w', encoding='utf-8') as f:
+                f.write('# A2')
+            merger.create_documentation(docs_folder, split_pages=True)
+            with open(os.path.join(docs_folder, 'site', 'manifest.json'), encoding='utf-8') as f:
+                updated = json.load(f)
+            self.assertNotEqual(updated['a-py'], manifest['a-py'])
+            self.assertEqual(updated['pkg-b-py'], manifest['pkg-b-py'])
+            self.assertEqual(sorted(os.listdir(os.path.join(docs_folder, 'site'))),
+                             sorted(['manifest.json'] + [os.path.basename(path) for path in updated.values()]))
+
+    def test_tokenize(self):
+        self.assertEqual(search_index.tokenize('get_table_of_contents'),
+                         ['get_table_of_contents', 'get', 'table', 'of', 'contents'])
+        self.assertEqual(search_index.tokenize('DocsCache x'), ['docscache', 'docs', 'cache'])
+
+    def test_build_search_index(self):
+        documents = [
+            ('a-py', 'a.py', {'cache': 1, 'docs': 2}),
+            ('b-py', 'b.py', {'cache': 5, 'merge': 1}),
+        ]
+        index, shards = search_index.build_search_index(documents)
+        self.assertEqual(index, {'docs': [['a-py', 'a.py'], ['b-py', 'b.py']], 'shards': ['ca', 'do', 'me']})
+        # Postings are (document number, score) pairs, the best scored first
+        self.assertEqual(shards['ca'], {'cache': [1, 5, 0, 1]})
+        self.assertEqual(shards['do'], {'docs': [0, 2]})
+
+    def test_search_index(self):
+        with tempfile.TemporaryDirectory() as docs_folder:
+            os.makedirs(os.path.join(docs_folder, 'pkg'))
+            for name, text in [('a.py.md', '# DocsCache\nStores the docs.'),
+                               (os.path.join('pkg', 'b.py.md'), '# merge\nMerges the docs.')]:
+                with open(os.path.join(docs_folder, name), 'w', encoding='utf-8') as f:
+                    f.write(text)
+            merger.create_documentation(docs_folder)
+            with open(os.path.join(docs_folder, 'index.html'), encoding='utf-8') as f:
+                self.assertIn('search/index.json', f.read())
+            search_folder = os.path.join(docs_folder, search_index.SEARCH_FOLDER)
+            with open(os.path.join(search_folder, search_index.INDEX_FILE), encoding='utf-8') as f:
+                index = json.load(f)
+            self.assertEqual(index['docs'], [['a-py', 'a.py'], ['pkg-b-py', 'pkg/b.py']])
+            with open(os.path.join(search_folder, 'ca.json'), encoding='utf-8') as f:
+                self.assertEqual(f.read(), '{"cache":[0,6]}')
+            with open(os.path.join(search_folder, 'pk.json'), encoding='utf-8') as f:
+                self.assertEqual(json.load(f), {'pkg': [1, 3]})
+
+            # The shards of the removed terms are removed
+            os.remove(os.path.join(docs_folder, 'pkg', 'b.py.md'))
+            merger.create_documentation(docs_folder)
+            self.assertFalse(os.path.exists(os.path.join(search_folder, 'pk.json')))
+            self.assertEqual(sorted(os.listdir(search_folder)),
+                             sorted([search_index.INDEX_FILE] + [f'{key}.json' for key in index['shards']
+                                                                  if key not in ('pk', 'me')]))
+
     def test_to_tree(self):
         files = [
             'file1.md',
@@ -0,0 +1,125 @@
+import sys
+import os
+import re
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), './../')))
+
+# The Azure OpenAI service and the agents are created on import, they are never called by these tests
+for name, value in [('CHAT_DEPLOYMENT_NAME', 'test'), ('AZURE_OPENAI_API_KEY', 'test'),
+                    ('AZURE_OPENAI_ENDPOINT', 'https://test.openai.azure.com'),
+                    ('AZURE_OPENAI_API_VERSION', '2024-02-01'), ('API_TYPE', 'azure'),
+                    ('BASE_URL', 'https://test.openai.azure.com'), ('ROOT_FOLDER', tempfile.gettempdir())]:
+    os.environ.setdefault(name, value)
+
+from cache.docs_cache import DocsCache
+from cache.run_journal import RunJournal
+from llm_utils.response_cache import get_response_cache
+from repo_agents.single_agent_generation.documentation_agent import DocumentationAgent
+from repo_agents.plugins.documentation_plugin import DocumentationPlugin
+
+class TestDocumentationAgent(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.agent = DocumentationAgent.__new__(DocumentationAgent)
+        self.agent.root_folder = self.root.name
+        self.agent.output_folder = os.path.join(self.root.name, 'docs_output')
+        self.agent.ast_agent = MagicMock()
+        self.agent.ast_agent.get_callee_function_info.return_value = ''
+        self.agent.cache = DocsCache()
+        self.agent.journal = RunJournal(self.agent.output_folder)
+        self.in_flight = 0
+        self.peak = 0
+        self.completed = []
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.root.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    async def fake_get_documentation(self, file_name, prompt):
+        """
+        An LLM request of a file or of a chunk (`def chunkN`), recording the requests in flight.
+        """
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        # The files of a level complete in the reverse order
+        await asyncio.sleep(0.01 * (10 - int(file_name[1:-3])))
+        self.in_flight -= 1
+        self.completed.append(file_name)
+        functions = re.findall(r'def (\w+)\(', prompt)
+        return f'# {file_name}\n\n' + '\n\n'.join(f'## FunctionDef {name}\n\nDocs.' for name in functions)
+
+    def generate_all(self, levels, max_concurrency):
+        paths = [[self.write(name, f'def {name[:-3]}():\n    pass\n') for name in level] for level in levels]
+        with patch.object(self.agent, '_get_documentation', side_effect=self.fake_get_documentation):
+            asyncio.run(self.agent._generate_all_documentation(paths, max_concurrency, {}))
+        return paths
+
+    def test_generate_all_documentation_concurrency(self):
+        levels = [[f'f{i}.py' for i in range(6)], ['f6.py', 'f7.py']]
+        paths = self.generate_all(levels, 2)
+
+        self.assertEqual(self.peak, 2)
+        self.assertNotEqual(self.completed, levels[0] + levels[1])
+        # The cache is filled in level order, the journal holds every completed file
+        self.assertEqual([path for path, _ in self.agent.cache.items()], paths[0] + paths[1])
+        journal = self.agent.journal.load()
+        self.assertEqual(set(journal), set(paths[0] + paths[1]))
+        self.assertEqual(journal[paths[0][3]].generated_docs_path,
+                         os.path.join(self.agent.output_folder, 'f3.py.md'))
+
+    @patch('repo_agents.single_agent_generation.documentation_agent.get_chunks')
+    def test_chunks_share_the_limit(self, mock_get_chunks):
+        mock_get_chunks.side_effect = lambda content: [f'def chunk{i}():\n    pass\n' for i in range(4)]
+        self.generate_all([['f1.py', 'f2.py']], 3)
+
+        # Every chunk is a request of its own, within the limit
+        self.assertEqual(len(self.completed), 8)
+        self.assertEqual(self.peak, 3)
+        with open(os.path.join(self.agent.output_folder, 'f1.py.md')) as file:
+            self.assertEqual(file.read(), '\n\n'.join(
+                ['# f1.py'] + [f'## FunctionDef chunk{i}\n\nDocs.' for i in range(4)]))
+
+
+class TestDocumentationPlugin(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.plugin = DocumentationPlugin.__new__(DocumentationPlugin)
+        self.plugin.root_folder = self.root.name
+        self.plugin.output_folder = os.path.join(self.root.name, 'docs_output')
+        self.plugin.ast_agent = MagicMock()
+        self.plugin.ast_agent.get_callee_function_info.return_value = ''
+        self.plugin.cache = DocsCache()
+        self.plugin.response_cache = get_response_cache(self.plugin.output_folder)
+        self.file_path = os.path.join(self.root.name, 'a.py')
+        with open(self.file_path, 'w') as file:
+            file.write('def a():\n    pass\n')
+
+    def tearDown(self):
+        self.plugin.response_cache.close()
+        self.root.cleanup()
+
+    @patch('repo_agents.multi_agent_generation.multi_agent_conversation.multi_agent_documentation_generation')
+    def test_empty_reply_is_not_cached(self, mock_generation):
+        mock_generation.side_effect = ['', '# a.py']
+        self.plugin.generate_documentation_for_file(self.file_path)
+        self.assertEqual(self.plugin.response_cache.size(), 0)
+
+        # The empty reply is asked again, the next one is reused
+        self.plugin.generate_documentation_for_file(self.file_path)
+        self.plugin.generate_documentation_for_file(self.file_path)
+        self.assertEqual(mock_generation.call_count, 2)
+        with open(os.path.join(self.plugin.output_folder, 'a.py.md')) as file:
+            self.assertEqual(file.read(), '# a.py')
+
+if __name__ == '__main__':
+    unittest.main()
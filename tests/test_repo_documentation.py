@@ -1,14 +1,28 @@
 import sys
 import os
 import json
+import tempfile
+import threading
+import time
 import unittest
+import git
 from unittest.mock import patch, mock_open, MagicMock
 
 sys.path.append(os.path.abspath(
     os.path.join(os.path.dirname(__file__), './../')))
+# update_app imports its sibling modules as top-level modules
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), './../repo_documentation')))
 
 from repo_documentation import utils
 import repo_documentation.git_utils as git_utils
+from cache.docs_cache import DocsCache
+from cache.run_journal import RunJournal
+from repo_documentation.change_analysis import ChangeAnalysis
+from repo_documentation.update_scheduler import UpdateScheduler
+from repo_documentation import doc_sections
+from repo_documentation.update_app import DocumentationUpdate
+from cache.document import sha256_hash
 
 class TestUtils(unittest.TestCase):
     @patch('os.makedirs')
@@ -52,6 +66,79 @@ class TestUtils(unittest.TestCase):
         self.assertIn('func2', docs)
         self.assertNotIn('EXTERNAL::print', docs)
 
+    def test_get_reusable_docs(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            cache = DocsCache()
+            cache.add('cached.py', 'cached', 'cached.py.md')
+            cache.add('both.py', 'old', 'old.py.md')
+            utils.save_cache(output_dir, cache)
+            journal = RunJournal(output_dir)
+            journal.record('both.py', 'new', 'new.py.md')
+
+            self.assertEqual(utils.get_reusable_docs(output_dir, journal), {})
+            reusable = utils.get_reusable_docs(output_dir, journal, skip_unchanged=True)
+            self.assertEqual(set(reusable), {'cached.py', 'both.py'})
+            self.assertEqual(reusable['both.py'].generated_docs_path, 'old.py.md')
+            # The journal is more recent than the cache
+            reusable = utils.get_reusable_docs(output_dir, journal, resume=True, skip_unchanged=True)
+            self.assertEqual(reusable['both.py'].generated_docs_path, 'new.py.md')
+            reusable = utils.get_reusable_docs(output_dir, journal, resume=True)
+            self.assertEqual(set(reusable), {'both.py'})
+
+    def test_get_cache_imports_legacy_json(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            cache = DocsCache()
+            cache.add('file.py', 'content', 'file.py.md')
+            with open(os.path.join(output_dir, 'cache.json'), 'w') as f:
+                json.dump(cache.to_dict(), f)
+            db = utils.get_cache(output_dir)
+            self.assertTrue(os.path.exists(os.path.join(output_dir, 'cache.db')))
+            db.update_docs('other.py', 'other', 'other.py.md')
+            self.assertEqual(utils.get_cache(output_dir).size(), 2)
+            utils.save_cache(output_dir, db)
+            with open(os.path.join(output_dir, 'cache.json')) as f:
+                self.assertEqual(set(json.load(f)), {'file.py', 'other.py'})
+
+    def test_get_cache_imports_pulled_json(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            cache = DocsCache()
+            cache.add('file.py', 'content', 'file.py.md')
+            utils.save_cache(output_dir, cache)
+            self.assertEqual(utils.get_cache(output_dir).size(), 1)
+
+            # A newer cache.json is pulled over the exported one, the local database is stale
+            cache.add('pulled.py', 'pulled', 'pulled.py.md')
+            with open(os.path.join(output_dir, 'cache.json'), 'w') as f:
+                json.dump(cache.to_dict(), f)
+            db = utils.get_cache(output_dir)
+            self.assertEqual([key for key, _ in db.items()], ['file.py', 'pulled.py'])
+            db.update_docs('local.py', 'local', 'local.py.md')
+            self.assertEqual(utils.get_cache(output_dir).size(), 3)
+            utils.save_cache(output_dir, db)
+            with open(os.path.join(output_dir, 'cache.json')) as f:
+                self.assertEqual(set(json.load(f)), {'file.py', 'pulled.py', 'local.py'})
+
+    def test_save_cache_ignores_local_state(self):
+        with tempfile.TemporaryDirectory() as root:
+            repo = git.Repo.init(root)
+            output_dir = os.path.join(root, 'docs_output')
+            os.makedirs(os.path.join(output_dir, 'analysis'))
+            with open(os.path.join(output_dir, 'analysis', 'tree.json'), 'w') as f:
+                f.write('{}')
+            with open(os.path.join(output_dir, '.gitignore'), 'w') as f:
+                f.write('prompt_debug/')
+            cache = DocsCache()
+            cache.add('file.py', 'content', 'file.py.md')
+            utils.save_cache(output_dir, cache)
+            utils.save_cache(output_dir, cache)
+
+            with open(os.path.join(output_dir, '.gitignore')) as f:
+                self.assertEqual(f.read().splitlines(), ['prompt_debug/'] + utils.GITIGNORE_PATTERNS)
+            untracked = repo.git.status('--porcelain', '--untracked-files=all').splitlines()
+            self.assertEqual(sorted(line[3:] for line in untracked),
+                             ['docs_output/.gitignore', 'docs_output/cache.json'])
+            repo.close()
+
     def test_get_unified_diff(self):
         old_content = "Line 1\nLine 2\nLine 3"
         new_content = "Line 1\nLine 2 modified\nLine 3"
@@ -60,5 +147,446 @@ class TestUtils(unittest.TestCase):
         self.assertIn('+Line 2 modified', diff)
 
 
+class TestChangeAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.main = MagicMock(hexsha='main')
+        self.curr = MagicMock(hexsha='curr')
+        self.contents = {
+            'main': 'def run():\n    return 1\n',
+            'curr': 'def run():\n    return 2\n\ndef added():\n    pass\n',
+        }
+        self.graph = MagicMock()
+        self.graph.get_parent_dependencies.return_value = {'parent.py': ['main']}
+        self.analysis = ChangeAnalysis('/repo', self.graph, self.main, self.curr)
+
+    @patch('repo_documentation.change_analysis.git_utils.get_file__commit_content')
+    def test_memoized(self, mock_content):
+        mock_content.side_effect = lambda root, path, commit: self.contents[commit.hexsha]
+        for _ in range(3):
+            self.assertEqual(self.analysis.new_content('/repo/a.py'), self.contents['curr'])
+            self.assertIn('+    return 2', self.analysis.unified_diff('/repo/a.py'))
+            changes = self.analysis.function_changes('/repo/a.py')
+            self.assertEqual(self.analysis.parent_dependencies('/repo/a.py'), {'parent.py': ['main']})
+        self.assertEqual(mock_content.call_count, 2)
+        self.assertEqual([change.name for change in changes], ['run', 'added'])
+        self.graph.get_parent_dependencies.assert_called_once_with(['run'], '/repo/a.py')
+
+    @patch('repo_documentation.change_analysis.git_utils.get_file__commit_content')
+    def test_content_per_path_and_commit(self, mock_content):
+        mock_content.side_effect = lambda root, path, commit: f'{path}@{commit.hexsha}'
+        self.assertEqual(self.analysis.content('/repo/a.py', self.main), '/repo/a.py@main')
+        self.assertEqual(self.analysis.content('/repo/b.py', self.main), '/repo/b.py@main')
+        self.assertEqual(self.analysis.old_content('/repo/a.py'), '/repo/a.py@main')
+        self.assertEqual(mock_content.call_count, 2)
+
+    @patch('repo_documentation.change_analysis.ast_utils.filter_changes')
+    @patch('repo_documentation.change_analysis.get_function_changes')
+    @patch('repo_documentation.change_analysis.git_utils.get_file__commit_content')
+    def test_parent_updates(self, mock_content, mock_changes, mock_filter):
+        mock_filter.side_effect = lambda changes: [f'changed_in_{changes}']
+        mock_changes.side_effect = lambda path, old, new: path
+        self.graph.get_parent_dependencies.side_effect = lambda filtered, path: {
+            'a.py': {'parent.py': ['main', 'helper'], 'other.py': ['run']},
+            'b.py': {'parent.py': ['helper', 'setup']},
+            'c.py': {},
+        }[path]
+        updates = self.analysis.parent_updates(['a.py', 'b.py', 'c.py'])
+        self.assertEqual(updates, {
+            'parent.py': ({'a.py': ['changed_in_a.py'], 'b.py': ['changed_in_b.py']}, ['main', 'helper', 'setup']),
+            'other.py': ({'a.py': ['changed_in_a.py']}, ['run']),
+        })
+
+
+class TestBlobReader(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.repo = git.Repo.init(self.root.name)
+        with self.repo.config_writer() as config:
+            config.set_value('user', 'name', 'test')
+            config.set_value('user', 'email', 'test@example.com')
+        self.first = self.commit({'a.py': 'print(1)\n', 'pkg/b.py': 'é = 2\n'})
+        self.second = self.commit({'a.py': 'print(3)\n'})
+
+    def tearDown(self):
+        git_utils.get_blob_reader(self.repo.git_dir).close()
+        self.repo.close()
+        self.root.cleanup()
+
+    def commit(self, files):
+        for name, content in files.items():
+            path = os.path.join(self.root.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(content)
+        self.repo.index.add(list(files))
+        return self.repo.index.commit('commit')
+
+    def path(self, name):
+        return os.path.join(self.root.name, name)
+
+    def test_get_file_commit_content(self):
+        self.assertEqual(git_utils.get_file__commit_content(self.root.name, self.path('a.py'), self.first), 'print(1)\n')
+        self.assertEqual(git_utils.get_file__commit_content(self.root.name, self.path('a.py'), self.second), 'print(3)\n')
+        self.assertEqual(git_utils.get_file__commit_content(self.root.name, self.path('pkg/b.py'), self.second), 'é = 2\n')
+        self.assertEqual(git_utils.get_file__commit_content(self.root.name, self.path('missing.py'), self.first), '')
+        self.assertEqual(git_utils.get_file__commit_content(self.root.name, self.path('pkg'), self.first), '')
+
+    def test_get_file_commit_blob_sha(self):
+        sha = git_utils.get_file__commit_blob_sha
+        self.assertEqual(sha(self.root.name, self.path('pkg/b.py'), self.first),
+                         sha(self.root.name, self.path('pkg/b.py'), self.second))
+        self.assertNotEqual(sha(self.root.name, self.path('a.py'), self.first),
+                            sha(self.root.name, self.path('a.py'), self.second))
+        self.assertEqual(sha(self.root.name, self.path('a.py'), self.first),
+                         self.first.tree['a.py'].hexsha)
+        self.assertIsNone(sha(self.root.name, self.path('missing.py'), self.first))
+
+    def test_cache(self):
+        reader = git_utils.BlobReader(self.repo.git_dir, max_cache_size=12)
+        first = reader.get_blob_sha(self.first.hexsha, 'a.py')
+        second = reader.get_blob_sha(self.second.hexsha, 'a.py')
+        self.assertEqual(reader.read(first), 'print(1)\n')
+        self.assertEqual(reader.read(first), 'print(1)\n')
+        self.assertEqual((reader.reads, reader.hits), (2, 1))
+        # The second blob does not fit with the first one, which is evicted
+        self.assertEqual(reader.read(second), 'print(3)\n')
+        self.assertEqual(reader.cache_size, 9)
+        reader.read(first)
+        self.assertEqual(reader.hits, 1)
+        reader.close()
+
+    def test_missing_blob(self):
+        reader = git_utils.BlobReader(self.repo.git_dir)
+        with self.assertRaises(KeyError):
+            reader.read('0' * 40)
+        self.assertEqual(reader.read(self.first.tree['a.py'].hexsha), 'print(1)\n')
+        reader.close()
+
+    def test_get_worktree_blob_shas(self):
+        with open(self.path('a.py'), 'w', encoding='utf-8') as file:
+            file.write('print(4)\n')
+        blob_shas = git_utils.get_worktree_blob_shas(self.root.name)
+        real_path = os.path.join(os.path.realpath(self.root.name), 'pkg', 'b.py')
+        # Modified files are left out
+        expected = git_utils.get_file__commit_blob_sha(self.root.name, self.path('pkg/b.py'), self.second)
+        self.assertEqual(blob_shas, {real_path: expected})
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertEqual(git_utils.get_worktree_blob_shas(folder), {})
+
+
+class TestUpdateScheduler(unittest.TestCase):
+
+    def test_dependencies_run_first(self):
+        order = []
+        scheduler = UpdateScheduler(max_workers=4)
+        scheduler.add('parent', lambda: order.append('parent'), after=['child'])
+        scheduler.add('child', lambda: order.append('child'))
+        scheduler.add('missing', lambda: order.append('missing'), after=['not scheduled'])
+        scheduler.run()
+        self.assertLess(order.index('child'), order.index('parent'))
+        self.assertIn('missing', order)
+
+    def test_resource_tasks_run_in_order(self):
+        order = []
+        scheduler = UpdateScheduler(max_workers=4)
+        for i in range(5):
+            scheduler.add(('a.py', i), lambda i=i: order.append(i), resource='a.py')
+        scheduler.run()
+        self.assertEqual(order, list(range(5)))
+
+    def test_independent_tasks_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        scheduler = UpdateScheduler(max_workers=3)
+        for i in range(3):
+            scheduler.add(i, barrier.wait)
+        scheduler.run()
+
+    def test_error_stops_scheduling(self):
+        ran = []
+
+        def fail():
+            raise RuntimeError('failed')
+
+        scheduler = UpdateScheduler(max_workers=1)
+        scheduler.add('fail', fail)
+        scheduler.add('after', lambda: ran.append('after'), after=['fail'])
+        with self.assertRaises(RuntimeError):
+            scheduler.run()
+        self.assertEqual(ran, [])
+
+    def test_cycle(self):
+        scheduler = UpdateScheduler()
+        scheduler.add('a', lambda: None, after=['b'])
+        scheduler.add('b', lambda: None, after=['a'])
+        with self.assertRaises(ValueError):
+            scheduler.run()
+        with self.assertRaises(ValueError):
+            scheduler.add('a', lambda: None)
+
+
+class TestDocSections(unittest.TestCase):
+    @staticmethod
+    def section(kind, name, text):
+        return (f'<div class="{kind}-section">\n    <h2>{kind.capitalize()}Def {name}</h2>\n'
+                f'    <p>{text}</p>\n    <div class="note"><p>nested</p></div>\n</div>')
+
+    def setUp(self):
+        self.run_section = self.section('function', 'run', 'Runs.')
+        self.agent_section = self.section('class', 'Agent', 'An agent.')
+        self.docs = f'<h1>a.py</h1>\n{self.agent_section}\n\n{self.run_section}\n'
+
+    def test_split_sections(self):
+        segments = doc_sections.split_sections(self.docs)
+        self.assertEqual(''.join(text for _, text in segments), self.docs)
+        self.assertEqual([name for name, _ in segments], [None, 'Agent', None, 'run', None])
+        self.assertEqual(doc_sections.get_sections('```html\n' + self.docs + '```'),
+                         {'Agent': self.agent_section, 'run': self.run_section})
+        self.assertEqual(doc_sections.split_sections('<p>free form</p>'), [(None, '<p>free form</p>')])
+
+    def test_get_changed_sections(self):
+        old = ('import os\n\n\nclass Agent:\n    retries = 1\n\n    def run(self):\n        pass\n\n\n'
+               '@decorator\ndef build():\n    return Agent()\n')
+        def changed(new):
+            return doc_sections.get_changed_sections(git_utils.get_unified_diff(old, new), old, new)
+
+        self.assertEqual(changed(old.replace('retries = 1', 'retries = 2')), {'Agent'})
+        self.assertEqual(changed(old.replace('@decorator', '@other')), {'build'})
+        self.assertEqual(changed(old.replace('class Agent', '# Agents\nclass Agent')), set())
+        self.assertEqual(changed(old.replace('import os', 'import sys')), {doc_sections.MODULE_LEVEL})
+        # A removed definition is named in the old content
+        self.assertEqual(changed(old[:old.index('@decorator')]), {'build'})
+
+    def test_section_names(self):
+        content = 'class Agent:\n    def act(self):\n        pass\n\ndef run():\n    pass\n'
+        names = doc_sections.get_top_level_names(content)
+        self.assertEqual(names, ['Agent', 'run'])
+        self.assertEqual(doc_sections.get_section_name('Agent.act', names), 'Agent')
+        self.assertEqual(doc_sections.get_section_name('/repo/a.py::run', names), 'run')
+        self.assertIsNone(doc_sections.get_section_name('missing', names))
+
+    def test_splice_sections(self):
+        revised_run = self.section('function', 'run', 'Runs twice.')
+        added = self.section('function', 'stop', 'Stops.')
+        docs = doc_sections.splice_sections(self.docs, {'run': revised_run, 'stop': added}, removed=['Agent'])
+        self.assertEqual(doc_sections.get_sections(docs), {'run': revised_run, 'stop': added})
+        self.assertTrue(docs.startswith('<h1>a.py</h1>'))
+        self.assertEqual(doc_sections.splice_sections(self.docs, {}), self.docs)
+
+    def test_merge_documents(self):
+        stop = self.section('function', 'stop', 'Stops.')
+        docs = doc_sections.merge_documents([
+            self.docs, f'```html\n<h1>a.py</h1>\n{stop}\n{self.run_section}```', '<h1>a.py</h1><p>Constants.</p>'])
+        self.assertEqual(docs, '\n\n'.join(['<h1>a.py</h1>', self.agent_section, self.run_section, stop,
+                                             '<p>Constants.</p>']))
+
+    def test_merge_markdown_documents(self):
+        agent = '## ClassDef Agent\n\nAn agent.\n\n**Input Example**:\n\n```\n## not a heading\n```'
+        run = '## FunctionDef run\n\nRuns.'
+        stop = '## FunctionDef stop\n\nStops.'
+        docs = doc_sections.merge_documents([
+            f'# big.py\n\n{agent}\n\n{run}\n', f'# big.py\n\n{stop}\n\n{run}\n', '# big.py\n\nConstants.'])
+        self.assertEqual(docs, '\n\n'.join(['# big.py', agent, run, stop, 'Constants.']))
+        self.assertEqual([name for name, _ in doc_sections.split_markdown_sections(f'# big.py\n\n{agent}\n')],
+                         [None, 'Agent'])
+
+    def test_merge_documents_keeps_chunk_intro(self):
+        # The intro of a later chunk is kept before its sections, without the repeated heading
+        stop = self.section('function', 'stop', 'Stops.')
+        docs = doc_sections.merge_documents([self.docs, f'<h1>a.py</h1>\n<p>Stopping.</p>\n{stop}'])
+        self.assertEqual(docs, '\n\n'.join(['<h1>a.py</h1>', self.agent_section, self.run_section,
+                                             '<p>Stopping.</p>', stop]))
+        run = '## FunctionDef run\n\nRuns.'
+        stop = '## FunctionDef stop\n\nStops.'
+        docs = doc_sections.merge_documents([f'# big.py\n\nA module.\n\n{run}', f'# big.py\n\nStopping.\n\n{stop}'])
+        self.assertEqual(docs, '\n\n'.join(['# big.py\n\nA module.', run, 'Stopping.', stop]))
+
+
+def section(name, text):
+    return f'<div class="function-section">\n<h2>FunctionDef {name}</h2>\n<p>{text}</p>\n</div>'
+
+def node(path, name, callers=(), callees=()):
+    return {'name': name, 'file_name': path, 'content': '', 'callers': list(callers), 'callees': list(callees)}
+
+class TestDocumentationUpdate(unittest.TestCase):
+    """
+    Runs the update of a branch with the LLM calls mocked: `child.py` and `other.py` are called by
+    `main` and `run` of `parent.py`, `gone.py` is documented but not called.
+    """
+    main_files = {
+        'child.py': 'def helper():\n    return 1\n',
+        'other.py': 'def tool():\n    return 1\n',
+        'parent.py': 'from child import helper\nfrom other import tool\n\n'
+                     'def main():\n    return helper()\n\ndef run():\n    return tool()\n',
+        'gone.py': 'def old():\n    pass\n',
+        'agent.py': 'class Agent:\n    retries = 1\n\n    def run(self):\n        return self.retries\n\n\n'
+                    'def build():\n    return Agent()\n',
+    }
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.repo = git.Repo.init(self.root.name)
+        with self.repo.config_writer() as config:
+            config.set_value('user', 'name', 'test')
+            config.set_value('user', 'email', 'test@example.com')
+        for name, content in self.main_files.items():
+            self.write(name, content)
+        self.repo.index.add(list(self.main_files))
+        self.repo.index.commit('main')
+        self.repo.git.branch('-M', 'main')
+
+        self.output_dir = os.path.join(self.root.name, 'docs_output')
+        cache = DocsCache()
+        for name, content in self.main_files.items():
+            docs = f'<h1>{name}</h1>\n' + '\n'.join(
+                section(function, 'Old.') for function in doc_sections.get_top_level_names(content))
+            cache.add(self.path(name), content,
+                      utils.write_file_docs(self.output_dir, self.root.name, self.path(name), docs))
+        utils.save_cache(self.output_dir, cache)
+        self.repo.git.checkout('-b', 'feature')
+
+        self.graph = {
+            f'{self.path("child.py")}::helper': node(self.path('child.py'), 'helper',
+                                                     callers=[f'{self.path("parent.py")}::main']),
+            f'{self.path("other.py")}::tool': node(self.path('other.py'), 'tool',
+                                                   callers=[f'{self.path("parent.py")}::run']),
+            f'{self.path("parent.py")}::main': node(self.path('parent.py'), 'main',
+                                                    callees=[f'{self.path("child.py")}::helper']),
+            f'{self.path("parent.py")}::run': node(self.path('parent.py'), 'run',
+                                                   callees=[f'{self.path("other.py")}::tool']),
+        }
+        self.events = []
+        self.patchers = [
+            patch('repo_documentation.update_app.load_call_graph', return_value=(self.graph, {})),
+            patch('repo_documentation.update_app.create_documentation'),
+            patch('repo_documentation.update_app.autogen_utils'),
+        ]
+        _, self.create_documentation, self.autogen = [patcher.start() for patcher in self.patchers]
+        self.autogen.get_updated_documentation.side_effect = self.update
+        self.autogen.get_updated_parent_documentation.side_effect = self.update_parent
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        utils.get_cache(self.output_dir).close()
+        self.repo.close()
+        self.root.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.root.name, name)
+
+    def write(self, name, content):
+        with open(self.path(name), 'w') as file:
+            file.write(content)
+
+    def commit_feature(self, files, deleted=()):
+        for name, content in files.items():
+            self.write(name, content)
+        self.repo.index.add(list(files))
+        if deleted:
+            self.repo.index.remove(list(deleted), working_tree=True)
+        self.repo.index.commit('feature')
+
+    def update(self, file_path, sections=None, **kwargs):
+        self.events.append(('update', os.path.basename(file_path)))
+        if sections is None:
+            return '<h1>Updated.</h1>'
+        return '\n'.join(section(name, 'Updated.') for name in sections)
+
+    def update_parent(self, file_path, functions, sections=None, **kwargs):
+        self.events.append(('parent', os.path.basename(file_path), tuple(functions)))
+        return '\n'.join(section(name, 'Updated.') for name in sections)
+
+    def cached_hash(self, name):
+        with open(os.path.join(self.output_dir, 'cache.json')) as file:
+            return json.load(file)[self.path(name)]['source_file_hash']
+
+    def read_docs(self, name):
+        return utils.read_file_content(os.path.join(self.output_dir, f'{name}.md'))
+
+    def test_parent_updated_after_children(self):
+        self.commit_feature({'child.py': 'def helper():\n    return 2\n',
+                             'other.py': 'def tool():\n    return 2\n'})
+        DocumentationUpdate(self.root.name, 'feature').run()
+
+        self.assertEqual(sorted(self.events[:2]), [('update', 'child.py'), ('update', 'other.py')])
+        self.assertEqual(self.events[2:], [('parent', 'parent.py', (f'{self.path("parent.py")}::main',
+                                                                     f'{self.path("parent.py")}::run'))])
+        self.assertIn(section('helper', 'Updated.'), self.read_docs('child.py'))
+        self.assertIn(section('main', 'Updated.'), self.read_docs('parent.py'))
+        self.assertEqual(self.cached_hash('child.py'), sha256_hash('def helper():\n    return 2\n'))
+        self.create_documentation.assert_called_once_with(self.output_dir)
+
+    def test_skipped_child_does_not_update_parent_functions(self):
+        self.commit_feature({'child.py': 'def helper():\n    return 2\n',
+                             'other.py': 'def tool():\n    return 2\n'})
+        # The documentation of other.py is already up to date with the feature branch
+        cache = utils.get_cache(self.output_dir)
+        cache.update_docs(self.path('other.py'), 'def tool():\n    return 2\n',
+                          cache.get(self.path('other.py')).generated_docs_path)
+        cache.close()
+        DocumentationUpdate(self.root.name, 'feature').run()
+
+        self.assertEqual(self.events, [('update', 'child.py'),
+                                       ('parent', 'parent.py', (f'{self.path("parent.py")}::main',))])
+        self.assertIn(section('main', 'Updated.'), self.read_docs('parent.py'))
+        self.assertIn(section('run', 'Old.'), self.read_docs('parent.py'))
+
+    def test_class_attribute_change(self):
+        self.commit_feature({'agent.py': self.main_files['agent.py'].replace('retries = 1', 'retries = 3')})
+        DocumentationUpdate(self.root.name, 'feature').run()
+        # No function changed, the section of the class is updated
+        self.assertEqual(self.events, [('update', 'agent.py')])
+        self.assertIn(section('Agent', 'Updated.'), self.read_docs('agent.py'))
+        self.assertIn(section('build', 'Old.'), self.read_docs('agent.py'))
+
+    def test_module_level_change(self):
+        self.commit_feature({'agent.py': 'RETRIES = 3\n\n' + self.main_files['agent.py']})
+        DocumentationUpdate(self.root.name, 'feature').run()
+        self.assertEqual(self.read_docs('agent.py'), '<h1>Updated.</h1>')
+
+    @patch.dict(os.environ, {'MAX_CONCURRENCY': '2'})
+    @patch('repo_documentation.update_app.get_chunks')
+    def test_added_files_in_chunks_share_the_limit(self, mock_get_chunks):
+        in_flight, peak, lock = [0], [0], threading.Lock()
+
+        def generate(file_content, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return section(file_content, 'New.')
+
+        mock_get_chunks.side_effect = lambda content: [f'chunk{i}' for i in range(3)]
+        self.autogen.get_documentation.side_effect = generate
+        self.commit_feature({f'new{i}.py': 'def new():\n    pass\n' for i in range(3)})
+        DocumentationUpdate(self.root.name, 'feature').run()
+
+        self.assertEqual(self.autogen.get_documentation.call_count, 9)
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(self.read_docs('new1.py'), '\n\n'.join(section(f'chunk{i}', 'New.') for i in range(3)))
+
+    def test_failed_update_saves_cache(self):
+        self.commit_feature({'child.py': 'def helper():\n    return 2\n'})
+        self.autogen.get_updated_parent_documentation.side_effect = RuntimeError('LLM failed')
+        with self.assertRaises(RuntimeError):
+            DocumentationUpdate(self.root.name, 'feature').run()
+
+        # The completed update is in the exported cache, the failed one is not
+        self.assertEqual(self.cached_hash('child.py'), sha256_hash('def helper():\n    return 2\n'))
+        self.assertEqual(self.cached_hash('parent.py'), sha256_hash(self.main_files['parent.py']))
+        self.create_documentation.assert_not_called()
+
+    def test_deleted_file(self):
+        self.commit_feature({}, deleted=['gone.py'])
+        with patch('repo_documentation.update_app.UpdateScheduler.run') as run:
+            DocumentationUpdate(self.root.name, 'feature').run()
+        # The docs are removed when the update is scheduled, nothing is scheduled for the deleted file
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'gone.py.md')))
+        run.assert_called_once()
+        self.assertEqual(self.events, [])
+
+
 if __name__ == '__main__':
     unittest.main()